@@ -0,0 +1,215 @@
+"""
+Pipeline throughput benchmarks at 1k/10k/100k cases
+
+End to end: cases/s of BenchmarkEvaluator.run_evaluation against a
+zero-latency and a fixed-latency MockModel.
+Per stage, in isolation: dataset load, format_prompt, parse_response,
+_calculate_metrics, save_results and ResultsAnalyzer.generate_full_report.
+
+Datasets are synthesized by cycling the real dataset with unique ids and
+claims. Results are compared against a baseline file; any benchmark slower
+than the baseline by more than --tolerance fails the run (exit code 1), and
+so does a missing baseline unless --save-baseline is given.
+Baselines are machine specific, so record one per machine/CI runner.
+
+Usage:
+    python benchmarks/bench_pipeline.py --save-baseline
+    python benchmarks/bench_pipeline.py                    # compare against the baseline
+    python benchmarks/bench_pipeline.py --sizes 1000 --only parse_response,calculate_metrics
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add repo root to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from src.data_io import load_records
+from src.evaluation import BenchmarkEvaluator, ResultsAnalyzer
+from src.models import MockModel, MockProvider
+
+DEFAULT_DATASET = "datasets/triangulation_benchmark_v1.json"
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+DEFAULT_SIZES = "1000,10000,100000"
+
+BENCHMARKS = (
+    'e2e_zero_latency',
+    'e2e_fixed_latency',
+    'dataset_load',
+    'format_prompt',
+    'parse_response',
+    'calculate_metrics',
+    'save_results',
+    'generate_report',
+)
+
+
+def make_dataset(base, n: int):
+    """n test cases cycled from base, with unique ids and source lists"""
+    dataset = []
+    for i in range(n):
+        case = base[i % len(base)]
+        variant = i // len(base)
+        dataset.append(dict(
+            case,
+            id=f"{case['id']}__{variant}" if variant else case['id'],
+            sources=[
+                dict(source, claim=f"{source['claim']} (variant {variant})" if variant else source['claim'])
+                for source in case['sources']
+            ],
+        ))
+    return dataset
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the evaluator's prints and progress bars while timing"""
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+def best_of(repeats: int, fn) -> float:
+    """Fastest wall time of fn over repeats runs"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with quiet():
+            fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run_size(base, n: int, workdir: str, latency_s: float, repeats: int, only):
+    """Run every selected benchmark at one dataset size; returns {name: cases/s}"""
+    dataset = make_dataset(base, n)
+    dataset_path = os.path.join(workdir, f"dataset_{n}.json")
+    with open(dataset_path, 'w') as f:
+        json.dump(dataset, f)
+    
+    provider = MockProvider(dataset)
+    with quiet():
+        evaluator = BenchmarkEvaluator(dataset_path, models={'mock': MockModel(provider)})
+    model = evaluator.models['mock']
+    
+    # Shared inputs for the per-stage benchmarks
+    prompts = [model.format_prompt(tc) for tc in dataset]
+    responses = [provider.respond(prompt)['text'] for prompt in prompts]
+    with quiet():
+        results = evaluator.run_evaluation(use_comet=False)
+    
+    stages = {
+        'e2e_zero_latency': lambda: evaluator.run_evaluation(use_comet=False),
+        'e2e_fixed_latency': lambda: BenchmarkEvaluator(dataset_path, models={
+            'mock': MockModel(MockProvider(dataset, latency_mean_s=latency_s))
+        }).run_evaluation(use_comet=False),
+        'dataset_load': lambda: BenchmarkEvaluator(dataset_path, models={}),
+        'format_prompt': lambda: [model.format_prompt(tc) for tc in dataset],
+        'parse_response': lambda: [model.parse_response(text) for text in responses],
+        'calculate_metrics': lambda: evaluator._calculate_metrics(results['mock']),
+        'save_results': lambda: evaluator.save_results(results, workdir),
+        'generate_report': lambda: generate_report(evaluator, results, workdir),
+    }
+    
+    throughput = {}
+    for name in BENCHMARKS:
+        if only and name not in only:
+            continue
+        # End-to-end and report runs are slow enough that one pass is representative
+        runs = 1 if name.startswith('e2e') or name == 'generate_report' else repeats
+        elapsed = best_of(runs, stages[name])
+        throughput[name] = n / elapsed
+        print(f"  {name:<20} {n:>7} cases  {elapsed:9.3f}s  {n / elapsed:12.0f} cases/s")
+    return throughput
+
+
+def generate_report(evaluator, results, workdir: str):
+    """Save results and render the full report inside workdir"""
+    report_dir = os.path.join(workdir, "report")
+    os.makedirs(report_dir, exist_ok=True)
+    results_path = os.path.join(report_dir, "results.json")
+    with open(results_path, 'w') as f:
+        json.dump({name: list(rows) for name, rows in results.items()}, f)
+    
+    try:
+        ResultsAnalyzer(results_path).generate_full_report(os.path.join(report_dir, "results"))
+    finally:
+        plt.close('all')
+
+
+def compare(current, baseline, tolerance: float):
+    """Print a comparison and return the benchmarks that regressed"""
+    regressions = []
+    print(f"\n📉 Comparison with baseline (tolerance {tolerance:.0%}):")
+    for key, value in current.items():
+        if key not in baseline:
+            print(f"  {key:<30} {value:12.0f} cases/s  (no baseline)")
+            continue
+        change = value / baseline[key] - 1
+        flag = "❌ REGRESSION" if change < -tolerance else "✅"
+        print(f"  {key:<30} {value:12.0f} cases/s  {change:+7.1%}  {flag}")
+        if change < -tolerance:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated dataset sizes")
+    parser.add_argument("--only", help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Latency of the fixed-latency model")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per stage benchmark (best is kept)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Record this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before failing")
+    args = parser.parse_args()
+    
+    # Fail before spending minutes on benchmarks that have nothing to compare against
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        print(f"❌ No baseline at {args.baseline}; run with --save-baseline to record one")
+        sys.exit(1)
+    
+    base = load_records(args.dataset)
+    sizes = [int(size) for size in args.sizes.split(',')]
+    only = set(args.only.split(',')) if args.only else None
+    
+    current = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in sizes:
+            print(f"\n🏁 {n} cases")
+            for name, value in run_size(base, n, workdir, args.latency_ms / 1000, args.repeats, only).items():
+                current[f"{name}@{n}"] = value
+    
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'machine': f"{platform.node()} ({platform.processor() or platform.machine()}, "
+                           f"Python {platform.python_version()})",
+                'cases_per_s': current,
+            }, f, indent=2)
+        print(f"\n💾 Baseline saved to: {args.baseline}")
+        return
+    
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)['cases_per_s']
+    regressions = compare(current, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
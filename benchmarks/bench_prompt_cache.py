@@ -0,0 +1,132 @@
+"""
+Benchmark the static/per-case prompt split and provider prompt caching
+
+Offline (default): how much of each prompt is the static rubric prefix, and
+how fast the per-case suffix renders compared to the old full f-string.
+
+Live (--provider): sends --cases requests and reports prompt tokens, cached
+tokens, billed input tokens and latency per case. The first request warms
+the provider cache, so it is reported separately from the rest.
+
+Usage:
+    python benchmarks/bench_prompt_cache.py
+    python benchmarks/bench_prompt_cache.py --provider anthropic --model claude-3-5-sonnet-20241022 --cases 20
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add repo root to path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.data_io import load_records
+from src.models.prompts import RUBRIC_PREFIX, render_case_suffix, render_prompt_parts
+
+DEFAULT_DATASET = "datasets/triangulation_benchmark_v1.json"
+
+
+def legacy_format_prompt(test_case):
+    """The pre-split BaseModel.format_prompt, kept here as the baseline"""
+    sources_text = "\n".join([
+        f"{i+1}. {source['url']}: {source['claim']}"
+        for i, source in enumerate(test_case['sources'])
+    ])
+    return RUBRIC_PREFIX + f"""SOURCES TO EVALUATE:
+{sources_text}
+
+Provide your assessment in the following format:
+SOURCE RELIABILITY SCORES:
+[List each source with its A-F rating]
+
+OVERALL VALIDITY RATING: [1-6]
+
+REASONING:
+[Explain your assessment]
+"""
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when available, else ~4 characters per token"""
+    try:
+        import tiktoken
+        return len(tiktoken.get_encoding("o200k_base").encode(text))
+    except ImportError:
+        return max(1, len(text) // 4)
+
+
+def bench_offline(dataset, repeats: int):
+    print("📐 Prompt composition")
+    prefix_tokens = count_tokens(RUBRIC_PREFIX)
+    suffix_tokens = statistics.mean(count_tokens(render_case_suffix(case)) for case in dataset)
+    share = prefix_tokens / (prefix_tokens + suffix_tokens)
+    print(f"  Static prefix: {prefix_tokens} tokens ({len(RUBRIC_PREFIX)} chars)")
+    print(f"  Per-case suffix: {suffix_tokens:.0f} tokens (mean)")
+    print(f"  Cacheable share of each prompt: {share:.1%}")
+    
+    print("\n⚡ Prompt rendering")
+    for name, render in [
+        ("legacy f-string", legacy_format_prompt),
+        ("prefix/suffix split", render_prompt_parts),
+    ]:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for case in dataset:
+                render(case)
+        elapsed = time.perf_counter() - start
+        per_case = elapsed / (repeats * len(dataset)) * 1e6
+        print(f"  {name:<22} {per_case:6.2f} µs/case")
+
+
+def bench_live(dataset, provider: str, model_id: str, cases: int):
+    from dotenv import load_dotenv
+    load_dotenv()
+    
+    if provider == "openai":
+        from src.models import GPT4Model
+        model = GPT4Model(model_id)
+    elif provider == "anthropic":
+        from src.models import ClaudeModel
+        model = ClaudeModel(model_id)
+    else:
+        from src.models import GeminiModel
+        model = GeminiModel(model_id)
+    
+    results = [model.assess_validity(case) for case in dataset[:cases]]
+    results = [r for r in results if 'error' not in r]
+    if len(results) < 2:
+        print("❌ Not enough successful requests to compare")
+        return
+    
+    def report(label, rows):
+        prompt = statistics.mean(r['prompt_tokens'] or 0 for r in rows)
+        cached = statistics.mean(r['cached_prompt_tokens'] or 0 for r in rows)
+        latency = statistics.mean(r['latency_s'] for r in rows)
+        print(f"  {label:<12} prompt={prompt:7.1f}  cached={cached:7.1f}  "
+              f"billed input={prompt - cached:7.1f}  latency={latency:.2f}s")
+    
+    print(f"\n🌐 Live requests against {model_id} ({len(results)} cases)")
+    report("cold (1st)", results[:1])
+    report("warm (rest)", results[1:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--repeats", type=int, default=200, help="Rendering passes over the dataset")
+    parser.add_argument("--provider", choices=["openai", "anthropic", "google"])
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--cases", type=int, default=10)
+    args = parser.parse_args()
+    
+    dataset = load_records(args.dataset)
+    
+    bench_offline(dataset, args.repeats)
+    if args.provider:
+        bench_live(dataset, args.provider, args.model, args.cases)
+
+
+if __name__ == "__main__":
+    main()
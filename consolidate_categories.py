@@ -3,13 +3,24 @@ Fix: Consolidate test case categories to reduce metric explosion
 
 Current: 23 unique categories (one per test case)
 Target: 5-7 broad categories reused across test cases
+
+Usage: python consolidate_categories.py [input] [output]
+Any dataset format data_io reads works, e.g. a .jsonl.zst file; the output
+format follows the output file name.
 """
 
-import json
+import sys
+
+try:
+    from src.data_io import load_records, write_records
+except ImportError:
+    from data_io import load_records, write_records
+
+input_path = sys.argv[1] if len(sys.argv) > 1 else 'datasets/triangulation_benchmark_v1.json'
+output_path = sys.argv[2] if len(sys.argv) > 2 else 'datasets/triangulation_benchmark_v1_consolidated.json'
 
 # Load current dataset
-with open('datasets/triangulation_benchmark_v1.json', 'r') as f:
-    data = json.load(f)
+data = load_records(input_path)
 
 # Category mapping: old_category -> new_category
 CATEGORY_MAPPING = {
@@ -56,8 +67,7 @@ for case in data:
     case['category'] = new_cat
 
 # Save updated dataset
-with open('datasets/triangulation_benchmark_v1_consolidated.json', 'w') as f:
-    json.dump(data, f, indent=2)
+write_records(data, output_path)
 
 # Print summary
 from collections import Counter
@@ -78,4 +88,4 @@ print(f"  - Per-validity: 12")
 print(f"  - Per-category: {len(cat_counts)}")
 print(f"  = {23 + 3 + 12 + len(cat_counts)} total (was 62)")
 
-print(f"\n✅ Saved to: datasets/triangulation_benchmark_v1_consolidated.json")
+print(f"\n✅ Saved to: {output_path}")
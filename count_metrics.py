@@ -1,51 +1,49 @@
 """
-Count expected metrics in the new implementation
+Count the metrics a run reports, from the metric registry
 """
 
-# Validity metrics (1-6)
-validity_metrics = []
-validity_metrics.append('validity_accuracy')
-validity_metrics.append('validity_macro_f1')
-for rating in range(1, 7):
-    validity_metrics.append(f'validity_{rating}_precision')
-    validity_metrics.append(f'validity_{rating}_recall')
-    validity_metrics.append(f'validity_{rating}_f1')
-    validity_metrics.append(f'validity_{rating}_support')
-validity_metrics.append('validity_confusion_matrix')
-
-# Reliability metrics (A-F)
-reliability_metrics = []
-reliability_metrics.append('reliability_accuracy')
-reliability_metrics.append('reliability_macro_f1')
-for rating in ['A', 'B', 'C', 'D', 'E', 'F']:
-    reliability_metrics.append(f'reliability_{rating}_precision')
-    reliability_metrics.append(f'reliability_{rating}_recall')
-    reliability_metrics.append(f'reliability_{rating}_f1')
-    reliability_metrics.append(f'reliability_{rating}_support')
-reliability_metrics.append('reliability_confusion_matrix')
-
-# Overall metrics
-overall_metrics = ['strict_accuracy', 'strict_correct', 'total_cases']
-
-print("📊 ALL METRICS - COMPLETE LIST:\n")
-
-print(f"🎯 VALIDITY METRICS ({len(validity_metrics)} total):")
-for i, m in enumerate(validity_metrics, 1):
-    print(f"  {i:2d}. {m}")
-
-print(f"\n🔍 RELIABILITY METRICS ({len(reliability_metrics)} total):")
-for i, m in enumerate(reliability_metrics, 1):
-    print(f"  {i:2d}. {m}")
-
-print(f"\n⭐ OVERALL METRICS ({len(overall_metrics)} total):")
-for i, m in enumerate(overall_metrics, 1):
-    print(f"  {i:2d}. {m}")
-
-total = len(validity_metrics) + len(reliability_metrics) + len(overall_metrics)
-print(f"\n{'='*60}")
+import os
+import sys
+
+try:
+    from src.evaluation.metric_registry import METRICS
+except ImportError:
+    # Run as src/count_metrics.py: the repo root is one level up
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from src.evaluation.metric_registry import METRICS
+
+SECTION_TITLES = {
+    'overall': "⭐ OVERALL",
+    'validity': "🎯 VALIDITY",
+    'reliability': "🔍 RELIABILITY",
+    'self-consistency': "🎲 SELF-CONSISTENCY",
+    'performance': "⏱️  PERFORMANCE",
+    'hedging': "🪃 HEDGING",
+    'circuit breaker': "🔌 CIRCUIT BREAKER",
+}
+
+# Optional patterns, e.g. `python count_metrics.py 'validity_*' '!*_support'`
+patterns = sys.argv[1:] or None
+sections = {
+    section: METRICS.names(patterns, section=section)
+    for section in METRICS.sections()
+}
+sections = {section: names for section, names in sections.items() if names}
+
+print("📊 ALL METRICS - COMPLETE LIST:\n" if patterns is None else f"📊 METRICS MATCHING {' '.join(patterns)}:\n")
+
+for section, names in sections.items():
+    title = SECTION_TITLES.get(section, section.upper())
+    print(f"{title} METRICS ({len(names)} total):")
+    for i, name in enumerate(names, 1):
+        print(f"  {i:2d}. {name:<32} {METRICS.describe(name)}")
+    print()
+
+total = sum(len(names) for names in sections.values())
+print(f"{'='*60}")
 print(f"✅ TOTAL: {total} metrics")
 print(f"{'='*60}")
 print(f"\nBreakdown:")
-print(f"  - Validity (1-6 scale): {len(validity_metrics)} metrics")
-print(f"  - Reliability (A-F scale): {len(reliability_metrics)} metrics")
-print(f"  - Overall: {len(overall_metrics)} metrics")
+for section, names in sections.items():
+    print(f"  - {section.capitalize()}: {len(names)} metrics")
+print(f"\nPlus one by_<attributes> report per --group-by grouping (see grouped_metrics.py)")
@@ -5,12 +5,16 @@ This module creates test cases where the ground truth is objectively determinabl
 based on logical consistency, mathematical validity, and established facts.
 """
 
-import json
 from typing import Dict, List
 try:
     from .domain_authority import get_reliability_rating, get_domains_by_rating
+    from ..data_io import write_records
 except ImportError:
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
     from domain_authority import get_reliability_rating, get_domains_by_rating
+    from data_io import write_records
 
 
 class TestCaseGenerator:
@@ -349,10 +353,14 @@ class TestCaseGenerator:
         return dataset
     
     def save_dataset(self, filepath: str):
-        """Save generated dataset to JSON file"""
+        """
+        Save generated dataset to a JSON file.
+        
+        .jsonl writes JSON lines, and a .gz or .zst suffix compresses the
+        file (e.g. synthetic.jsonl.zst); see data_io.
+        """
         dataset = self.generate_all()
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(dataset, f, indent=2, ensure_ascii=False)
+        write_records(dataset, filepath, ensure_ascii=False)
         print(f"✅ Generated {len(dataset)} test cases")
         print(f"📁 Saved to: {filepath}")
         
@@ -0,0 +1,218 @@
+"""
+Reading and writing of dataset and results files
+
+Datasets are lists of test cases; results files map model names to lists of
+result rows. Both can be stored as
+
+- JSON (.json), the original indented format, or
+- JSON lines (.jsonl), one record per line, which streams
+
+and either can be compressed with zstd (.zst) or gzip (.gz), e.g.
+datasets/synthetic_1m.jsonl.zst. Writers pick the format from the file
+extension. Readers detect compression from the file's magic bytes, so a
+compressed file reads correctly whatever it is called.
+
+zstd needs the optional zstandard package; JSON lines are encoded and
+decoded with orjson when it is installed, and the standard json module
+otherwise.
+"""
+
+import gzip
+import json
+import os
+import zlib
+from typing import Iterable, Iterator, List, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 6
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+GZIP_MAGIC = b'\x1f\x8b'
+COMPRESSION_EXTENSIONS = {'.zst': 'zstd', '.zstd': 'zstd', '.gz': 'gzip'}
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson')
+
+
+# --- Byte-level codecs (blob store) ---
+
+def zstd_available() -> bool:
+    return zstandard is not None
+
+
+def default_codec() -> str:
+    """'zstd' when zstandard is installed, else 'zlib'"""
+    return 'zstd' if zstandard is not None else 'zlib'
+
+
+def _require_zstd(action: str):
+    if zstandard is None:
+        raise ImportError(f"{action} requires zstandard: pip install zstandard")
+
+
+def compress(data: bytes, codec: str = None) -> Tuple[str, bytes]:
+    """
+    Compress bytes.
+    
+    Returns:
+        (codec name, compressed bytes)
+    """
+    codec = codec or default_codec()
+    if codec == 'zstd':
+        _require_zstd("zstd compression")
+        return codec, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if codec == 'zlib':
+        return codec, zlib.compress(data, ZLIB_LEVEL)
+    if codec == 'none':
+        return codec, data
+    raise ValueError(f"Unknown codec {codec!r}")
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    """Reverse compress()"""
+    if codec == 'zstd':
+        _require_zstd("Reading zstd-compressed data")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'none':
+        return data
+    raise ValueError(f"Unknown codec {codec!r}")
+
+
+# --- JSON codec ---
+
+def loads(text):
+    """Decode one JSON document (orjson when installed)"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def dumps_line(value) -> str:
+    """Encode a value as one compact JSON line (without the newline)"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode('utf-8')
+        except TypeError:
+            # e.g. non-string keys or integers beyond 64 bits
+            pass
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+# --- Files ---
+
+def compression_of(path: str) -> str:
+    """Compression implied by a file name: 'zstd', 'gzip' or None"""
+    return COMPRESSION_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+
+def detect_compression(path: str) -> str:
+    """Compression of an existing file from its magic bytes: 'zstd', 'gzip' or None"""
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    if head.startswith(ZSTD_MAGIC):
+        return 'zstd'
+    if head.startswith(GZIP_MAGIC):
+        return 'gzip'
+    return None
+
+
+def is_jsonl(path: str) -> bool:
+    """Whether a file name denotes JSON lines (after any compression extension)"""
+    base = path
+    if compression_of(base):
+        base = os.path.splitext(base)[0]
+    return os.path.splitext(base)[1].lower() in JSONL_EXTENSIONS
+
+
+def temp_path_for(path: str) -> str:
+    """Temporary sibling of path to write and then os.replace; keeps the extension"""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".tmp-{os.getpid()}-{name}")
+
+
+def open_text(path: str, mode: str = 'r'):
+    """
+    Open a possibly compressed file as UTF-8 text.
+    
+    Args:
+        path: File path
+        mode: 'r' (compression detected from content) or 'w' (from the extension)
+    """
+    if mode not in ('r', 'w'):
+        raise ValueError(f"mode must be 'r' or 'w', not {mode!r}")
+    compression = detect_compression(path) if mode == 'r' else compression_of(path)
+    
+    if compression == 'zstd':
+        _require_zstd(f"{'Reading' if mode == 'r' else 'Writing'} {path}")
+        if mode == 'r':
+            return zstandard.open(path, 'rt', encoding='utf-8')
+        return zstandard.open(path, 'wt', encoding='utf-8', cctx=zstandard.ZstdCompressor(level=ZSTD_LEVEL))
+    if compression == 'gzip':
+        return gzip.open(path, mode + 't', encoding='utf-8', compresslevel=ZLIB_LEVEL)
+    return open(path, mode, encoding='utf-8')
+
+
+def iter_records(path: str) -> Iterator:
+    """
+    Yield the records of a dataset file one at a time.
+    
+    JSON lines files are streamed; a JSON file must hold a list and is
+    decoded whole.
+    """
+    with open_text(path) as f:
+        if is_jsonl(path):
+            for line in f:
+                if line.strip():
+                    yield loads(line)
+            return
+        data = loads(f.read())
+    if not isinstance(data, list):
+        raise ValueError(f"{path} does not hold a list of records")
+    yield from data
+
+
+def load_records(path: str) -> List:
+    """All records of a dataset file (JSON list or JSON lines, optionally compressed)"""
+    return list(iter_records(path))
+
+
+def write_records(records: Iterable, path: str, indent: int = 2, ensure_ascii: bool = True):
+    """
+    Write records as a JSON list or as JSON lines, as the file name says.
+    
+    Args:
+        records: Records to write (consumed once, so a generator works for JSON lines)
+        path: Output file; e.g. .json, .jsonl, .jsonl.zst, .json.gz
+        indent: Indentation of a JSON list (ignored for JSON lines)
+        ensure_ascii: Escape non-ASCII characters in a JSON list
+    """
+    with open_text(path, 'w') as f:
+        if is_jsonl(path):
+            for record in records:
+                f.write(dumps_line(record))
+                f.write('\n')
+        else:
+            json.dump(list(records), f, indent=indent, ensure_ascii=ensure_ascii)
+
+
+def write_json(data, path: str, indent: int = 2):
+    """Write one JSON document, compressed if the file name says so"""
+    with open_text(path, 'w') as f:
+        json.dump(data, f, indent=indent)
+
+
+def load_json(path: str):
+    """Read one JSON document from a possibly compressed file"""
+    with open_text(path) as f:
+        return loads(f.read())
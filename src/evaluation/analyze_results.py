@@ -1,25 +1,129 @@
 """
 Analyze benchmark results and generate comparison reports
+
+Figures are drawn with matplotlib's object-oriented API (Figure + Agg
+canvas), never through pyplot's global state, so the report's figures can
+be rendered in parallel worker processes.
 """
 
+import hashlib
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List
 import pandas as pd
-import matplotlib.pyplot as plt
 import seaborn as sns
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from sklearn.metrics import confusion_matrix, classification_report
 
+from .results_io import is_error, is_skipped, load_results
+
+
+VALIDITY_LABELS = [1, 2, 3, 4, 5, 6]
+VALIDITY_NAMES = [f'V{i}' for i in VALIDITY_LABELS]
+DPI = 300
+
+# Bump when a renderer's output changes, to invalidate cached figures
+RENDER_VERSION = 1
+RENDER_CACHE_FILE = ".render_cache.json"
+
+
+def _new_figure(figsize, interactive: bool = False):
+    """A Figure with an Agg canvas, or a pyplot-managed one for plt.show()"""
+    if interactive:
+        import matplotlib.pyplot as plt
+        return plt.figure(figsize=figsize)
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _draw_comparison(fig, model_names: List[str], accuracies: List[float],
+                     validity_data: List[List[float]]):
+    ax1, ax2 = fig.subplots(1, 2)
+    
+    # Overall accuracy comparison
+    ax1.bar(model_names, accuracies, color='skyblue')
+    ax1.set_ylabel('Accuracy')
+    ax1.set_title('Overall Model Accuracy Comparison')
+    ax1.set_ylim(0, 1)
+    for i, v in enumerate(accuracies):
+        ax1.text(i, v + 0.02, f'{v:.1%}', ha='center')
+    
+    # Per-validity accuracy heatmap
+    sns.heatmap(validity_data, annot=True, fmt='.1%', cmap='YlGnBu',
+                xticklabels=VALIDITY_NAMES, yticklabels=model_names, ax=ax2)
+    ax2.set_title('Per-Validity-Rating Accuracy')
+    
+    fig.tight_layout()
+
+
+def render_comparison(output_file: str, model_names: List[str], accuracies: List[float],
+                      validity_data: List[List[float]]) -> str:
+    """Render the model comparison figure to a file (runs in a worker process)"""
+    fig = _new_figure((15, 6))
+    _draw_comparison(fig, model_names, accuracies, validity_data)
+    fig.savefig(output_file, dpi=DPI, bbox_inches='tight')
+    return ''
+
+
+def render_confusion_matrix(output_file: str, model_name: str, y_true: List[int],
+                            y_pred: List[int]) -> str:
+    """
+    Render one model's confusion matrix to a file (runs in a worker process).
+    
+    Returns:
+        The model's classification report text
+    """
+    cm = confusion_matrix(y_true, y_pred, labels=VALIDITY_LABELS)
+    
+    fig = _new_figure((10, 8))
+    ax = fig.subplots()
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues',
+                xticklabels=VALIDITY_NAMES, yticklabels=VALIDITY_NAMES, ax=ax)
+    ax.set_title(f'Confusion Matrix: {model_name}')
+    ax.set_ylabel('True Validity Rating')
+    ax.set_xlabel('Predicted Validity Rating')
+    fig.tight_layout()
+    fig.savefig(output_file, dpi=DPI, bbox_inches='tight')
+    
+    return classification_report(y_true, y_pred, labels=VALIDITY_LABELS,
+                                 target_names=VALIDITY_NAMES, zero_division=0)
+
+
+def _input_hash(renderer, args: tuple) -> str:
+    """Hash of everything that determines a rendered artifact"""
+    payload = json.dumps([renderer.__name__, RENDER_VERSION, DPI, args[1:]], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
 
 class ResultsAnalyzer:
     """Analyze and visualize benchmark results"""
     
     def __init__(self, results_file: str):
-        with open(results_file, 'r') as f:
-            self.results = json.load(f)
+        self.results = load_results(results_file)
+        
+        # Cases skipped (cancelled run, open circuit) or whose request failed were never
+        # answered; leave them out rather than count them as wrong
+        skipped = errored = 0
+        for model_name, model_results in self.results.items():
+            answered = []
+            for r in model_results:
+                if is_skipped(r):
+                    skipped += 1
+                elif is_error(r):
+                    errored += 1
+                else:
+                    answered.append(r)
+            self.results[model_name] = answered
         
         self.models = list(self.results.keys())
         print(f"📊 Loaded results for {len(self.models)} models")
+        if skipped:
+            print(f"⏹️  Ignoring {skipped} skipped cases (cancelled run or open circuit)")
+        if errored:
+            print(f"⚠️  Ignoring {errored} cases whose request failed")
     
     def generate_comparison_table(self) -> pd.DataFrame:
         """Generate model comparison table"""
@@ -51,11 +155,8 @@ class ResultsAnalyzer:
         df = pd.DataFrame(comparison_data)
         return df
     
-    def plot_model_comparison(self, output_file: str = None):
-        """Plot model comparison chart"""
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
-        
-        # Overall accuracy comparison
+    def _comparison_data(self):
+        """Model names, overall accuracies and per-validity accuracies"""
         accuracies = []
         model_names = []
         for model_name, model_results in self.results.items():
@@ -64,14 +165,7 @@ class ResultsAnalyzer:
             accuracies.append(correct / total if total > 0 else 0)
             model_names.append(model_name)
         
-        ax1.bar(model_names, accuracies, color='skyblue')
-        ax1.set_ylabel('Accuracy')
-        ax1.set_title('Overall Model Accuracy Comparison')
-        ax1.set_ylim(0, 1)
-        for i, v in enumerate(accuracies):
-            ax1.text(i, v + 0.02, f'{v:.1%}', ha='center')
-        
-        # Per-validity accuracy heatmap
+        # Per-validity accuracy
         validity_data = []
         for model_name in model_names:
             model_results = self.results[model_name]
@@ -85,50 +179,114 @@ class ResultsAnalyzer:
                     row.append(0)
             validity_data.append(row)
         
-        sns.heatmap(validity_data, annot=True, fmt='.1%', cmap='YlGnBu',
-                    xticklabels=[f'V{i}' for i in range(1, 7)],
-                    yticklabels=model_names, ax=ax2)
-        ax2.set_title('Per-Validity-Rating Accuracy')
-        
-        plt.tight_layout()
-        
+        return model_names, accuracies, validity_data
+    
+    def _validity_labels(self, model_name: str):
+        """Expected and predicted validity ratings (unparsed predictions as 0)"""
+        model_results = self.results[model_name]
+        y_true = [r['expected_validity'] for r in model_results]
+        y_pred = [r['predicted_validity'] if r['predicted_validity'] else 0 
+                  for r in model_results]
+        return y_true, y_pred
+    
+    def plot_model_comparison(self, output_file: str = None):
+        """Plot model comparison chart"""
         if output_file:
-            plt.savefig(output_file, dpi=300, bbox_inches='tight')
+            render_comparison(output_file, *self._comparison_data())
             print(f"📈 Plot saved to: {output_file}")
         else:
+            import matplotlib.pyplot as plt
+            _draw_comparison(_new_figure((15, 6), interactive=True), *self._comparison_data())
             plt.show()
     
-    def generate_confusion_matrices(self, model_name: str):
+    def generate_confusion_matrices(self, model_name: str, output_dir: str = "results"):
         """Generate confusion matrix for a specific model"""
-        model_results = self.results[model_name]
+        output_file = os.path.join(output_dir, f"confusion_matrix_{model_name}.png")
+        report = render_confusion_matrix(output_file, model_name, *self._validity_labels(model_name))
+        print(f"📊 Confusion matrix saved to: {output_file}")
         
-        y_true = [r['expected_validity'] for r in model_results]
-        y_pred = [r['predicted_validity'] if r['predicted_validity'] else 0 
-                  for r in model_results]
+        # Print classification report
+        print(f"\n📋 Classification Report for {model_name}:")
+        print(report)
+    
+    def render_figures(self, output_dir: str = "results", max_workers: int = None,
+                       force: bool = False) -> Dict[str, str]:
+        """
+        Render the comparison plot and every confusion matrix in parallel.
         
-        cm = confusion_matrix(y_true, y_pred, labels=[1, 2, 3, 4, 5, 6])
+        A figure is skipped when its file exists and the hash of its input
+        data matches the one recorded when it was last rendered (in
+        RENDER_CACHE_FILE in output_dir).
         
-        plt.figure(figsize=(10, 8))
-        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues',
-                    xticklabels=[f'V{i}' for i in range(1, 7)],
-                    yticklabels=[f'V{i}' for i in range(1, 7)])
-        plt.title(f'Confusion Matrix: {model_name}')
-        plt.ylabel('True Validity Rating')
-        plt.xlabel('Predicted Validity Rating')
-        plt.tight_layout()
+        Args:
+            output_dir: Directory for the PNG files
+            max_workers: Worker processes (default: one per CPU, capped at the
+                number of figures; 1 renders in this process)
+            force: Re-render everything
         
-        output_file = f"results/confusion_matrix_{model_name}.png"
-        plt.savefig(output_file, dpi=300, bbox_inches='tight')
-        print(f"📊 Confusion matrix saved to: {output_file}")
+        Returns:
+            Classification report text by model name
+        """
+        jobs = [(render_comparison, (os.path.join(output_dir, "model_comparison.png"),
+                                     *self._comparison_data()))]
+        for model_name in self.models:
+            jobs.append((render_confusion_matrix, (
+                os.path.join(output_dir, f"confusion_matrix_{model_name}.png"),
+                model_name, *self._validity_labels(model_name)
+            )))
         
-        # Print classification report
-        print(f"\n📋 Classification Report for {model_name}:")
-        print(classification_report(y_true, y_pred, 
-                                   labels=[1, 2, 3, 4, 5, 6],
-                                   target_names=[f'V{i}' for i in range(1, 7)]))
+        cache_path = os.path.join(output_dir, RENDER_CACHE_FILE)
+        cache = {}
+        if os.path.exists(cache_path) and not force:
+            with open(cache_path, 'r') as f:
+                cache = json.load(f)
+        
+        outputs = {}
+        pending = []
+        for renderer, args in jobs:
+            output_file = args[0]
+            name = os.path.basename(output_file)
+            digest = _input_hash(renderer, args)
+            cached = cache.get(name)
+            if cached and cached['hash'] == digest and os.path.exists(output_file):
+                outputs[output_file] = cached['output']
+            else:
+                pending.append((renderer, args, name, digest))
+        
+        if pending:
+            workers = min(max_workers or os.cpu_count() or 1, len(pending))
+            if workers > 1:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = [pool.submit(renderer, *args) for renderer, args, _, _ in pending]
+                    rendered = [future.result() for future in futures]
+            else:
+                rendered = [renderer(*args) for renderer, args, _, _ in pending]
+            
+            for (renderer, args, name, digest), output in zip(pending, rendered):
+                outputs[args[0]] = output
+                cache[name] = {'hash': digest, 'output': output}
+            with open(cache_path, 'w') as f:
+                json.dump(cache, f, indent=2)
+        
+        print(f"🖼️  Rendered {len(pending)} figures, {len(jobs) - len(pending)} unchanged")
+        for output_file in outputs:
+            print(f"📈 Saved: {output_file}")
+        
+        return {
+            args[1]: outputs[args[0]]
+            for renderer, args in jobs if renderer is render_confusion_matrix
+        }
     
-    def generate_full_report(self, output_dir: str = "results"):
-        """Generate complete analysis report"""
+    def generate_full_report(self, output_dir: str = "results", max_workers: int = None,
+                             force: bool = False):
+        """
+        Generate complete analysis report
+        
+        Args:
+            output_dir: Directory for the table and figures
+            max_workers: Processes rendering figures (see render_figures)
+            force: Re-render figures whose input data has not changed
+        """
         os.makedirs(output_dir, exist_ok=True)
         
         print("\n" + "="*60)
@@ -145,13 +303,12 @@ class ResultsAnalyzer:
         df.to_csv(csv_file, index=False)
         print(f"\n💾 Table saved to: {csv_file}")
         
-        # Comparison plot
-        plot_file = os.path.join(output_dir, "model_comparison.png")
-        self.plot_model_comparison(plot_file)
+        # Comparison plot and confusion matrices, rendered in parallel
+        reports = self.render_figures(output_dir, max_workers, force)
         
-        # Confusion matrices for each model
         for model_name in self.models:
-            self.generate_confusion_matrices(model_name)
+            print(f"\n📋 Classification Report for {model_name}:")
+            print(reports[model_name])
 
 
 if __name__ == "__main__":
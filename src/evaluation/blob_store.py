@@ -0,0 +1,292 @@
+"""
+Content-addressed store for the response text of result rows
+
+Nearly all of a results file is response text: every row carries the raw
+model response plus the reasoning parsed out of it, and reruns or repeated
+models store the same responses again. With a blob store, a row keeps only
+a reference to its response:
+
+    "raw_response_ref": "sha256:9f2c..."
+
+The text is stored once per distinct response, compressed, in a single
+SQLite file (blobs.sqlite next to the results). reasoning is dropped from
+the row whenever it is exactly what the parser derives from the response,
+and rebuilt on load; rows where it is not (errors, self-consistency votes)
+keep it. Unpacking a row restores the original keys, values and key order.
+
+    python -m src.evaluation.run_benchmark --blobs
+    python -m src.evaluation.blob_store pack results/evaluation_results_X.json
+    python -m src.evaluation.blob_store unpack results/evaluation_results_X.packed.json
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable
+
+from ..models.streaming import IncrementalResponseParser
+from ..models.structured import StructuredOutputError, parse_structured_text
+from .. import data_io
+from .results_io import iter_models, open_results_writer
+
+
+BLOB_FILE = "blobs.sqlite"
+REF_FIELD = 'raw_response_ref'
+REF_PREFIX = 'sha256:'
+
+
+def text_ref(text: str) -> str:
+    """Reference (content hash) of a text"""
+    return REF_PREFIX + hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def derive_reasoning(raw_response: str) -> str:
+    """
+    The reasoning BaseModel.parse_response extracts from a raw response.
+    
+    JSON responses (structured output mode) are parsed as such, everything
+    else with the free-text parser.
+    """
+    if raw_response.lstrip().startswith(('{', '```')):
+        try:
+            return parse_structured_text(raw_response)['reasoning']
+        except (StructuredOutputError, KeyError, TypeError):
+            pass
+    parser = IncrementalResponseParser()
+    for line in raw_response.split('\n'):
+        parser.feed_line(line)
+    return parser.reasoning.strip()
+
+
+class BlobStore:
+    """Compressed texts keyed by their sha256, in one SQLite file"""
+    
+    def __init__(self, path: str, codec: str = None, cache_size: int = 256):
+        """
+        Args:
+            path: SQLite file (created if missing)
+            codec: Compression codec for new blobs (default: zstd if available, else zlib)
+            cache_size: Number of decoded texts kept in memory
+        """
+        self.path = path
+        self.codec = codec or data_io.default_codec()
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            "ref TEXT PRIMARY KEY, codec TEXT NOT NULL, size INTEGER NOT NULL, data BLOB NOT NULL)"
+        )
+        self._conn.commit()
+    
+    def put(self, text: str) -> str:
+        """Store a text (no-op if already stored); returns its reference"""
+        return self.put_many([text])[0]
+    
+    def put_many(self, texts: Iterable[str]) -> list:
+        """Store several texts in one transaction; returns their references"""
+        refs = []
+        new = {}
+        for text in texts:
+            ref = text_ref(text)
+            refs.append(ref)
+            if ref not in new:
+                new[ref] = text
+        with self._lock:
+            known = set()
+            batch = list(new)
+            for i in range(0, len(batch), 500):
+                chunk = batch[i:i + 500]
+                known.update(row[0] for row in self._conn.execute(
+                    f"SELECT ref FROM blobs WHERE ref IN ({','.join('?' * len(chunk))})", chunk))
+            rows = []
+            for ref, text in new.items():
+                if ref in known:
+                    continue
+                data = text.encode('utf-8')
+                codec, compressed = data_io.compress(data, self.codec)
+                rows.append((ref, codec, len(data), compressed))
+            if rows:
+                with self._conn:
+                    self._conn.executemany("INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?)", rows)
+        return refs
+    
+    def get(self, ref: str) -> str:
+        """
+        Text of a reference.
+        
+        Raises:
+            KeyError: If the store has no blob for it
+        """
+        with self._lock:
+            text = self._cache.get(ref)
+            if text is not None:
+                self._cache.move_to_end(ref)
+                return text
+            row = self._conn.execute("SELECT codec, data FROM blobs WHERE ref = ?", (ref,)).fetchone()
+        if row is None:
+            raise KeyError(f"No blob {ref} in {self.path}")
+        text = data_io.decompress(row[0], row[1]).decode('utf-8')
+        with self._lock:
+            self._cache[ref] = text
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return text
+    
+    def __contains__(self, ref: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM blobs WHERE ref = ?", (ref,)).fetchone() is not None
+    
+    def stats(self) -> Dict:
+        """Blob count, and total text and stored (compressed) bytes"""
+        with self._lock:
+            count, size, stored = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM blobs"
+            ).fetchone()
+        return {'blobs': count, 'text_bytes': size, 'stored_bytes': stored}
+    
+    def close(self):
+        self._conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def pack_rows(self, rows: Iterable[Dict]) -> list:
+        """
+        Replace raw_response with a reference in each row.
+        
+        reasoning is left out when it equals derive_reasoning(raw_response).
+        Rows without a string raw_response are returned unchanged.
+        """
+        rows = list(rows)
+        texts = [row['raw_response'] for row in rows if type(row.get('raw_response')) is str]
+        refs = iter(self.put_many(texts))
+        
+        packed_rows = []
+        for row in rows:
+            raw_response = row.get('raw_response')
+            if type(raw_response) is not str:
+                packed_rows.append(row)
+                continue
+            ref = next(refs)
+            drop_reasoning = 'reasoning' in row and row['reasoning'] == derive_reasoning(raw_response)
+            packed = {}
+            for key, value in row.items():
+                if key == 'reasoning' and drop_reasoning:
+                    continue
+                if key == 'raw_response':
+                    packed[REF_FIELD] = ref
+                else:
+                    packed[key] = value
+            packed_rows.append(packed)
+        return packed_rows
+    
+    def unpack_row(self, row: Dict) -> Dict:
+        """Rebuild the row pack_rows was given (unpacked rows pass through)"""
+        ref = row.get(REF_FIELD)
+        if ref is None:
+            return row
+        raw_response = self.get(ref)
+        
+        unpacked = {}
+        for key, value in row.items():
+            if key == REF_FIELD:
+                # reasoning, when dropped, came right before raw_response
+                if 'reasoning' not in row:
+                    unpacked['reasoning'] = derive_reasoning(raw_response)
+                unpacked['raw_response'] = raw_response
+            else:
+                unpacked[key] = value
+        return unpacked
+
+
+def is_packed(path: str) -> bool:
+    """Whether the first row of a results file references a blob store"""
+    for _, rows in iter_models(path):
+        for row in rows:
+            return REF_FIELD in row
+    return False
+
+
+def _convert(input_path: str, output_path: str, convert_rows, batch_size: int = 1000):
+    """Stream a results file through convert_rows in batches"""
+    tmp_path = data_io.temp_path_for(output_path)
+    try:
+        f, writer = open_results_writer(tmp_path)
+        with f:
+            for model_name, rows in iter_models(input_path):
+                writer.start_model(model_name)
+                batch = []
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        for converted in convert_rows(batch):
+                            writer.write_row(converted)
+                        batch = []
+                for converted in convert_rows(batch):
+                    writer.write_row(converted)
+            writer.close()
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def pack_results(input_path: str, output_path: str, store: BlobStore):
+    """Write a copy of a results file with its responses moved into store"""
+    _convert(input_path, output_path, store.pack_rows)
+
+
+def unpack_results(input_path: str, output_path: str, store: BlobStore):
+    """Write a copy of a packed results file with the responses inlined again"""
+    _convert(input_path, output_path, lambda rows: [store.unpack_row(row) for row in rows])
+
+
+def _default_output(path: str, suffix: str) -> str:
+    base, ext = os.path.splitext(path)
+    if data_io.compression_of(path):
+        base, inner = os.path.splitext(base)
+        ext = inner + ext
+    if base.endswith('.packed'):
+        base = base[:-len('.packed')]
+    return f"{base}{suffix}{ext}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move result response text into a blob store and back")
+    parser.add_argument("command", choices=["pack", "unpack", "stats"])
+    parser.add_argument("results", nargs="?", help="Results file (pack/unpack)")
+    parser.add_argument("-o", "--output", help="Output file (default: <name>.packed.json / <name>.json)")
+    parser.add_argument("--store", help=f"Blob store file (default: {BLOB_FILE} next to the results)")
+    args = parser.parse_args(argv)
+    
+    if args.command != "stats" and not args.results:
+        parser.error(f"{args.command} needs a results file")
+    store_path = args.store or os.path.join(os.path.dirname(args.results or '') or '.', BLOB_FILE)
+    
+    with BlobStore(store_path) as store:
+        if args.command == "pack":
+            output = args.output or _default_output(args.results, '.packed')
+            pack_results(args.results, output, store)
+            before, after = os.path.getsize(args.results), os.path.getsize(output)
+            print(f"📦 Packed {args.results} ({before / 1e6:.1f} MB) into {output} ({after / 1e6:.1f} MB)")
+        elif args.command == "unpack":
+            output = args.output or _default_output(args.results, '')
+            if os.path.abspath(output) == os.path.abspath(args.results):
+                parser.error("pass -o; the default output would overwrite the input")
+            unpack_results(args.results, output, store)
+            print(f"📂 Unpacked {args.results} into {output}")
+        stats = store.stats()
+        print(f"🗄️  {store_path}: {stats['blobs']} blobs, {stats['text_bytes'] / 1e6:.1f} MB of text "
+              f"stored in {stats['stored_bytes'] / 1e6:.1f} MB ({store.codec})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Per-case diff between two evaluation runs
+
+Both results files are joined on (model, test_case_id): run A is read once
+into a hash table of compact per-case tuples, then run B is streamed past it
+row by row. Neither file is loaded whole, so runs with hundreds of
+thousands of rows diff in bounded memory.
+
+For every model the diff reports validity, reliability and strict
+correctness flips (fixed / broken), validity rating transitions, cases that
+started or stopped erroring, and the same counts per category. As in the
+run metrics, a case whose request failed is not a wrong answer: accuracy is
+over each run's answered cases, errored cases are counted separately, and
+flips only compare cases answered in both runs.
+
+    python -m src.evaluation.diff_runs results/evaluation_results_A.json results/evaluation_results_B.json
+    python -m src.evaluation.diff_runs A.json B.json --json diff.json --cases changed_cases.jsonl
+"""
+
+import argparse
+import json
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Optional
+
+from .results_io import is_error, is_skipped, iter_results
+
+
+def _compact(row: Dict) -> tuple:
+    """The fields the diff needs, as a small tuple (the build side of the join)"""
+    return (
+        row.get('category'),
+        row.get('predicted_validity'),
+        tuple(row.get('predicted_reliability') or ()),
+        bool(row.get('validity_correct')),
+        bool(row.get('reliability_correct')),
+        bool(row.get('correct')),
+        is_error(row),
+    )
+
+
+_CATEGORY, _VALIDITY, _RELIABILITY, _VALIDITY_OK, _RELIABILITY_OK, _CORRECT, _ERROR = range(7)
+# Correctness flags compared between runs, by report name
+_FLIP_INDEX = {'validity': _VALIDITY_OK, 'reliability': _RELIABILITY_OK, 'correct': _CORRECT}
+
+
+class _ModelDiff:
+    """Running diff counters for one model"""
+    
+    def __init__(self):
+        self.matched = 0
+        self.only_a = 0
+        self.only_b = 0
+        self.correct_a = 0
+        self.correct_b = 0
+        self.errored_a = 0
+        self.errored_b = 0
+        self.flips = {name: Counter() for name in _FLIP_INDEX}
+        self.transitions = Counter()
+        self.reliability_changed = 0
+        self.new_errors = 0
+        self.resolved_errors = 0
+        self.categories = defaultdict(Counter)
+    
+    def add(self, a: tuple, b: tuple) -> Dict:
+        """Count one matched case; returns its changes (empty if none)"""
+        self.matched += 1
+        category = self.categories[b[_CATEGORY]]
+        category['matched'] += 1
+        # Errored cases are left out of accuracy, like in the run metrics
+        if a[_ERROR]:
+            self.errored_a += 1
+            category['errored_a'] += 1
+        else:
+            self.correct_a += a[_CORRECT]
+            category['correct_a'] += a[_CORRECT]
+        if b[_ERROR]:
+            self.errored_b += 1
+            category['errored_b'] += 1
+        else:
+            self.correct_b += b[_CORRECT]
+            category['correct_b'] += b[_CORRECT]
+        
+        changes = {}
+        if not a[_ERROR] and not b[_ERROR]:
+            for name, index in _FLIP_INDEX.items():
+                if a[index] != b[index]:
+                    direction = 'fixed' if b[index] else 'broken'
+                    self.flips[name][direction] += 1
+                    changes[name] = direction
+        if 'correct' in changes:
+            category[changes['correct']] += 1
+        
+        if a[_VALIDITY] != b[_VALIDITY]:
+            self.transitions[(a[_VALIDITY], b[_VALIDITY])] += 1
+            changes['validity_transition'] = [a[_VALIDITY], b[_VALIDITY]]
+        if a[_RELIABILITY] != b[_RELIABILITY]:
+            self.reliability_changed += 1
+            changes['reliability_transition'] = [list(a[_RELIABILITY]), list(b[_RELIABILITY])]
+        
+        if b[_ERROR] and not a[_ERROR]:
+            self.new_errors += 1
+            category['new_errors'] += 1
+            changes['error'] = 'new'
+        elif a[_ERROR] and not b[_ERROR]:
+            self.resolved_errors += 1
+            category['resolved_errors'] += 1
+            changes['error'] = 'resolved'
+        return changes
+    
+    def summary(self) -> Dict:
+        def accuracy(correct, total):
+            return correct / total if total else 0.0
+        
+        return {
+            'matched': self.matched,
+            'only_in_a': self.only_a,
+            'only_in_b': self.only_b,
+            'accuracy_a': accuracy(self.correct_a, self.matched - self.errored_a),
+            'accuracy_b': accuracy(self.correct_b, self.matched - self.errored_b),
+            'errored_a': self.errored_a,
+            'errored_b': self.errored_b,
+            'flips': {name: {'fixed': counts['fixed'], 'broken': counts['broken']}
+                      for name, counts in self.flips.items()},
+            'validity_transitions': {
+                f"{before}->{after}": count
+                for (before, after), count in sorted(self.transitions.items(), key=lambda item: -item[1])
+            },
+            'reliability_changed': self.reliability_changed,
+            'new_errors': self.new_errors,
+            'resolved_errors': self.resolved_errors,
+            'categories': {
+                name: {
+                    'matched': counts['matched'],
+                    'accuracy_a': accuracy(counts['correct_a'], counts['matched'] - counts['errored_a']),
+                    'accuracy_b': accuracy(counts['correct_b'], counts['matched'] - counts['errored_b']),
+                    'errored_a': counts['errored_a'],
+                    'errored_b': counts['errored_b'],
+                    'fixed': counts['fixed'],
+                    'broken': counts['broken'],
+                    'new_errors': counts['new_errors'],
+                    'resolved_errors': counts['resolved_errors'],
+                }
+                for name, counts in sorted(self.categories.items(), key=lambda item: str(item[0]))
+            },
+        }
+
+
+def _keyed(path: str):
+    """
+    (model, test_case_id, occurrence) and row for each row of a results file.
+    
+    The occurrence number keeps repeated test case ids within a model apart.
+    Skipped cases (cancelled run, open circuit) are left out, so they show
+    up as only in the other run rather than as errors.
+    """
+    seen = Counter()
+    for model_name, row in iter_results(path):
+        case_id = row['test_case_id']
+        occurrence = seen[(model_name, case_id)]
+        seen[(model_name, case_id)] += 1
+        if is_skipped(row):
+            continue
+        yield (model_name, case_id, occurrence), row
+
+
+def diff_runs(path_a: str, path_b: str, on_change: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Diff two results files case by case.
+    
+    Args:
+        path_a: Baseline results file (build side of the join)
+        path_b: New results file (streamed)
+        on_change: Called with a dict for every matched case that changed
+    
+    Returns:
+        Summary per model name (see _ModelDiff.summary)
+    """
+    index = {key: _compact(row) for key, row in _keyed(path_a)}
+    
+    models = defaultdict(_ModelDiff)
+    for key, row in _keyed(path_b):
+        model_name, case_id, _ = key
+        diff = models[model_name]
+        a = index.pop(key, None)
+        if a is None:
+            diff.only_b += 1
+            continue
+        changes = diff.add(a, _compact(row))
+        if changes and on_change:
+            on_change({'model': model_name, 'test_case_id': case_id,
+                       'category': row.get('category'), **changes})
+    
+    # Whatever is left in the index was not in run B
+    for model_name, _, _ in index:
+        models[model_name].only_a += 1
+    
+    return {model_name: diff.summary() for model_name, diff in models.items()}
+
+
+def print_diff(summary: Dict):
+    """Print a run diff summary"""
+    for model_name, diff in summary.items():
+        print(f"\n{'='*60}")
+        print(f"🔀 {model_name}: {diff['matched']} cases matched"
+              f" ({diff['only_in_a']} only in A, {diff['only_in_b']} only in B)")
+        print(f"{'='*60}")
+        print(f"  Accuracy: {diff['accuracy_a']:.1%} → {diff['accuracy_b']:.1%} "
+              f"(errored cases not scored: {diff['errored_a']} in A, {diff['errored_b']} in B)")
+        for name, flips in diff['flips'].items():
+            print(f"  {name.capitalize():<12} ✅ {flips['fixed']} fixed   ❌ {flips['broken']} broken")
+        print(f"  Errors:      {diff['new_errors']} new, {diff['resolved_errors']} resolved")
+        print(f"  Reliability scores changed in {diff['reliability_changed']} cases")
+        
+        if diff['validity_transitions']:
+            print("\n  Validity transitions (A->B):")
+            for transition, count in list(diff['validity_transitions'].items())[:10]:
+                print(f"    {transition:<12} {count}")
+        
+        if diff['categories']:
+            width = max(len(str(category)) for category in diff['categories'])
+            print("\n  By category:")
+            print(f"    {'category':<{width}} {'n':>6} {'acc A':>7} {'acc B':>7} {'fixed':>6} {'broken':>6} {'errors':>6}")
+            for category, counts in diff['categories'].items():
+                print(f"    {str(category):<{width}} {counts['matched']:>6} {counts['accuracy_a']:>7.1%} "
+                      f"{counts['accuracy_b']:>7.1%} {counts['fixed']:>6} {counts['broken']:>6} "
+                      f"{counts['new_errors']:>6}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff two evaluation results files case by case")
+    parser.add_argument("run_a", help="Baseline results file")
+    parser.add_argument("run_b", help="New results file")
+    parser.add_argument("--json", dest="json_path", help="Write the summary as JSON")
+    parser.add_argument("--cases", help="Write every changed case as JSON lines")
+    args = parser.parse_args(argv)
+    
+    cases_file = open(args.cases, 'w') if args.cases else None
+    try:
+        on_change = (lambda change: cases_file.write(json.dumps(change) + '\n')) if cases_file else None
+        summary = diff_runs(args.run_a, args.run_b, on_change)
+    finally:
+        if cases_file:
+            cases_file.close()
+    
+    print_diff(summary)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"\n💾 Diff saved to: {args.json_path}")
+    if args.cases:
+        print(f"💾 Changed cases saved to: {args.cases}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Distributed evaluation: a coordinator and workers sharing a work queue
+
+The coordinator enqueues one work item per (model, test case), watches the
+queue, returns items leased by dead workers (leases that stopped being
+renewed) to pending, and finally merges the results into the usual
+{model: [results]} output with metrics, in dataset order.
+
+Workers can run in any number of processes or on several machines that
+can reach the queue. Each one leases an item, evaluates it with the
+configured model, and stores the scored result; a background thread
+renews the worker's leases while a request is in flight. A worker that
+cannot build a model (e.g. its API key is not set there) hands the item
+back and leaves that model to other workers; an item whose evaluation
+keeps failing is dead-lettered after --max-attempts and merged as an
+errored case.
+
+    python -m src.evaluation.distributed coordinator --queue sqlite:///runs/queue.db \\
+        --dataset datasets/triangulation_benchmark_v1.json --models gpt-4o,gpt-4o-mini
+    python -m src.evaluation.distributed worker --queue sqlite:///runs/queue.db \\
+        --dataset datasets/triangulation_benchmark_v1.json
+"""
+
+import argparse
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, List
+
+from .run_benchmark import RESULTS_FORMATS, BenchmarkEvaluator
+from .work_queue import MAX_ATTEMPTS, WorkItem, WorkQueue, open_queue
+
+
+def default_worker_id() -> str:
+    """hostname-pid-random, unique across machines and restarts"""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class Coordinator:
+    """Fills the queue, reassigns work from dead workers and merges results"""
+    
+    def __init__(self, evaluator: BenchmarkEvaluator, queue: WorkQueue):
+        """
+        Args:
+            evaluator: Provides the dataset, metrics and save_results
+            queue: Shared work queue
+        """
+        self.evaluator = evaluator
+        self.queue = queue
+        self.model_names = []
+        self.start = None
+    
+    def submit(self, model_names: List[str]):
+        """Enqueue every test case for every model (re-submitting is a no-op)"""
+        self.model_names = list(model_names)
+        self.start = time.perf_counter()
+        self.queue.enqueue([
+            (model_name, test_case, position)
+            for model_name in self.model_names
+            for position, test_case in enumerate(self.evaluator.dataset)
+        ])
+        total = len(self.model_names) * len(self.evaluator.dataset)
+        print(f"📤 Queued {total} work items ({len(self.model_names)} models × "
+              f"{len(self.evaluator.dataset)} test cases)")
+    
+    def wait(self, poll_s: float = 2.0, timeout: float = None) -> bool:
+        """
+        Block until every item is done, reassigning expired leases.
+        
+        Returns:
+            True when all items are done, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        last = None
+        while True:
+            released = self.queue.release_expired()
+            if released:
+                print(f"♻️  Reassigned {released} items from unresponsive workers")
+            counts = self.queue.counts()
+            if counts != last:
+                print(f"⏳ pending {counts['pending']}, leased {counts['leased']}, done {counts['done']}, "
+                      f"dead {counts.get('dead', 0)}")
+                last = counts
+            if counts['pending'] == 0 and counts['leased'] == 0:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_s)
+    
+    def collect(self) -> Dict[str, List[Dict]]:
+        """
+        Merge stored results into {model: [results]} in dataset order and
+        compute each model's metrics (kept in evaluator.metrics for save_results).
+        """
+        by_model = {model_name: {} for model_name in self.model_names}
+        for model_name, position, result in self.queue.results():
+            if model_name in by_model:
+                by_model[model_name][position] = result
+        
+        wall_time = time.perf_counter() - self.start if self.start else None
+        results = {}
+        for model_name, rows in by_model.items():
+            missing = len(self.evaluator.dataset) - len(rows)
+            if missing:
+                print(f"⚠️  {model_name}: {missing} test cases have no result yet")
+            results[model_name] = [rows[position] for position in sorted(rows)]
+            if not results[model_name]:
+                continue
+            self.evaluator._report_metrics(model_name, results[model_name], wall_time)
+        return results
+
+
+class Worker:
+    """Leases work items and evaluates them until the queue is drained"""
+    
+    def __init__(self, evaluator: BenchmarkEvaluator, queue: WorkQueue,
+                 worker_id: str = None, lease_s: float = 60.0):
+        """
+        Args:
+            evaluator: Provides the models and scoring
+            queue: Shared work queue
+            worker_id: Unique worker name (default: hostname-pid-random)
+            lease_s: Lease length; renewed every lease_s / 3 while working
+        """
+        self.evaluator = evaluator
+        self.queue = queue
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_s = lease_s
+        self.completed = 0
+        self.duplicates = 0
+        self.failed = 0
+        # Models this worker could not build; their items are left to other workers
+        self.unavailable = set()
+        self._stop = threading.Event()
+    
+    def _heartbeat(self):
+        while not self._stop.wait(self.lease_s / 3):
+            try:
+                self.queue.heartbeat(self.worker_id, self.lease_s)
+            except Exception as e:
+                print(f"⚠️  Heartbeat failed for {self.worker_id}: {e}")
+    
+    def run(self, max_items: int = None, idle_timeout: float = 0.0, poll_s: float = 1.0) -> int:
+        """
+        Process items until the queue is empty.
+        
+        Args:
+            max_items: Stop after this many items (None = no limit)
+            idle_timeout: Keep polling an empty queue this long before exiting
+                (items can come back when another worker's lease expires)
+            poll_s: Polling interval while idle
+        
+        Returns:
+            Number of results this worker stored
+        """
+        print(f"👷 Worker {self.worker_id} started")
+        heartbeat = threading.Thread(target=self._heartbeat, daemon=True)
+        heartbeat.start()
+        idle_since = None
+        processed = 0
+        try:
+            while max_items is None or processed < max_items:
+                item = self.queue.lease(self.worker_id, self.lease_s, skip_models=self.unavailable)
+                if item is None:
+                    idle_since = idle_since or time.monotonic()
+                    if time.monotonic() - idle_since >= idle_timeout:
+                        break
+                    time.sleep(poll_s)
+                    continue
+                idle_since = None
+                
+                processed += 1
+                
+                try:
+                    model = self.evaluator.models[item.model]
+                except Exception as e:
+                    print(f"⚠️  {self.worker_id} cannot run {item.model} ({type(e).__name__}: {e}); "
+                          f"leaving it to other workers")
+                    self.unavailable.add(item.model)
+                    self._fail(item, f"Model {item.model} unavailable on {self.worker_id}: {e}")
+                    continue
+                
+                try:
+                    model.profiler = self.evaluator.profiler
+                    prediction = model.assess_validity(item.test_case)
+                    result = self.evaluator._score_case(item.test_case, prediction)
+                except Exception as e:
+                    print(f"⚠️  {item.key} failed on attempt {item.attempts}: {type(e).__name__}: {e}")
+                    self._fail(item, str(e))
+                    continue
+                
+                if self.queue.complete(item, self.worker_id, result):
+                    self.completed += 1
+                else:
+                    self.duplicates += 1
+        finally:
+            self._stop.set()
+        
+        print(f"✅ Worker {self.worker_id} finished: {self.completed} results stored, "
+              f"{self.duplicates} duplicates discarded, {self.failed} failed")
+        return self.completed
+    
+    def _fail(self, item: WorkItem, error: str):
+        """Hand a failed item back to the queue, with an error result in case it is dead-lettered"""
+        self.failed += 1
+        prediction = {
+            'validity_rating': None,
+            'reliability_scores': [],
+            'reasoning': f'Error: {error}',
+            'raw_response': '',
+            'error': error,
+        }
+        error_result = self.evaluator._score_case(item.test_case, prediction)
+        if self.queue.fail(item, self.worker_id, error_result):
+            print(f"☠️  {item.key} dead-lettered after {item.attempts} attempts")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Distributed benchmark evaluation")
+    parser.add_argument("role", choices=["coordinator", "worker"])
+    parser.add_argument("--queue", required=True,
+                        help="sqlite:///path/to/queue.db or file:///path/to/dir")
+    parser.add_argument("--dataset", default="datasets/triangulation_benchmark_v1.json")
+    parser.add_argument("--models-config", default=None, help="Model config (default: models.yaml)")
+    parser.add_argument("--models", default=None,
+                        help="Comma-separated models to queue (coordinator; default: all available)")
+    parser.add_argument("--lease", type=float, default=60.0, help="Lease length in seconds (worker)")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS,
+                        help="Leases an item gets before it is dead-lettered as an errored case")
+    parser.add_argument("--worker-id", default=None)
+    parser.add_argument("--idle-timeout", type=float, default=0.0,
+                        help="Seconds a worker keeps polling an empty queue before exiting")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Seconds the coordinator waits for results before merging what it has")
+    parser.add_argument("--output-dir", default="results")
+    parser.add_argument("--format", dest="file_format", default="json", choices=RESULTS_FORMATS,
+                        help="Results file format (coordinator)")
+    args = parser.parse_args(argv)
+    
+    queue = open_queue(args.queue, args.max_attempts)
+    
+    if args.role == "worker":
+        evaluator = BenchmarkEvaluator(args.dataset, models_config=args.models_config)
+        Worker(evaluator, queue, args.worker_id, args.lease).run(idle_timeout=args.idle_timeout)
+        return
+    
+    if args.models:
+        # The coordinator never calls a model, so it needs no credentials
+        evaluator = BenchmarkEvaluator(args.dataset, models={})
+        model_names = args.models.split(',')
+    else:
+        evaluator = BenchmarkEvaluator(args.dataset, models_config=args.models_config)
+        model_names = list(evaluator.models)
+    
+    coordinator = Coordinator(evaluator, queue)
+    coordinator.submit(model_names)
+    coordinator.wait(timeout=args.timeout)
+    results = coordinator.collect()
+    evaluator.save_results(results, args.output_dir, file_format=args.file_format)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Classification metrics for every slice of the dataset at once
+
+Test cases carry attributes to slice results by: every case has a category
+and a number of sources, and synthesis cases also have a type and a
+triangulation_logic. Any set of these attributes is factorized into one
+integer group code per case. The (true, predicted) rating pairs of all
+cases are then counted into a (group, true, pred) tensor with a single
+scatter-add (np.bincount over the flattened index), and accuracy,
+precision, recall, F1, support and the confusion matrix of every group are
+read off that tensor with array operations.
+
+The global report is the same computation with one group, so a per-slice
+report costs one pass over the rows plus a bincount, like the global one.
+"""
+
+from array import array
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+
+VALIDITY_LABELS = [1, 2, 3, 4, 5, 6]
+RELIABILITY_LABELS = ['A', 'B', 'C', 'D', 'E', 'F']
+
+# Attributes results can be grouped by; anything else is read from the test case as-is
+GROUP_ATTRIBUTES: Dict[str, Callable[[Dict], object]] = {
+    'category': lambda case: case.get('category'),
+    'type': lambda case: case.get('type'),
+    'triangulation_logic': lambda case: case.get('triangulation_logic'),
+    'n_sources': lambda case: len(case['sources']) if 'sources' in case else None,
+}
+
+# Joins attribute names in a combined grouping ("category+n_sources") and
+# attribute values in its group labels
+GROUP_SEPARATOR = '+'
+LABEL_SEPARATOR = ' | '
+
+
+def case_attribute(test_case: Dict, name: str):
+    """Value of a grouping attribute for one test case (None if it has none)"""
+    getter = GROUP_ATTRIBUTES.get(name)
+    return getter(test_case) if getter else test_case.get(name)
+
+
+def factorize(values: Iterable) -> Tuple[np.ndarray, List]:
+    """
+    Integer codes for a sequence of hashable values.
+    
+    Returns:
+        (codes, uniques): codes[i] is the index of values[i] in uniques, which
+        lists the distinct values in order of first appearance (None included)
+    """
+    index = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.int64)
+    return codes, list(index)
+
+
+def group_cases(test_cases: Sequence[Dict], attributes: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+    """
+    Factorize one or more attributes of the test cases into a single group code.
+    
+    Args:
+        test_cases: One test case per result row
+        attributes: Attribute names; several attributes group by their combination
+    
+    Returns:
+        (codes, labels): a group code per test case, and a label per group
+        (the attribute values joined with LABEL_SEPARATOR)
+    """
+    codes = np.zeros(len(test_cases), dtype=np.int64)
+    labels = ['']
+    for name in attributes:
+        attribute_codes, uniques = factorize(case_attribute(case, name) for case in test_cases)
+        radix = max(len(uniques), 1)
+        # Mixed-radix combination, compacted to the combinations actually present
+        present, codes = np.unique(codes * radix + attribute_codes, return_inverse=True)
+        labels = [_join_label(labels[code // radix], uniques[code % radix]) for code in present.tolist()]
+    return codes.astype(np.int64).reshape(-1), labels
+
+
+def _join_label(prefix: str, value) -> str:
+    value = 'none' if value is None else str(value)
+    return value if not prefix else prefix + LABEL_SEPARATOR + value
+
+
+def confusion_tensor(groups: np.ndarray, true: np.ndarray, pred: np.ndarray,
+                     n_groups: int, n_labels: int) -> np.ndarray:
+    """
+    Count (group, true, pred) triples with one scatter-add.
+    
+    Args:
+        groups, true, pred: Equal-length integer arrays; labels are 0..n_labels-1
+    
+    Returns:
+        int64 array of shape (n_groups, n_labels, n_labels)
+    """
+    flat = (groups * n_labels + true) * n_labels + pred
+    counts = np.bincount(flat, minlength=n_groups * n_labels * n_labels)
+    return counts.reshape(n_groups, n_labels, n_labels)
+
+
+def classification_report(tensor: np.ndarray, labels: Sequence, prefix: str,
+                          confusion: bool = True) -> List[Dict]:
+    """
+    Per-group classification metrics from a confusion tensor.
+    
+    Matches sklearn's precision_recall_fscore_support(labels=..., average=None,
+    zero_division=0), accuracy_score and confusion_matrix on each group's pairs.
+    Groups without any pairs get no metrics (an empty dict).
+    
+    Args:
+        confusion: Include each group's confusion matrix
+    """
+    n_labels = len(labels)
+    diagonal = np.arange(n_labels)
+    tp = tensor[:, diagonal, diagonal].astype(float)
+    support = tensor.sum(axis=2)
+    predicted = tensor.sum(axis=1)
+    pairs = support.sum(axis=1)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        f1 = np.where(support + predicted > 0, 2 * tp / (support + predicted), 0.0)
+        accuracy = np.where(pairs > 0, tp.sum(axis=1) / pairs, 0.0)
+    macro_f1 = f1.mean(axis=1)
+    
+    reports = []
+    for g in range(tensor.shape[0]):
+        if not pairs[g]:
+            reports.append({})
+            continue
+        report = {
+            f'{prefix}_accuracy': float(accuracy[g]),
+            f'{prefix}_macro_f1': float(macro_f1[g]),
+        }
+        for i, label in enumerate(labels):
+            report[f'{prefix}_{label}_precision'] = float(precision[g, i])
+            report[f'{prefix}_{label}_recall'] = float(recall[g, i])
+            report[f'{prefix}_{label}_f1'] = float(f1[g, i])
+            report[f'{prefix}_{label}_support'] = int(support[g, i])
+        if confusion:
+            report[f'{prefix}_confusion_matrix'] = tensor[g].tolist()
+        reports.append(report)
+    return reports
+
+
+class MetricInputs:
+    """
+    Rating pairs and correctness of scored rows, in compact arrays.
+    
+    Filled with one add() per row, then grouped any number of ways by
+    metrics() without looking at the rows again.
+    """
+    
+    def __init__(self):
+        self._validity_codes = {label: code for code, label in enumerate(VALIDITY_LABELS)}
+        self._reliability_codes = {label: code for code, label in enumerate(RELIABILITY_LABELS)}
+        self.case_ids = []
+        self.correct = bytearray()
+        # Flattened (case index, true code, pred code) triples: one validity
+        # pair per case with a parsed prediction, one reliability pair per rated source
+        self.validity = array('q')
+        self.reliability = array('q')
+    
+    def __len__(self) -> int:
+        return len(self.correct)
+    
+    def add(self, row: Dict):
+        """Add one scored result row"""
+        case = len(self.correct)
+        self.case_ids.append(row['test_case_id'])
+        self.correct.append(bool(row.get('correct', False)))
+        
+        true = self._validity_codes.get(row['expected_validity'])
+        pred = self._validity_codes.get(row['predicted_validity'])
+        if true is not None and pred is not None:
+            self.validity.extend((case, true, pred))
+        
+        predicted_reliability = row['predicted_reliability']
+        for i, expected in enumerate(row['expected_reliability']):
+            if i < len(predicted_reliability):
+                true = self._reliability_codes.get(expected)
+                pred = self._reliability_codes.get(predicted_reliability[i])
+                if true is not None and pred is not None:
+                    self.reliability.extend((case, true, pred))
+    
+    def tensor(self, kind: str, groups: np.ndarray = None, n_groups: int = 1) -> np.ndarray:
+        """
+        Confusion tensor of the validity or reliability pairs.
+        
+        Args:
+            kind: 'validity' or 'reliability'
+            groups: Group code per added row (default: all rows in group 0)
+            n_groups: Number of groups
+        """
+        if groups is None:
+            groups = np.zeros(len(self), dtype=np.int64)
+        if kind == 'validity':
+            pairs, labels = self.validity, VALIDITY_LABELS
+        else:
+            pairs, labels = self.reliability, RELIABILITY_LABELS
+        pairs = np.frombuffer(pairs, dtype=np.int64).reshape(-1, 3)
+        return confusion_tensor(groups[pairs[:, 0]], pairs[:, 1], pairs[:, 2], n_groups, len(labels))
+    
+    def metrics(self, groups: np.ndarray = None, n_groups: int = 1) -> List[Dict]:
+        """
+        Metrics of every group.
+        
+        Args:
+            groups: Group code per added row (default: all rows in group 0)
+            n_groups: Number of groups
+        
+        Returns:
+            One dict per group with scored_cases, strict_correct and
+            strict_accuracy, plus the validity_* and reliability_* metrics
+            when the group has rating pairs
+        """
+        if groups is None:
+            groups = np.zeros(len(self), dtype=np.int64)
+        cases = np.bincount(groups, minlength=n_groups)
+        correct = np.bincount(groups, weights=np.frombuffer(self.correct, dtype=np.uint8), minlength=n_groups)
+        
+        reports = [{} for _ in range(n_groups)]
+        for prefix, labels in (('validity', VALIDITY_LABELS), ('reliability', RELIABILITY_LABELS)):
+            tensor = self.tensor(prefix, groups, n_groups)
+            for report, group_report in zip(reports, classification_report(tensor, labels, prefix)):
+                report.update(group_report)
+        
+        for g, report in enumerate(reports):
+            report['strict_accuracy'] = float(correct[g] / cases[g]) if cases[g] else 0
+            report['strict_correct'] = int(correct[g])
+            report['scored_cases'] = int(cases[g])
+        return reports
+    
+    def grouped(self, test_cases: Sequence[Dict], attributes: Sequence[str]) -> Dict[str, Dict]:
+        """
+        Metrics per group of the given attributes.
+        
+        Args:
+            test_cases: The test case of each added row, in order
+            attributes: Attribute names to group by (combined if several)
+        
+        Returns:
+            {group label: metrics}, largest groups first
+        """
+        groups, labels = group_cases(test_cases, attributes)
+        reports = self.metrics(groups, len(labels))
+        order = sorted(range(len(labels)), key=lambda g: (-reports[g]['scored_cases'], labels[g]))
+        return {labels[g]: reports[g] for g in order}
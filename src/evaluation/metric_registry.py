@@ -0,0 +1,458 @@
+"""
+Declarative registry of run metrics
+
+Every metric a run can report is registered here with the inputs it needs.
+An input is another registered value: an intermediate (one pass over the
+result rows, a confusion tensor, latency percentiles) or a source the
+evaluator provides (the results, the wall time, the model's hedge policy
+and circuit breaker, the dataset).
+
+Nothing is computed up front. A MetricRun evaluates what its consumers ask
+for, by name or fnmatch pattern, and memoizes every value, so each
+intermediate is computed at most once per run however many metrics and
+sinks share it. Sinks such as the console, Comet, the metrics files and a
+MetricSink of your own (a CSV file, a warehouse table) each request their
+own patterns. A metric that does not apply to a run (validity metrics
+without any parsed rating, hedge metrics without hedging) evaluates to None
+and is left out.
+
+    run = MetricRun(METRICS, {'results': rows, 'wall_time': 12.5})
+    run.query(['strict_accuracy', 'validity_?_f1', 'latency_p*'])
+
+`python count_metrics.py` lists the registry.
+"""
+
+import csv
+import fnmatch
+import os
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from .grouped_metrics import (GROUP_SEPARATOR, RELIABILITY_LABELS, VALIDITY_LABELS, MetricInputs,
+                              classification_report)
+
+
+# Values the evaluator passes to a MetricRun (missing ones are None)
+SOURCES = ('results', 'wall_time', 'hedge', 'circuit_breaker', 'dataset')
+
+
+class _Node:
+    """A registered metric or intermediate"""
+    
+    def __init__(self, name: str, requires: Tuple[str, ...], fn: Callable,
+                 section: str = None, description: str = ''):
+        self.name = name
+        self.requires = tuple(requires)
+        self.fn = fn
+        self.section = section
+        self.description = description
+
+
+class MetricRegistry:
+    """Metrics and the intermediates they are computed from, in report order"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Node] = {}
+        self._intermediates: Dict[str, _Node] = {}
+    
+    def add_metric(self, name: str, requires: Sequence[str], fn: Callable,
+                   section: str, description: str = ''):
+        """
+        Register a metric.
+        
+        Args:
+            name: Metric name as reported (e.g. "validity_3_f1")
+            requires: Names of the intermediates, sources or metrics fn takes
+            fn: Computes the value from the required values, in order; None
+                means the metric does not apply to this run
+            section: Report section (e.g. "validity", "performance")
+            description: One line for count_metrics.py
+        """
+        self._check_new(name)
+        self._metrics[name] = _Node(name, requires, fn, section, description)
+    
+    def metric(self, name: str, requires: Sequence[str], section: str, description: str = ''):
+        """Decorator form of add_metric"""
+        def register(fn):
+            self.add_metric(name, requires, fn, section, description)
+            return fn
+        return register
+    
+    def intermediate(self, name: str, requires: Sequence[str]):
+        """Decorator registering a memoized value metrics can require"""
+        def register(fn):
+            self._check_new(name)
+            self._intermediates[name] = _Node(name, requires, fn)
+            return fn
+        return register
+    
+    def _check_new(self, name: str):
+        if name in self._metrics or name in self._intermediates or name in SOURCES:
+            raise ValueError(f"{name!r} is already registered")
+    
+    def node(self, name: str) -> _Node:
+        return self._metrics.get(name) or self._intermediates.get(name)
+    
+    def names(self, patterns: Iterable[str] = None, section: str = None) -> List[str]:
+        """Registered metric names matching the patterns (see match_names), in report order"""
+        names = [name for name, node in self._metrics.items() if section is None or node.section == section]
+        return match_names(names, patterns)
+    
+    def sections(self) -> Dict[str, List[str]]:
+        """Metric names by section, in report order"""
+        sections = {}
+        for name, node in self._metrics.items():
+            sections.setdefault(node.section, []).append(name)
+        return sections
+    
+    def describe(self, name: str) -> str:
+        return self._metrics[name].description
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._metrics
+    
+    def __len__(self) -> int:
+        return len(self._metrics)
+
+
+def match_names(names: Sequence[str], patterns: Iterable[str] = None) -> List[str]:
+    """
+    Names matching any of the patterns, in the order of names.
+    
+    Patterns are exact names or fnmatch patterns ("validity_*", "latency_p??_s");
+    a pattern starting with "!" removes the names it matches. None selects all.
+    """
+    if patterns is None:
+        return list(names)
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    include = [p for p in patterns if not p.startswith('!')]
+    exclude = [p[1:] for p in patterns if p.startswith('!')]
+    if not include:
+        include = ['*']
+    return [
+        name for name in names
+        if any(fnmatch.fnmatchcase(name, p) for p in include)
+        and not any(fnmatch.fnmatchcase(name, p) for p in exclude)
+    ]
+
+
+class MetricRun:
+    """Lazily computed, memoized metrics of one model run"""
+    
+    def __init__(self, registry: 'MetricRegistry', sources: Dict, group_by: Sequence[Tuple[str, ...]] = ()):
+        """
+        Args:
+            registry: Metric definitions
+            sources: Values for SOURCES (results is required)
+            group_by: Attribute tuples to add by_<attributes> metrics for
+                (see grouped_metrics.py)
+        """
+        self.registry = registry
+        self._values = {name: sources.get(name) for name in SOURCES}
+        # Grouped reports depend on the run's group_by, so they are per-run metrics
+        self._grouped = {}
+        for attributes in group_by:
+            name = f"by_{GROUP_SEPARATOR.join(attributes)}"
+            self._grouped[name] = _Node(
+                name, ('outcomes', 'cases'),
+                lambda outcomes, cases, attributes=attributes: outcomes['inputs'].grouped(cases, attributes),
+                'groups',
+            )
+    
+    def names(self, patterns: Iterable[str] = None) -> List[str]:
+        """Metric names of this run matching the patterns, in report order"""
+        return match_names(list(self.registry.names()) + list(self._grouped), patterns)
+    
+    def get(self, name: str):
+        """Value of a metric, intermediate or source (computed on first use)"""
+        if name in self._values:
+            return self._values[name]
+        node = self._grouped.get(name) or self.registry.node(name)
+        if node is None:
+            raise KeyError(f"Unknown metric {name!r}")
+        value = node.fn(*(self.get(required) for required in node.requires))
+        self._values[name] = value
+        return value
+    
+    def query(self, patterns: Iterable[str] = None) -> Dict:
+        """Values of the metrics matching the patterns, leaving out ones that do not apply"""
+        metrics = {}
+        for name in self.names(patterns):
+            value = self.get(name)
+            if value is not None:
+                metrics[name] = value
+        return metrics
+    
+    def computed(self) -> List[str]:
+        """Names computed so far (for checking what a query cost)"""
+        return [name for name in self._values if name not in SOURCES]
+
+
+class MetricSink:
+    """
+    Consumer of run metrics.
+    
+    Subclasses set requests to the metric names or patterns they use and
+    implement emit; BenchmarkEvaluator(metric_sinks=[...]) calls emit once
+    per evaluated model with only those metrics.
+    """
+    
+    requests: Sequence[str] = ('*',)
+    
+    def emit(self, model_name: str, metrics: Dict):
+        raise NotImplementedError
+    
+    def close(self):
+        """Called after the run (flush files, connections)"""
+
+
+class CsvSink(MetricSink):
+    """
+    Appends one row of scalar metrics per model to a CSV file.
+    
+    The columns are those of the first row written to the file; metrics a
+    later model adds (e.g. hedging stats) are left out and missing ones are blank.
+    """
+    
+    def __init__(self, path: str, requests: Sequence[str] = ('*', '!*_confusion_matrix', '!by_*')):
+        self.path = path
+        self.requests = requests
+    
+    def emit(self, model_name: str, metrics: Dict):
+        row = {'model': model_name}
+        row.update((name, value) for name, value in metrics.items() if not isinstance(value, (list, dict)))
+        fieldnames = None
+        if os.path.exists(self.path):
+            with open(self.path, newline='') as f:
+                fieldnames = next(csv.reader(f), None)
+        with open(self.path, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames or list(row), extrasaction='ignore')
+            if not fieldnames:
+                writer.writeheader()
+            writer.writerow(row)
+
+
+METRICS = MetricRegistry()
+
+
+# --- Intermediates ---
+
+@METRICS.intermediate('rows', requires=('results',))
+def _rows(results):
+    # Metrics never look at the response text; compact results skip reading it back
+    return results.without_text() if hasattr(results, 'without_text') else results
+
+
+@METRICS.intermediate('outcomes', requires=('rows',))
+def _outcomes(rows):
+    """
+    One pass over the rows: rating pairs of answered cases, plus cases left out.
+    
+    Cases skipped because the run was cancelled or an open circuit breaker
+    refused them were never answered, and cases whose request failed are not
+    wrong answers, so neither is scored.
+    """
+    outcomes = {'inputs': MetricInputs(), 'skipped': 0, 'errored': 0,
+                'agreements': [], 'reliability_agreements': []}
+    for r in rows:
+        if r.get('skipped'):
+            outcomes['skipped'] += 1
+            continue
+        if r.get('error'):
+            outcomes['errored'] += 1
+            continue
+        outcomes['inputs'].add(r)
+        if 'validity_agreement' in r:
+            outcomes['agreements'].append(r['validity_agreement'])
+        if 'reliability_agreement' in r:
+            outcomes['reliability_agreements'].append(r['reliability_agreement'])
+    return outcomes
+
+
+@METRICS.intermediate('cases', requires=('outcomes', 'dataset'))
+def _cases(outcomes, dataset):
+    """The test case of each scored row (rows are usually in dataset order)"""
+    case_ids = outcomes['inputs'].case_ids
+    dataset = dataset or []
+    if len(case_ids) == len(dataset) and all(
+            case_id == test_case['id'] for case_id, test_case in zip(case_ids, dataset)):
+        return dataset
+    by_id = {}
+    for test_case in dataset:
+        by_id.setdefault(test_case['id'], test_case)
+    return [by_id.get(case_id, {'id': case_id}) for case_id in case_ids]
+
+
+@METRICS.intermediate('validity_tensor', requires=('outcomes',))
+def _validity_tensor(outcomes):
+    return outcomes['inputs'].tensor('validity')
+
+
+@METRICS.intermediate('reliability_tensor', requires=('outcomes',))
+def _reliability_tensor(outcomes):
+    return outcomes['inputs'].tensor('reliability')
+
+
+@METRICS.intermediate('validity_scores', requires=('validity_tensor',))
+def _validity_scores(tensor):
+    return classification_report(tensor, VALIDITY_LABELS, 'validity', confusion=False)[0]
+
+
+@METRICS.intermediate('reliability_scores', requires=('reliability_tensor',))
+def _reliability_scores(tensor):
+    return classification_report(tensor, RELIABILITY_LABELS, 'reliability', confusion=False)[0]
+
+
+@METRICS.intermediate('usage', requires=('rows',))
+def _usage(rows):
+    """One pass over the answered rows for latency, token, cost and coalescing totals"""
+    usage = {
+        'answered': 0, 'latencies': [], 'ttfbs': [], 'cost': 0.0, 'coalesced': 0,
+        'totals': dict.fromkeys(('prompt_tokens', 'completion_tokens', 'cached_prompt_tokens', 'retries'), 0),
+    }
+    totals = usage['totals']
+    for r in rows:
+        if r.get('skipped'):
+            continue
+        usage['answered'] += 1
+        if r.get('latency_s') is not None:
+            usage['latencies'].append(r['latency_s'])
+        if r.get('ttfb_s') is not None:
+            usage['ttfbs'].append(r['ttfb_s'])
+        for field in totals:
+            totals[field] += r.get(field) or 0
+        usage['cost'] += r.get('cost_usd') or 0.0
+        usage['coalesced'] += bool(r.get('coalesced'))
+    return usage
+
+
+@METRICS.intermediate('latency_percentiles', requires=('usage',))
+def _latency_percentiles(usage):
+    if not usage['latencies']:
+        return None
+    return [float(p) for p in np.percentile(usage['latencies'], [50, 95, 99])]
+
+
+@METRICS.intermediate('hedge_summary', requires=('hedge',))
+def _hedge_summary(hedge):
+    return hedge.summary() if hedge else {}
+
+
+@METRICS.intermediate('billed', requires=('usage', 'hedge_summary'))
+def _billed(usage, hedge_summary):
+    """Token and cost totals including hedged copies that lost (billed all the same)"""
+    billed = {field: usage['totals'][field] + (hedge_summary.get(f'hedge_{field}') or 0)
+              for field in ('prompt_tokens', 'completion_tokens', 'cached_prompt_tokens')}
+    billed['cost_usd'] = usage['cost'] + (hedge_summary.get('hedge_cost_usd') or 0.0)
+    return billed
+
+
+@METRICS.intermediate('circuit_summary', requires=('circuit_breaker',))
+def _circuit_summary(circuit_breaker):
+    return circuit_breaker.summary() if circuit_breaker else {}
+
+
+# --- Metrics, in report order ---
+
+METRICS.add_metric('total_cases', ('outcomes',), lambda o: len(o['inputs']) + o['skipped'] + o['errored'],
+                   'overall', "Cases in the run (result rows)")
+METRICS.add_metric('scored_cases', ('outcomes',), lambda o: len(o['inputs']),
+                   'overall', "Cases scored (answered, not skipped or errored); the accuracy denominator")
+METRICS.add_metric('skipped_cases', ('outcomes',), lambda o: o['skipped'],
+                   'overall', "Cases not sent because the run was cancelled or the circuit breaker was open")
+METRICS.add_metric('errored_cases', ('outcomes',), lambda o: o['errored'],
+                   'overall', "Cases whose request failed")
+METRICS.add_metric('error_rate', ('outcomes',),
+                   lambda o: o['errored'] / (len(o['inputs']) + o['errored']) if len(o['inputs']) + o['errored'] else 0.0,
+                   'overall', "Errored cases / attempted cases")
+
+
+def _register_classification(kind: str, labels: Sequence, scale: str):
+    """accuracy, macro F1, per-label precision/recall/F1/support and the confusion matrix"""
+    scores = f'{kind}_scores'
+    METRICS.add_metric(f'{kind}_accuracy', (scores,), lambda s, n=f'{kind}_accuracy': s.get(n),
+                       kind, f"Share of {kind} ratings ({scale}) predicted exactly")
+    METRICS.add_metric(f'{kind}_macro_f1', (scores,), lambda s, n=f'{kind}_macro_f1': s.get(n),
+                       kind, f"Mean F1 over the {scale} ratings")
+    for label in labels:
+        for stat in ('precision', 'recall', 'f1', 'support'):
+            name = f'{kind}_{label}_{stat}'
+            METRICS.add_metric(name, (scores,), lambda s, n=name: s.get(n),
+                               kind, f"{stat.capitalize()} of {kind} rating {label}")
+    METRICS.add_metric(f'{kind}_confusion_matrix', (f'{kind}_tensor',),
+                       lambda t: t[0].tolist() if t.any() else None,
+                       kind, f"Expected x predicted {kind} rating counts")
+
+
+_register_classification('validity', VALIDITY_LABELS, '1-6')
+_register_classification('reliability', RELIABILITY_LABELS, 'A-F')
+
+METRICS.add_metric('strict_accuracy', ('outcomes',),
+                   lambda o: sum(o['inputs'].correct) / len(o['inputs']) if len(o['inputs']) else 0,
+                   'overall', "Cases with validity and every reliability rating correct")
+METRICS.add_metric('strict_correct', ('outcomes',), lambda o: sum(o['inputs'].correct),
+                   'overall', "Count of strictly correct cases")
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else None
+
+
+METRICS.add_metric('mean_validity_agreement', ('outcomes',), lambda o: _mean(o['agreements']),
+                   'self-consistency', "Mean share of samples agreeing with the voted validity")
+METRICS.add_metric('mean_reliability_agreement', ('outcomes',),
+                   lambda o: sum(o['reliability_agreements']) / len(o['agreements']) if o['agreements'] else None,
+                   'self-consistency', "Mean share of samples agreeing with the voted reliability")
+METRICS.add_metric('unanimous_validity_rate', ('outcomes',),
+                   lambda o: _mean([a == 1.0 for a in o['agreements']]),
+                   'self-consistency', "Share of cases where every sample agreed on validity")
+
+METRICS.add_metric('latency_mean_s', ('usage',),
+                   lambda u: float(np.mean(u['latencies'])) if u['latencies'] else None,
+                   'performance', "Mean request latency")
+for _i, _p in enumerate((50, 95, 99)):
+    METRICS.add_metric(f'latency_p{_p}_s', ('latency_percentiles',),
+                       lambda p, i=_i: p[i] if p else None,
+                       'performance', f"{_p}th percentile request latency")
+METRICS.add_metric('ttfb_p50_s', ('usage',),
+                   lambda u: float(np.percentile(u['ttfbs'], 50)) if u['ttfbs'] else None,
+                   'performance', "Median time to first byte")
+METRICS.add_metric('wall_time_s', ('wall_time',), lambda w: w or None,
+                   'performance', "Wall-clock time of the model run")
+METRICS.add_metric('throughput_cases_per_s', ('usage', 'wall_time'),
+                   lambda u, w: u['answered'] / w if w else None,
+                   'performance', "Answered cases per second of wall time")
+for _field in ('prompt_tokens', 'completion_tokens', 'cached_prompt_tokens'):
+    METRICS.add_metric(f'total_{_field}', ('billed',), lambda b, f=_field: b[f],
+                       'performance', f"Sum of {_field.replace('_', ' ')} (including discarded hedges)")
+METRICS.add_metric('cached_prompt_ratio', ('billed',),
+                   lambda b: b['cached_prompt_tokens'] / b['prompt_tokens'] if b['prompt_tokens'] else 0.0,
+                   'performance', "Share of prompt tokens served from the provider's cache")
+METRICS.add_metric('total_retries', ('usage',), lambda u: u['totals']['retries'],
+                   'performance', "Retried requests")
+METRICS.add_metric('total_cost_usd', ('billed',), lambda b: b['cost_usd'],
+                   'performance', "Estimated cost (including discarded hedges)")
+METRICS.add_metric('coalesced_calls', ('usage',), lambda u: u['coalesced'],
+                   'performance', "Requests not sent because an identical one was already in flight")
+
+for _name, _description in (
+        ('hedge_requests', "Requests made through the hedge policy"),
+        ('hedged_requests', "Requests that got a duplicate"),
+        ('hedge_rate', "Hedged / all requests"),
+        ('hedge_wins', "Hedges that finished first"),
+        ('hedge_p99_s', "p99 latency with hedging"),
+        ('hedge_p99_unhedged_s', "p99 latency the primaries alone would have had"),
+        ('hedge_p99_improvement', "Relative p99 improvement from hedging"),
+        ('hedge_prompt_tokens', "Prompt tokens of discarded (losing) copies"),
+        ('hedge_completion_tokens', "Completion tokens of discarded copies"),
+        ('hedge_cached_prompt_tokens', "Cached prompt tokens of discarded copies"),
+        ('hedge_cost_usd', "Estimated cost of discarded copies")):
+    METRICS.add_metric(_name, ('hedge_summary',), lambda s, n=_name: s.get(n), 'hedging', _description)
+
+for _name, _description in (
+        ('circuit_state', "Circuit breaker state at the end of the run"),
+        ('circuit_opened', "Times the circuit breaker opened"),
+        ('circuit_rejected', "Requests refused while the circuit was open")):
+    METRICS.add_metric(_name, ('circuit_summary',), lambda s, n=_name: s.get(n), 'circuit breaker', _description)
@@ -0,0 +1,390 @@
+"""
+Dry-run planning of a benchmark run
+
+Renders every prompt exactly as the model wrappers would (through
+BaseModel.format_prompt_parts, without sending anything), counts the
+tokens with each provider's tokenizer, and applies the price and rate-limit
+tables to estimate what a run will cost and how long it must take:
+
+    python -m src.evaluation.run_benchmark --plan --concurrency 8
+    python -m src.evaluation.planner --dataset datasets/synthetic.jsonl.zst --models gpt-4o,gpt-4o-mini
+
+Token counts are exact for OpenAI models when tiktoken is installed and for
+local models when their tokenizer is cached; otherwise (and for providers
+whose tokenizers are only available through their APIs) they are estimated
+at CHARS_PER_TOKEN characters per token. Completion tokens and latency come
+from a previous results file when one is given (--history), and from the
+defaults below otherwise.
+
+The rubric prefix is the same for every request, so it is tokenized once;
+the per-case parts are rendered and tokenized in chunks across processes.
+"""
+
+import argparse
+import json
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, List
+
+from ..data_generation import TestCaseGenerator
+from ..data_io import iter_records
+from ..models.base_model import BaseModel
+from ..models.pricing import MIN_CACHED_PREFIX_TOKENS, estimate_cost, get_rate_limits
+from ..models.prompts import SYSTEM_PROMPT
+from ..models.registry import ModelSpec, load_specs, resolve_class
+from .results_io import iter_models
+from .sharding import parse_shard, shard_of
+
+
+# Estimates used when no results history is given
+DEFAULT_COMPLETION_TOKENS = 300
+DEFAULT_STRUCTURED_COMPLETION_TOKENS = 60
+DEFAULT_TTFT_S = 0.5
+DEFAULT_OUTPUT_TOKENS_PER_S = 60.0
+CHARS_PER_TOKEN = 4.0
+
+CHUNK_SIZE = 20_000
+
+_tokenizers = {}
+
+
+class _PromptRenderer(BaseModel):
+    """A wrapper that renders prompts like any other but never sends them"""
+    
+    def _complete(self, prefix: str, suffix: str, max_tokens: int = 1000,
+                  temperature: float = 0.0) -> Dict:
+        raise RuntimeError("The planner does not send requests")
+
+
+def tokenizer_name(provider: str, model_id: str) -> str:
+    """
+    Name of the tokenizer used to count a model's prompt tokens.
+    
+    'tiktoken:<encoding>', 'hf:<model id>' or 'chars' (estimate).
+    """
+    if provider == 'openai':
+        try:
+            import tiktoken
+        except ImportError:
+            return 'chars'
+        try:
+            return f"tiktoken:{tiktoken.encoding_for_model(model_id).name}"
+        except KeyError:
+            return 'tiktoken:o200k_base'
+    if provider == 'local':
+        try:
+            _load_tokenizer(f"hf:{model_id}")
+        except Exception:
+            return 'chars'
+        return f"hf:{model_id}"
+    return 'chars'
+
+
+def _load_tokenizer(name: str):
+    if name not in _tokenizers:
+        kind, _, arg = name.partition(':')
+        if kind == 'tiktoken':
+            import tiktoken
+            _tokenizers[name] = tiktoken.get_encoding(arg)
+        elif kind == 'hf':
+            from transformers import AutoTokenizer
+            # Only a tokenizer already on disk: planning must not download anything
+            _tokenizers[name] = AutoTokenizer.from_pretrained(arg, local_files_only=True)
+        else:
+            _tokenizers[name] = None
+    return _tokenizers[name]
+
+
+def count_tokens(name: str, texts: List[str]) -> List[int]:
+    """Token count of each text with the named tokenizer"""
+    tokenizer = _load_tokenizer(name)
+    if tokenizer is None:
+        return [math.ceil(len(text) / CHARS_PER_TOKEN) for text in texts]
+    if name.startswith('tiktoken:'):
+        return [len(ids) for ids in tokenizer.encode_ordinary_batch(texts)]
+    return [len(ids) for ids in tokenizer(texts, add_special_tokens=False)['input_ids']]
+
+
+def _count_chunk(args) -> tuple:
+    """(cases, requests, suffix tokens) for a chunk of test cases"""
+    test_cases, tokenizer, structured, pack_size = args
+    renderer = _PromptRenderer('planner', structured_output=structured)
+    if pack_size > 1:
+        suffixes = [renderer.format_packed_prompt_parts(test_cases[i:i + pack_size])[1]
+                    for i in range(0, len(test_cases), pack_size)]
+    else:
+        suffixes = [renderer.format_prompt_parts(test_case)[1] for test_case in test_cases]
+    return len(test_cases), len(suffixes), sum(count_tokens(tokenizer, suffixes))
+
+
+def _chunks(dataset: Iterable[Dict], size: int):
+    iterator = iter(dataset)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _count_prompts(dataset, tokenizer: str, structured: bool, pack_size: int, workers: int) -> tuple:
+    """Total (cases, requests, per-case prompt tokens) over the dataset"""
+    # Chunks hold whole packs so packing matches a real run
+    chunk_size = math.ceil(CHUNK_SIZE / pack_size) * pack_size
+    chunks = ((chunk, tokenizer, structured, pack_size) for chunk in _chunks(dataset, chunk_size))
+    totals = [0, 0, 0]
+    
+    def add(counts):
+        for i, count in enumerate(counts):
+            totals[i] += count
+    
+    if workers <= 1:
+        for args in chunks:
+            add(_count_chunk(args))
+        return tuple(totals)
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for args in chunks:
+            pending.append(pool.submit(_count_chunk, args))
+            if len(pending) >= 2 * workers:
+                add(pending.popleft().result())
+        while pending:
+            add(pending.popleft().result())
+    return tuple(totals)
+
+
+def load_history(path: str) -> Dict[str, Dict]:
+    """Mean completion tokens and latency per model from a previous results file"""
+    history = {}
+    for model_name, rows in iter_models(path):
+        completion, latency = [], []
+        for row in rows:
+            if row.get('coalesced') or row.get('skipped'):
+                continue
+            if row.get('completion_tokens') is not None:
+                completion.append(row['completion_tokens'])
+            if row.get('latency_s') is not None:
+                latency.append(row['latency_s'])
+        history[model_name] = {
+            'completion_tokens': sum(completion) / len(completion) if completion else None,
+            'latency_s': sum(latency) / len(latency) if latency else None,
+        }
+    return history
+
+
+# Built-in providers whose wrappers draw several samples per request
+# (supports_n); looked up here so planning does not import any SDK
+SAMPLES_PER_REQUEST_PROVIDERS = {'openai': True, 'anthropic': False, 'google': True, 'local': False}
+
+
+def _supports_n(provider: str) -> bool:
+    """Whether a provider's wrapper draws several samples per request"""
+    if provider in SAMPLES_PER_REQUEST_PROVIDERS:
+        return SAMPLES_PER_REQUEST_PROVIDERS[provider]
+    try:
+        return bool(resolve_class(provider).supports_n)
+    except Exception:
+        return False
+
+
+def plan_run(dataset, specs: Dict[str, ModelSpec], structured: bool = False, samples: int = 1,
+             pack_size: int = 1, concurrency: int = 1, history: Dict[str, Dict] = None,
+             workers: int = None, shard: str = None) -> Dict:
+    """
+    Estimate tokens, cost and minimum wall time of a run without sending anything.
+    
+    Args:
+        dataset: List of test cases, or a dataset file (streamed once per tokenizer)
+        specs: Models to plan for, by name (see registry.load_specs)
+        structured: Plan for structured output mode
+        samples: Samples per case (self-consistency)
+        pack_size: Test cases per request
+        concurrency: Requests in flight at once per model
+        history: Per-model completion tokens and latency (see load_history)
+        workers: Processes rendering and tokenizing prompts (default: CPU count)
+        shard: "i/N" to plan only the i-th of N slices of the dataset (see sharding.py)
+    
+    Returns:
+        Dict with a plan per model ('models') and totals over the models the
+        run would evaluate; models skipped for missing keys are listed in
+        'skipped_models' and left out of the totals
+    """
+    workers = workers or os.cpu_count() or 1
+    shard = parse_shard(shard) if shard else None
+    history = history or {}
+    renderer = _PromptRenderer('planner', structured_output=structured)
+    max_tokens = renderer.max_tokens if pack_size == 1 else renderer.packed_max_tokens
+    
+    # Prompt rendering depends only on the tokenizer; count once per tokenizer
+    counted = {}
+    plans = {}
+    for name, spec in specs.items():
+        tokenizer = tokenizer_name(spec.provider, spec.model_id)
+        if tokenizer not in counted:
+            cases = iter_records(dataset) if isinstance(dataset, str) else dataset
+            if shard:
+                cases = (case for case in cases if shard_of(case['id'], shard[1]) == shard[0])
+            n_cases, n_prompts, suffix_tokens = _count_prompts(cases, tokenizer, structured, pack_size, workers)
+            # The prefix (rubric) and system prompt are the same in every request
+            prefix = renderer.format_prompt_parts({'sources': []})[0]
+            prefix_tokens, system_tokens = count_tokens(tokenizer, [prefix, SYSTEM_PROMPT])
+            counted[tokenizer] = (n_cases, n_prompts, suffix_tokens, prefix_tokens + system_tokens)
+        n_cases, n_prompts, suffix_tokens, static_tokens = counted[tokenizer]
+        
+        # Several samples come from one request where the provider supports it
+        one_request = samples > 1 and _supports_n(spec.provider)
+        requests = n_prompts * (1 if one_request else samples)
+        prompt_tokens = (suffix_tokens + static_tokens * n_prompts) * (1 if one_request else samples)
+        # Providers do not cache prefixes below their minimum
+        cacheable = static_tokens >= MIN_CACHED_PREFIX_TOKENS
+        cached_tokens = static_tokens * max(0, requests - 1) if cacheable else 0
+        
+        past = history.get(name, {})
+        per_case_completion = past.get('completion_tokens') or (
+            DEFAULT_STRUCTURED_COMPLETION_TOKENS if structured else DEFAULT_COMPLETION_TOKENS)
+        completion_tokens = round(per_case_completion * n_cases * samples)
+        completion_per_request = completion_tokens / requests if requests else 0
+        latency = past.get('latency_s') or DEFAULT_TTFT_S + completion_per_request / DEFAULT_OUTPUT_TOKENS_PER_S
+        
+        rpm, tpm = get_rate_limits(spec.model_id) or (None, None)
+        rpm = spec.rate_limits.get('rpm', rpm)
+        tpm = spec.rate_limits.get('tpm', tpm)
+        
+        # The run can go no faster than its concurrency or either rate limit allows
+        bounds = {'concurrency': requests * latency / max(1, concurrency)}
+        if rpm:
+            bounds['requests_per_minute'] = requests / rpm * 60
+        if tpm:
+            bounds['tokens_per_minute'] = (prompt_tokens + completion_tokens) / tpm * 60
+        limit = max(bounds, key=bounds.get)
+        
+        plans[name] = {
+            'model_id': spec.model_id,
+            'tokenizer': tokenizer,
+            'tokens_estimated': tokenizer == 'chars',
+            'missing_env': spec.missing_env(),
+            'cases': n_cases,
+            'requests': requests,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'max_completion_tokens': requests * max_tokens * (samples if one_request else 1),
+            'cost_usd': estimate_cost(spec.model_id, prompt_tokens, completion_tokens, cached_tokens),
+            'cost_uncached_usd': estimate_cost(spec.model_id, prompt_tokens, completion_tokens),
+            'max_cost_usd': estimate_cost(spec.model_id, prompt_tokens,
+                                          requests * max_tokens * (samples if one_request else 1),
+                                          cached_tokens),
+            'latency_s': latency,
+            'rate_limits': {'rpm': rpm, 'tpm': tpm},
+            'min_wall_time_s': bounds[limit],
+            'bound_by': limit,
+        }
+    
+    # A real run skips models whose keys are not set, so they cost nothing
+    skipped = [name for name, plan in plans.items() if plan['missing_env']]
+    
+    def total(field):
+        values = [plan[field] for name, plan in plans.items() if name not in skipped]
+        return None if any(value is None for value in values) else sum(values)
+    
+    return {
+        'settings': {'structured': structured, 'samples': samples, 'pack_size': pack_size,
+                     'concurrency': concurrency, 'shard': '/'.join(map(str, shard)) if shard else None},
+        'models': plans,
+        'skipped_models': skipped,
+        'requests': total('requests'),
+        'prompt_tokens': total('prompt_tokens'),
+        'completion_tokens': total('completion_tokens'),
+        'cost_usd': total('cost_usd'),
+        'max_cost_usd': total('max_cost_usd'),
+        # Models are evaluated one after another
+        'min_wall_time_s': total('min_wall_time_s'),
+    }
+
+
+def _duration(seconds: float) -> str:
+    if seconds < 90:
+        return f"{seconds:.0f}s"
+    if seconds < 90 * 60:
+        return f"{seconds / 60:.1f} min"
+    return f"{seconds / 3600:.1f} h"
+
+
+def _usd(value) -> str:
+    return "unknown" if value is None else f"${value:,.2f}"
+
+
+def print_plan(plan: Dict):
+    """Print a run plan"""
+    settings = plan['settings']
+    print(f"\n{'='*60}")
+    shard = f", shard {settings['shard']}" if settings.get('shard') else ""
+    print(f"🧮 Run plan (concurrency {settings['concurrency']}, pack size {settings['pack_size']}, "
+          f"{settings['samples']} sample(s), {'structured' if settings['structured'] else 'free-text'} output"
+          f"{shard})")
+    print(f"{'='*60}")
+    for name, model in plan['models'].items():
+        estimated = " (estimated)" if model['tokens_estimated'] else ""
+        print(f"\n  {name} [{model['tokenizer']}]")
+        if model['missing_env']:
+            print(f"    ⏭️  Would be skipped: {', '.join(model['missing_env'])} not set (not in the total)")
+        print(f"    Requests: {model['requests']:,} for {model['cases']:,} cases")
+        print(f"    Tokens: {model['prompt_tokens']:,} prompt{estimated}, ~{model['completion_tokens']:,} completion")
+        print(f"    Cost: ~{_usd(model['cost_usd'])} with prompt caching, {_usd(model['cost_uncached_usd'])} "
+              f"without, at most {_usd(model['max_cost_usd'])}")
+        limits = model['rate_limits']
+        print(f"    Minimum wall time: {_duration(model['min_wall_time_s'])} "
+              f"(bound by {model['bound_by'].replace('_', ' ')}; {model['latency_s']:.1f}s/request, "
+              f"{limits['rpm'] or '?'} RPM, {limits['tpm'] or '?'} TPM)")
+    
+    evaluated = len(plan['models']) - len(plan['skipped_models'])
+    print(f"\n  Total for {evaluated} model(s): {plan['requests']:,} requests, ~{_usd(plan['cost_usd'])} "
+          f"(at most {_usd(plan['max_cost_usd'])}), at least {_duration(plan['min_wall_time_s'])}")
+    if plan['skipped_models']:
+        print(f"  Not counted (keys not set): {', '.join(plan['skipped_models'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estimate the cost and duration of a benchmark run")
+    parser.add_argument("--dataset", default=None, help="Dataset file (default: the generated dataset)")
+    parser.add_argument("--models-config", default=None, help="Model config (default: models.yaml)")
+    parser.add_argument("--models", default=None, help="Comma-separated models (default: all enabled)")
+    parser.add_argument("--structured", action="store_true", help="Plan for structured output")
+    parser.add_argument("--samples", type=int, default=1)
+    parser.add_argument("--pack-size", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--shard", default=None, help="i/N: plan only shard i of N (as run_benchmark --shard)")
+    parser.add_argument("--history", help="Previous results file for completion tokens and latency")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
+    parser.add_argument("--json", dest="json_path", help="Write the plan as JSON")
+    args = parser.parse_args(argv)
+    
+    specs = {name: spec for name, spec in load_specs(args.models_config).items() if spec.enabled}
+    if args.models:
+        names = args.models.split(',')
+        unknown = [name for name in names if name not in specs]
+        if unknown:
+            parser.error(f"Unknown or disabled models: {', '.join(unknown)}")
+        specs = {name: specs[name] for name in names}
+    if args.shard:
+        try:
+            parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+    
+    dataset = args.dataset if args.dataset else TestCaseGenerator().generate_all()
+    plan = plan_run(dataset, specs, structured=args.structured, samples=args.samples,
+                    pack_size=args.pack_size, concurrency=args.concurrency,
+                    history=load_history(args.history) if args.history else None,
+                    workers=args.workers, shard=args.shard)
+    print_plan(plan)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(plan, f, indent=2)
+        print(f"\n💾 Plan saved to: {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
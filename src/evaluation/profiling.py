@@ -0,0 +1,135 @@
+"""
+Lightweight stage profiling for the evaluation pipeline
+
+BenchmarkEvaluator and the model wrappers wrap each pipeline stage
+(prompt formatting, network, parsing, scoring, result writing) in a span.
+Hooks registered on a StageProfiler receive monotonic start/end timestamps
+for every span, so bottlenecks can be found without an external profiler.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+
+# Stages emitted by the evaluator and model wrappers
+PIPELINE_STAGES = ('format_prompt', 'network', 'parse_response', 'score', 'metrics', 'write_results')
+
+
+class StageProfiler:
+    """Dispatch stage start/end events to registered hooks"""
+    
+    def __init__(self):
+        self._start_hooks: List[Callable] = []
+        self._end_hooks: List[Callable] = []
+    
+    def on_stage_start(self, hook: Callable) -> Callable:
+        """
+        Register a hook called as hook(stage, start, attrs) when a stage begins.
+        
+        Returns the hook so this can be used as a decorator.
+        """
+        self._start_hooks.append(hook)
+        return hook
+    
+    def on_stage_end(self, hook: Callable) -> Callable:
+        """
+        Register a hook called as hook(stage, start, end, attrs) when a stage ends.
+        
+        Returns the hook so this can be used as a decorator.
+        """
+        self._end_hooks.append(hook)
+        return hook
+    
+    @contextmanager
+    def span(self, stage: str, **attrs):
+        """Time a pipeline stage (timestamps come from time.monotonic)"""
+        start = time.monotonic()
+        for hook in self._start_hooks:
+            hook(stage, start, attrs)
+        try:
+            yield
+        finally:
+            end = time.monotonic()
+            for hook in self._end_hooks:
+                hook(stage, start, end, attrs)
+
+
+class StageAggregator:
+    """Built-in on_stage_end hook that aggregates time spent per stage"""
+    
+    def __init__(self):
+        self._durations: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+    
+    def __call__(self, stage: str, start: float, end: float, attrs: Dict):
+        with self._lock:
+            self._durations.setdefault(stage, []).append(end - start)
+    
+    def summary(self) -> Dict[str, Dict]:
+        """Per-stage count, total, mean, p95 and max seconds, plus share of total time"""
+        with self._lock:
+            durations = {stage: sorted(values) for stage, values in self._durations.items()}
+        
+        grand_total = sum(sum(values) for values in durations.values())
+        summary = {}
+        for stage, values in durations.items():
+            total = sum(values)
+            summary[stage] = {
+                'count': len(values),
+                'total_s': total,
+                'mean_s': total / len(values),
+                'p95_s': values[min(len(values) - 1, int(0.95 * len(values)))],
+                'max_s': values[-1],
+                'share': total / grand_total if grand_total else 0.0,
+            }
+        return summary
+    
+    def print_report(self):
+        """Print the stage breakdown, slowest stage first"""
+        summary = self.summary()
+        if not summary:
+            return
+        
+        print(f"\n⏱️  Pipeline stage breakdown:")
+        for stage, stats in sorted(summary.items(), key=lambda item: -item[1]['total_s']):
+            print(f"    {stage:<16} {stats['total_s']:8.3f}s total  {stats['share']:6.1%}  "
+                  f"(n={stats['count']}, mean={stats['mean_s'] * 1000:.2f}ms, "
+                  f"p95={stats['p95_s'] * 1000:.2f}ms)")
+
+
+class ChromeTraceExporter:
+    """
+    on_stage_end hook that records spans as Chrome trace events.
+    
+    The written file can be opened in chrome://tracing or https://ui.perfetto.dev
+    """
+    
+    def __init__(self):
+        self._events: List[Dict] = []
+        self._lock = threading.Lock()
+    
+    def __call__(self, stage: str, start: float, end: float, attrs: Dict):
+        event = {
+            'name': stage,
+            'ph': 'X',
+            'ts': start * 1e6,
+            'dur': (end - start) * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': {key: str(value) for key, value in attrs.items()},
+        }
+        with self._lock:
+            self._events.append(event)
+    
+    def write(self, filepath: str):
+        """Write collected spans as trace-event JSON"""
+        with self._lock:
+            events = list(self._events)
+        
+        with open(filepath, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        print(f"🧭 Trace saved to: {filepath}")
@@ -0,0 +1,346 @@
+"""
+Compact in-memory store for per-case results
+
+A run keeps every model's results in memory until save_results. As plain
+dicts that costs a few KB per case, dominated by the reasoning and
+raw_response strings. ModelResults stores the same rows column-wise
+instead:
+
+- ratings as uint8 codes (validity 1-6, reliability A-F as 1-6, 0 = none)
+- the correctness flags as bits of one byte
+- usage numbers in typed arrays
+- category names dictionary-coded
+- reasoning and raw_response spilled to a temporary file as soon as a row
+  is appended, with only their offsets kept in memory
+
+That is under 100 bytes per case, or tens of MB for a million-case run.
+Rows are rebuilt on access as dicts equal to the ones appended, with the
+keys in the same order, so consumers and the saved JSON are unchanged. Any
+value that does not fit its column (an unexpected type, a rating outside
+the scale) is kept as-is for that row.
+
+A ModelResults indexes, slices, iterates and compares like a list of
+dicts, but it is not a list: json.dump it via to_list(), and read it
+before close() deletes the spill file.
+"""
+
+import math
+import tempfile
+import threading
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Iterator
+
+from ..models.base_model import USAGE_FIELDS
+
+
+# Row keys in the order _score_case writes them
+CORE_FIELDS = (
+    'test_case_id', 'category', 'expected_validity', 'predicted_validity',
+    'expected_reliability', 'predicted_reliability',
+    'validity_correct', 'reliability_correct', 'correct',
+    'reasoning', 'raw_response',
+)
+FIELDS = CORE_FIELDS + tuple(USAGE_FIELDS)
+TEXT_FIELDS = ('reasoning', 'raw_response')
+FLAG_FIELDS = ('validity_correct', 'reliability_correct', 'correct')
+FLOAT_FIELDS = tuple(field for field in USAGE_FIELDS if field in ('latency_s', 'ttfb_s', 'cost_usd'))
+INT_FIELDS = tuple(field for field in USAGE_FIELDS if field not in FLOAT_FIELDS)
+
+RELIABILITY_LETTERS = 'ABCDEF'
+_RELIABILITY_CODES = {letter: code for code, letter in enumerate(RELIABILITY_LETTERS, start=1)}
+_INT_NONE = -1
+_INT_MAX = 2 ** 31 - 1
+
+
+def _validity_code(value, allow_none: bool):
+    """uint8 code of a validity rating, or None if it does not fit"""
+    if value is None:
+        return 0 if allow_none else None
+    if type(value) is int and 1 <= value <= 6:
+        return value
+    return None
+
+
+def _reliability_codes(value):
+    """bytes of reliability codes, or None if the list does not fit"""
+    if type(value) is not list or len(value) > 255:
+        return None
+    codes = [_RELIABILITY_CODES.get(letter) if type(letter) is str else None for letter in value]
+    if None in codes:
+        return None
+    return bytes(codes)
+
+
+class ModelResults(Sequence):
+    """
+    One model's per-case results, stored column-wise.
+    
+    Behaves like a read-only list of result dicts with append/extend;
+    to_list() returns a real list.
+    """
+    
+    def __init__(self, rows=(), spill_dir: str = None):
+        """
+        Args:
+            rows: Initial result rows
+            spill_dir: Directory for the text spill file (default: system temp)
+        """
+        self._count = 0
+        self._case_ids = []
+        self._categories = []
+        self._category_codes = {}
+        self._category = array('H')
+        self._expected_validity = array('B')
+        self._predicted_validity = array('B')
+        # Expected and predicted reliability codes, back to back per row
+        self._reliability = bytearray()
+        self._reliability_start = array('I')
+        self._reliability_lengths = array('B')
+        self._flags = array('B')
+        self._floats = {field: array('d') for field in FLOAT_FIELDS}
+        self._ints = {field: array('i') for field in INT_FIELDS}
+        # Reasoning and raw_response, back to back per row, in the spill file
+        self._text_start = array('Q')
+        self._text_lengths = array('I')
+        # Row index -> values that did not fit a column, and keys beyond FIELDS
+        self._extra = {}
+        # Row index -> whole row, for rows whose keys do not follow FIELDS
+        self._fallback = {}
+        
+        self._spill = tempfile.TemporaryFile(dir=spill_dir, prefix='results-text-')
+        self._spill_size = 0
+        # Appends and reads share the file position
+        self._spill_lock = threading.Lock()
+        
+        self.extend(rows)
+    
+    def append(self, row: Dict):
+        keys = list(row)
+        if keys[:len(FIELDS)] != list(FIELDS):
+            self._fallback[self._count] = row
+            self._append_placeholder()
+            return
+        
+        extra = {key: row[key] for key in keys[len(FIELDS):]}
+        
+        case_id = row['test_case_id']
+        self._case_ids.append(case_id if type(case_id) is str else None)
+        if type(case_id) is not str:
+            extra['test_case_id'] = case_id
+        
+        category = row['category']
+        code = self._category_codes.get(category) if type(category) is str else None
+        if code is None and type(category) is str and len(self._categories) <= 0xFFFF:
+            code = self._category_codes[category] = len(self._categories)
+            self._categories.append(category)
+        if code is None:
+            code = 0
+            extra['category'] = category
+        self._category.append(code)
+        
+        expected = _validity_code(row['expected_validity'], allow_none=False)
+        if expected is None:
+            expected = 0
+            extra['expected_validity'] = row['expected_validity']
+        self._expected_validity.append(expected)
+        predicted = _validity_code(row['predicted_validity'], allow_none=True)
+        if predicted is None:
+            predicted = 0
+            extra['predicted_validity'] = row['predicted_validity']
+        self._predicted_validity.append(predicted)
+        
+        self._reliability_start.append(len(self._reliability))
+        for field in ('expected_reliability', 'predicted_reliability'):
+            codes = _reliability_codes(row[field])
+            if codes is None:
+                codes = b''
+                extra[field] = row[field]
+            self._reliability += codes
+            self._reliability_lengths.append(len(codes))
+        
+        flags = 0
+        for bit, field in enumerate(FLAG_FIELDS):
+            if type(row[field]) is bool:
+                flags |= row[field] << bit
+            else:
+                extra[field] = row[field]
+        self._flags.append(flags)
+        
+        for field, column in self._floats.items():
+            value = row[field]
+            if value is None:
+                column.append(math.nan)
+            elif type(value) is float and not math.isnan(value):
+                column.append(value)
+            else:
+                column.append(math.nan)
+                extra[field] = value
+        for field, column in self._ints.items():
+            value = row[field]
+            if value is None:
+                column.append(_INT_NONE)
+            elif type(value) is int and 0 <= value <= _INT_MAX:
+                column.append(value)
+            else:
+                column.append(_INT_NONE)
+                extra[field] = value
+        
+        self._text_start.append(self._spill_size)
+        texts = []
+        for field in TEXT_FIELDS:
+            text = row[field]
+            if type(text) is str:
+                texts.append(text.encode('utf-8'))
+            else:
+                texts.append(b'')
+                extra[field] = text
+            self._text_lengths.append(len(texts[-1]))
+        data = b''.join(texts)
+        if data:
+            with self._spill_lock:
+                self._spill.seek(self._spill_size)
+                self._spill.write(data)
+            self._spill_size += len(data)
+        
+        if extra:
+            self._extra[self._count] = extra
+        self._count += 1
+    
+    def _append_placeholder(self):
+        """Keep the columns aligned for a row stored whole"""
+        self._case_ids.append(None)
+        self._category.append(0)
+        self._expected_validity.append(0)
+        self._predicted_validity.append(0)
+        self._reliability_start.append(len(self._reliability))
+        self._reliability_lengths.extend((0, 0))
+        self._flags.append(0)
+        for column in self._floats.values():
+            column.append(math.nan)
+        for column in self._ints.values():
+            column.append(_INT_NONE)
+        self._text_start.append(self._spill_size)
+        self._text_lengths.extend((0, 0))
+        self._count += 1
+    
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def _read_text(self, index: int):
+        """(reasoning, raw_response) of a row from the spill file"""
+        reasoning_length, raw_length = self._text_lengths[2 * index], self._text_lengths[2 * index + 1]
+        if reasoning_length + raw_length == 0:
+            return '', ''
+        # seek + read rather than os.pread, which Windows lacks
+        with self._spill_lock:
+            self._spill.seek(self._text_start[index])
+            data = self._spill.read(reasoning_length + raw_length)
+        return (data[:reasoning_length].decode('utf-8'), data[reasoning_length:].decode('utf-8'))
+    
+    def _row(self, index: int, text: bool = True) -> Dict:
+        if index in self._fallback:
+            row = self._fallback[index]
+            if text:
+                return dict(row)
+            return {key: value for key, value in row.items() if key not in TEXT_FIELDS}
+        
+        extra = self._extra.get(index, {})
+        start = self._reliability_start[index]
+        expected_length = self._reliability_lengths[2 * index]
+        predicted_length = self._reliability_lengths[2 * index + 1]
+        flags = self._flags[index]
+        predicted = self._predicted_validity[index]
+        
+        row = {
+            'test_case_id': self._case_ids[index],
+            'category': self._categories[self._category[index]] if self._categories else None,
+            'expected_validity': self._expected_validity[index],
+            'predicted_validity': predicted or None,
+            'expected_reliability': [RELIABILITY_LETTERS[code - 1] for code in
+                                     self._reliability[start:start + expected_length]],
+            'predicted_reliability': [RELIABILITY_LETTERS[code - 1] for code in
+                                      self._reliability[start + expected_length:
+                                                        start + expected_length + predicted_length]],
+        }
+        for bit, field in enumerate(FLAG_FIELDS):
+            row[field] = bool(flags >> bit & 1)
+        if text:
+            row['reasoning'], row['raw_response'] = self._read_text(index)
+        for field in USAGE_FIELDS:
+            if field in self._floats:
+                value = self._floats[field][index]
+                row[field] = None if math.isnan(value) else value
+            else:
+                value = self._ints[field][index]
+                row[field] = None if value == _INT_NONE else value
+        
+        for key, value in extra.items():
+            if text or key not in TEXT_FIELDS:
+                row[key] = value
+        return row
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("result index out of range")
+        return self._row(index)
+    
+    def __iter__(self) -> Iterator[Dict]:
+        for index in range(self._count):
+            yield self._row(index)
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, ModelResults)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+    
+    def to_list(self) -> list:
+        """The rows as a plain list of dicts (e.g. for json.dump)"""
+        return list(self)
+    
+    def without_text(self) -> 'ResultsView':
+        """The rows without reasoning and raw_response (no disk reads); for metrics"""
+        return ResultsView(self)
+    
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns (excluding rows kept whole)"""
+        columns = [self._category, self._expected_validity, self._predicted_validity,
+                   self._reliability_start, self._reliability_lengths, self._flags,
+                   self._text_start, self._text_lengths,
+                   *self._floats.values(), *self._ints.values()]
+        return (sum(column.itemsize * len(column) for column in columns)
+                + len(self._reliability) + 8 * len(self._case_ids))
+    
+    def close(self):
+        """Delete the text spill file"""
+        self._spill.close()
+    
+    def __repr__(self) -> str:
+        return f"ModelResults({self._count} rows)"
+
+
+class ResultsView(Sequence):
+    """Read-only rows of a ModelResults without the spilled text fields"""
+    
+    def __init__(self, results: ModelResults):
+        self.results = results
+    
+    def __len__(self) -> int:
+        return len(self.results)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.results._row(i, text=False) for i in range(*index.indices(len(self)))]
+        return self.results._row(range(len(self))[index], text=False)
+    
+    def __iter__(self) -> Iterator[Dict]:
+        for index in range(len(self)):
+            yield self.results._row(index, text=False)
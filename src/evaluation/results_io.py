@@ -0,0 +1,243 @@
+"""
+Streaming reader and writer for results files
+
+Results files are a JSON object mapping each model name to a list of result
+rows. These helpers read and write them one row at a time, so tools that
+combine or compare runs never hold a whole file in memory, and the writer
+produces exactly the bytes json.dump(results, f, indent=2) would.
+
+Results can also be stored as JSON lines (.jsonl), one
+{"model": ..., "result": {...}} object per row with each model's rows
+together, and either format can be zstd- or gzip-compressed (see data_io).
+"""
+
+import json
+from typing import Dict, Iterator, Tuple
+
+from ..data_io import dumps_line, is_jsonl, loads, open_text
+
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+class _Scanner:
+    """Pulls JSON tokens and values out of a file read in chunks"""
+    
+    def __init__(self, f, chunk_size: int = 1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+    
+    def _fill(self) -> bool:
+        """Read another chunk; returns False at end of file"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+    
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of file)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+    
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed results file: expected {char!r}, found {found!r}")
+        self.pos += 1
+    
+    def value(self):
+        """Decode the next JSON value, reading more of the file as needed"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number may continue past the end of the buffer
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def is_skipped(row: Dict) -> bool:
+    """Whether the case was never sent (cancelled run or open circuit breaker)"""
+    return bool(row.get('skipped'))
+
+
+def is_error(row: Dict) -> bool:
+    """Whether the model call failed for this case (as opposed to answering wrongly)"""
+    if row.get('error'):
+        return True
+    return row.get('predicted_validity') is None and str(row.get('reasoning', '')).startswith('Error:')
+
+
+def iter_results(path: str) -> Iterator[Tuple[str, Dict]]:
+    """
+    Yield (model_name, result_row) pairs from a results file, in file order.
+    
+    Models with no rows yield nothing; use iter_models for the model list.
+    """
+    for model_name, rows in iter_models(path):
+        for row in rows:
+            yield model_name, row
+
+
+def iter_models(path: str) -> Iterator[Tuple[str, Iterator[Dict]]]:
+    """
+    Yield (model_name, rows) for each model in a results file.
+    
+    rows is a generator over that model's result rows; it must be consumed
+    (or abandoned) before advancing to the next model.
+    """
+    if is_jsonl(path):
+        yield from _iter_jsonl_models(path)
+        return
+    
+    with open_text(path) as f:
+        scanner = _Scanner(f)
+        scanner.expect('{')
+        if scanner.peek() == '}':
+            return
+        while True:
+            model_name = scanner.value()
+            scanner.expect(':')
+            scanner.expect('[')
+            state = {'done': scanner.peek() == ']'}
+            if state['done']:
+                scanner.pos += 1
+            
+            def rows(state=state):
+                while not state['done']:
+                    yield scanner.value()
+                    if scanner.peek() == ',':
+                        scanner.pos += 1
+                    else:
+                        scanner.expect(']')
+                        state['done'] = True
+            
+            yield model_name, rows()
+            # Skip whatever the caller did not read
+            for _ in rows():
+                pass
+            if scanner.peek() == ',':
+                scanner.pos += 1
+                continue
+            scanner.expect('}')
+            return
+
+
+def _iter_jsonl_models(path: str) -> Iterator[Tuple[str, Iterator[Dict]]]:
+    """iter_models for JSON lines; each run of lines with the same model is one model"""
+    with open_text(path) as f:
+        lines = (loads(line) for line in f if line.strip())
+        state = {'next': next(lines, None)}
+        
+        def rows(model_name):
+            while state['next'] is not None and state['next']['model'] == model_name:
+                row = state['next']['result']
+                state['next'] = next(lines, None)
+                yield row
+        
+        while state['next'] is not None:
+            model_name = state['next']['model']
+            yield model_name, rows(model_name)
+            # Skip whatever the caller did not read
+            for _ in rows(model_name):
+                pass
+
+
+def load_results(path: str) -> Dict[str, list]:
+    """A whole results file (any format) as {model_name: [rows]}"""
+    results = {}
+    for model_name, rows in iter_models(path):
+        results.setdefault(model_name, []).extend(rows)
+    return results
+
+
+def open_results_writer(path: str):
+    """
+    Open path for writing and return (file, writer) for its format.
+    
+    The caller closes the writer, then the file.
+    """
+    f = open_text(path, 'w')
+    return f, (JsonlResultsWriter(f) if is_jsonl(path) else ResultsWriter(f))
+
+
+class ResultsWriter:
+    """
+    Write a results file one row at a time.
+    
+    The output is byte-identical to json.dump(results, f, indent=2) for the
+    same models and rows.
+    """
+    
+    def __init__(self, f):
+        self.f = f
+        self.models = 0
+        self.rows = 0
+        self.f.write('{')
+    
+    def start_model(self, model_name: str):
+        """Begin the row list of the next model"""
+        if self.models:
+            self.f.write(self._close_list())
+            self.f.write(',')
+        self.f.write(f'\n  {json.dumps(model_name)}: [')
+        self.models += 1
+        self.rows = 0
+    
+    def write_row(self, row: Dict):
+        text = json.dumps(row, indent=2).replace('\n', '\n    ')
+        self.f.write(f"{',' if self.rows else ''}\n    {text}")
+        self.rows += 1
+    
+    def _close_list(self) -> str:
+        return '\n  ]' if self.rows else ']'
+    
+    def close(self):
+        """Finish the file (the underlying file object is left open)"""
+        if self.models:
+            self.f.write(self._close_list())
+            self.f.write('\n')
+        self.f.write('}')
+
+
+class JsonlResultsWriter:
+    """ResultsWriter counterpart writing JSON lines"""
+    
+    def __init__(self, f):
+        self.f = f
+        self.model_name = None
+        self.models = 0
+        self.rows = 0
+    
+    def start_model(self, model_name: str):
+        self.model_name = model_name
+        self.models += 1
+        self.rows = 0
+    
+    def write_row(self, row: Dict):
+        self.f.write(dumps_line({'model': self.model_name, 'result': row}))
+        self.f.write('\n')
+        self.rows += 1
+    
+    def close(self):
+        """Nothing to finish; models without rows are not recorded"""
@@ -4,26 +4,91 @@ A1Facts Benchmark Evaluation Pipeline with Comet Integration
 
 import json
 import os
-from typing import List, Dict
+import time
+from collections import deque
+from typing import List, Dict, Sequence
 from datetime import datetime
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from tqdm import tqdm
 import comet_ml
 from dotenv import load_dotenv
 
-from ..models import GPT4Model, ClaudeModel, GeminiModel
+from ..data_io import load_records
+from ..models.base_model import USAGE_FIELDS
+from ..models.cancellation import CancelScope, cancel_on_interrupt
+from ..models.circuit_breaker import CLOSED, OPEN, CircuitBreaker
+from ..models.registry import ModelRegistry
+from ..models.singleflight import SingleFlight
 from ..data_generation import TestCaseGenerator
+from .profiling import StageProfiler, StageAggregator, ChromeTraceExporter
+from .result_store import ModelResults
+from .blob_store import BLOB_FILE, BlobStore
+from .grouped_metrics import GROUP_SEPARATOR
+from .metric_registry import METRICS, CsvSink, MetricRun, MetricSink
+from .results_io import open_results_writer
+
+
+# Results file extensions save_results can write (see data_io)
+RESULTS_FORMATS = ('json', 'jsonl', 'json.gz', 'jsonl.gz', 'json.zst', 'jsonl.zst')
+
+# How often the evaluator checks for Ctrl-C and the run budget while waiting on a request
+CANCEL_POLL_S = 0.1
+
+# Metrics each consumer asks the registry for (see metric_registry.py)
+CONSOLE_METRICS = (
+    'total_cases', 'scored_cases', 'skipped_cases', 'errored_cases', 'error_rate',
+    'validity_accuracy', 'validity_macro_f1', 'validity_?_*',
+    'reliability_accuracy', 'reliability_macro_f1', 'reliability_?_*',
+    'strict_*', 'by_*', 'mean_*_agreement', 'unanimous_validity_rate',
+    'latency_p*', 'throughput_cases_per_s', 'total_*', 'cached_prompt_ratio',
+    'coalesced_calls', 'circuit_*', 'hedge*',
+)
+COMET_METRICS = ('*', '!*_confusion_matrix', '!by_*', '!circuit_state')
+PACKING_METRICS = (
+    'total_cases', 'strict_accuracy', 'validity_accuracy', 'reliability_accuracy',
+    'throughput_cases_per_s', 'total_prompt_tokens', 'total_completion_tokens', 'total_cost_usd',
+)
 
 
 class BenchmarkEvaluator:
     """Main evaluation pipeline with Comet experiment tracking"""
     
-    def __init__(self, dataset_path: str = None):
+    def __init__(self, dataset_path: str = None, profiler: StageProfiler = None,
+                 trace_path: str = None, model_options: Dict = None,
+                 models: Dict = None, models_config: str = None, shard: str = None,
+                 coalesce: bool = True, circuit_breaker=True, group_by: List = None,
+                 saved_metrics: Sequence[str] = ('*',), metric_sinks: List[MetricSink] = None):
+        """
+        Args:
+            dataset_path: JSON dataset to evaluate (generated if missing)
+            profiler: StageProfiler to attach custom on_stage_start/on_stage_end hooks to
+            trace_path: Optional Chrome trace-event JSON file written by save_results
+            model_options: Options passed to every model wrapper, e.g.
+                {'structured_output': True} or {'stream': True}
+            models: Pre-built model wrappers by name (e.g. a MockModel) to
+                evaluate instead of the configured models
+            models_config: Model config file (default: models.yaml at the repo root)
+            shard: "i/N" to evaluate only the i-th of N hash-assigned slices of
+                the dataset (see sharding.py)
+            coalesce: Share one request between concurrent identical requests
+                (same model and prompt) instead of sending both
+            circuit_breaker: Stop sending requests to a failing provider and
+                model: True for defaults, a dict of CircuitBreaker arguments
+                (e.g. {'on_open': 'pause'}), or False to disable
+            group_by: Also report metrics per group of these case attributes,
+                e.g. ['category', 'n_sources', 'type+triangulation_logic']
+                (see grouped_metrics.GROUP_ATTRIBUTES)
+            saved_metrics: Names or patterns of the metrics kept in
+                self.metrics and the metrics file, e.g. ['*', '!*_confusion_matrix']
+            metric_sinks: MetricSinks (e.g. a CsvSink) sent each model's
+                metrics after it is evaluated
+        """
         load_dotenv()
         
         # Load or generate dataset
         if dataset_path and os.path.exists(dataset_path):
-            with open(dataset_path, 'r') as f:
-                self.dataset = json.load(f)
+            self.dataset = load_records(dataset_path)
             print(f"📁 Loaded {len(self.dataset)} test cases from {dataset_path}")
         else:
             print("📝 Generating new dataset...")
@@ -31,86 +96,125 @@ class BenchmarkEvaluator:
             self.dataset = generator.generate_all()
             print(f"✅ Generated {len(self.dataset)} test cases")
         
+        self.shard = None
+        if shard:
+            # Imported here so `python -m src.evaluation.sharding` does not import itself twice
+            from .sharding import parse_shard, select_shard
+            self.shard = parse_shard(shard)
+            total = len(self.dataset)
+            self.dataset = select_shard(self.dataset, *self.shard)
+            print(f"🔪 Shard {self.shard[0]}/{self.shard[1]}: {len(self.dataset)} of {total} test cases")
+        
         # Initialize models
-        self.models = {}
-        self._init_models()
+        self.model_options = model_options or {}
+        self.models_config = models_config
+        if models is not None:
+            self.models = dict(models)
+        else:
+            self._init_models()
+        
+        # Metrics per model from the most recent run (saved alongside results)
+        self.metrics = {}
+        self.group_by = [
+            tuple(spec.split(GROUP_SEPARATOR)) if isinstance(spec, str) else tuple(spec)
+            for spec in group_by or ()
+        ]
+        self.saved_metrics = saved_metrics
+        self.metric_sinks = list(metric_sinks or ())
+        
+        # Concurrent requests with the same (model, prompt) share one call
+        self.singleflight = SingleFlight() if coalesce else None
+        
+        # Time budget and Ctrl-C cancellation of the current run (see run_evaluation)
+        self.cancel_scope = None
+        
+        # One circuit breaker per (provider, model), created on first use
+        if circuit_breaker is True:
+            circuit_breaker = {}
+        self.circuit_breaker_options = circuit_breaker if isinstance(circuit_breaker, dict) else None
+        self.circuit_breakers = {}
+        
+        # Stage profiling: built-in aggregation, optional Chrome trace export
+        self.profiler = profiler or StageProfiler()
+        self.stage_stats = StageAggregator()
+        self.profiler.on_stage_end(self.stage_stats)
+        self.trace_path = trace_path
+        self.trace_exporter = None
+        if trace_path:
+            self.trace_exporter = ChromeTraceExporter()
+            self.profiler.on_stage_end(self.trace_exporter)
         
         # Comet setup
         self.comet_api_key = os.getenv("COMET_API_KEY")
         self.comet_project = os.getenv("COMET_PROJECT_NAME", "a1facts-benchmark")
         self.comet_workspace = os.getenv("COMET_WORKSPACE")
-        
+    
     def _init_models(self):
-        """Initialize available models"""
+        """Offer the models configured in models.yaml; clients are built on first use"""
         print("\n🤖 Initializing models...")
+        self.models = ModelRegistry.from_config(self.models_config, self.model_options)
         
-        if os.getenv("OPENAI_API_KEY"):
-            # GPT-4o family
-            try:
-                self.models['gpt-4o'] = GPT4Model("gpt-4o")
-                print("  ✅ GPT-4o initialized")
-            except Exception as e:
-                print(f"  ⚠️  GPT-4o failed: {e}")
-            
-            try:
-                self.models['gpt-4o-mini'] = GPT4Model("gpt-4o-mini")
-                print("  ✅ GPT-4o-mini initialized")
-            except Exception as e:
-                print(f"  ⚠️  GPT-4o-mini failed: {e}")
-            
-            # GPT-4 Turbo
-            try:
-                self.models['gpt-4-turbo'] = GPT4Model("gpt-4-turbo")
-                print("  ✅ GPT-4-turbo initialized")
-            except Exception as e:
-                print(f"  ⚠️  GPT-4-turbo failed: {e}")
-            
-            # Standard GPT-4
-            try:
-                self.models['gpt-4'] = GPT4Model("gpt-4")
-                print("  ✅ GPT-4 initialized")
-            except Exception as e:
-                print(f"  ⚠️  GPT-4 failed: {e}")
-            
-            # GPT-3.5 Turbo (for comparison)
-            try:
-                self.models['gpt-3.5-turbo'] = GPT4Model("gpt-3.5-turbo")
-                print("  ✅ GPT-3.5-turbo initialized")
-            except Exception as e:
-                print(f"  ⚠️  GPT-3.5-turbo failed: {e}")
-        
-        # Anthropic and Google models disabled - only using OpenAI
-        # if os.getenv("ANTHROPIC_API_KEY"):
-        #     try:
-        #         self.models['claude-3.5-sonnet'] = ClaudeModel("claude-3-5-sonnet-20241022")
-        #         print("  ✅ Claude 3.5 Sonnet initialized")
-        #     except Exception as e:
-        #         print(f"  ⚠️  Claude failed: {e}")
-        # 
-        # if os.getenv("GOOGLE_API_KEY"):
-        #     try:
-        #         self.models['gemini-2.0-flash'] = GeminiModel("gemini-2.0-flash-exp")
-        #         print("  ✅ Gemini 2.0 Flash initialized")
-        #     except Exception as e:
-        #         print(f"  ⚠️  Gemini failed: {e}")
+        for name, spec in self.models.specs.items():
+            if not spec.enabled:
+                continue
+            missing = spec.missing_env()
+            if missing:
+                print(f"  ⏭️  {name} skipped ({', '.join(missing)} not set)")
+            else:
+                print(f"  ✅ {name} configured")
         
         if not self.models:
-            raise ValueError("No models initialized. Please set OPENAI_API_KEY in .env file")
+            raise ValueError("No models available. Please set OPENAI_API_KEY in .env file "
+                             "(or the keys required by the models in models.yaml)")
     
-    def run_evaluation(self, model_names: List[str] = None, use_comet: bool = True):
+    def run_evaluation(self, model_names: List[str] = None, use_comet: bool = True,
+                       pack_size: int = 1, concurrency: int = 1, time_budget_s: float = None):
         """
         Run evaluation on specified models
         
+        Ctrl-C, or running out of time_budget_s, cancels the run: requests in
+        flight are abandoned, the remaining cases of the current model are
+        marked skipped (and left out of its metrics), models not started yet
+        are not run, and the results collected so far are returned as usual.
+        
         Args:
             model_names: List of model names to evaluate (None = all)
             use_comet: Whether to log to Comet
+            pack_size: Test cases packed into each request (1 = single-case mode)
+            concurrency: Requests (or packs/batches) in flight at once per model
+            time_budget_s: Wall-clock seconds the whole run may take (None = no limit)
+        
+        Returns:
+            {model_name: ModelResults}; each indexes, slices and iterates like a
+            list of result dicts, and to_list() converts it (e.g. for json.dump)
         """
         if model_names is None:
             model_names = list(self.models.keys())
         
+        self.cancel_scope = CancelScope(time_budget_s)
+        with cancel_on_interrupt(self.cancel_scope):
+            results = self._run_models(model_names, use_comet, pack_size, concurrency)
+        for sink in self.metric_sinks:
+            sink.close()
+        
+        self.stage_stats.print_report()
+        if self.singleflight and self.singleflight.coalesced:
+            print(f"\n🔗 Coalescing saved {self.singleflight.coalesced} of "
+                  f"{self.singleflight.calls + self.singleflight.coalesced} model calls")
+        
+        return results
+    
+    def _run_models(self, model_names: List[str], use_comet: bool, pack_size: int,
+                    concurrency: int) -> Dict:
+        """Evaluate each model in turn until done or the run is cancelled"""
         results = {}
         
-        for model_name in model_names:
+        for position, model_name in enumerate(model_names):
+            if self.cancel_scope.cancelled:
+                print(f"\n⏹️  Run cancelled ({self.cancel_scope.reason}); not evaluated: "
+                      f"{', '.join(model_names[position:])}")
+                break
+            
             if model_name not in self.models:
                 print(f"⚠️  Model {model_name} not available, skipping...")
                 continue
@@ -119,7 +223,12 @@ class BenchmarkEvaluator:
             print(f"🎯 Evaluating {model_name}")
             print(f"{'='*60}")
             
-            model = self.models[model_name]
+            # Clients are constructed here, on first use
+            try:
+                model = self.models[model_name]
+            except Exception as e:
+                print(f"⚠️  {model_name} failed to initialize: {e}")
+                continue
             
             # Initialize Comet experiment
             experiment = None
@@ -134,22 +243,26 @@ class BenchmarkEvaluator:
                     experiment.add_tag("a1facts-triangulation")
                     experiment.log_parameter("model", model_name)
                     experiment.log_parameter("dataset_size", len(self.dataset))
+                    experiment.log_parameter("pack_size", pack_size)
+                    for option, value in self.model_options.items():
+                        experiment.log_parameter(option, value)
                 except Exception as e:
                     print(f"⚠️  Warning: Failed to initialize Comet experiment: {e}")
                     print(f"   Continuing without Comet tracking for {model_name}")
                     experiment = None
             
             # Run evaluation
-            model_results = self._evaluate_model(model, experiment)
+            start = time.perf_counter()
+            model_results = self._evaluate_model(model, experiment, pack_size, concurrency)
+            wall_time = time.perf_counter() - start
             results[model_name] = model_results
             
             # Calculate and log metrics
-            metrics = self._calculate_metrics(model_results)
-            self._print_metrics(model_name, metrics)
+            run = self._report_metrics(model_name, model_results, wall_time, model)
             
             if experiment:
                 try:
-                    self._log_metrics_to_comet(experiment, metrics)
+                    self._log_metrics_to_comet(experiment, run.query(COMET_METRICS))
                     experiment.end()
                     print(f"✅ Logged {model_name} results to Comet successfully")
                 except Exception as e:
@@ -158,120 +271,262 @@ class BenchmarkEvaluator:
         
         return results
     
-    def _evaluate_model(self, model, experiment=None) -> List[Dict]:
-        """Evaluate a single model on all test cases"""
-        results = []
+    def _evaluate_model(self, model, experiment=None, pack_size: int = 1,
+                        concurrency: int = 1) -> ModelResults:
+        """
+        Evaluate a single model on all test cases
         
-        for test_case in tqdm(self.dataset, desc=f"Evaluating {model.model_name}"):
-            # Get model prediction
-            prediction = model.assess_validity(test_case)
-            
-            # Compare with ground truth
-            validity_correct = prediction['validity_rating'] == test_case['expected_validity']
-            
-            # Check if reliability scores match (must be same length and same ratings)
-            reliability_correct = (
-                len(prediction['reliability_scores']) == len(test_case['expected_reliability_scores']) and
-                prediction['reliability_scores'] == test_case['expected_reliability_scores']
-            )
-            
-            # Overall correctness: BOTH validity AND reliability must be correct
-            both_correct = validity_correct and reliability_correct
-            
-            result = {
-                'test_case_id': test_case['id'],
-                'category': test_case['category'],
-                'expected_validity': test_case['expected_validity'],
-                'predicted_validity': prediction['validity_rating'],
-                'expected_reliability': test_case['expected_reliability_scores'],
-                'predicted_reliability': prediction['reliability_scores'],
-                'validity_correct': validity_correct,
-                'reliability_correct': reliability_correct,
-                'correct': both_correct,  # Both must be correct
-                'reasoning': prediction['reasoning'],
-                'raw_response': prediction['raw_response']
-            }
-            
-            results.append(result)
-            
-            # No per-test-case logging to Comet (reduces noise)
+        If the run is cancelled (see run_evaluation), cases without an answer
+        yet get skipped results instead of waiting for their requests.
+        
+        Returns:
+            ModelResults, a list-like column store (to_list() for a plain list)
+        """
+        # Column store with the response text spilled to disk (see result_store.py)
+        results = ModelResults()
+        model.profiler = self.profiler
+        model.singleflight = self.singleflight
+        model.cancel_scope = scope = self.cancel_scope
+        model.circuit_breaker = breaker = self._circuit_breaker(model)
+        concurrency = max(1, concurrency)
+        
+        # Packs share one prompt; batches (local backends) share a forward pass
+        step = pack_size if pack_size > 1 else model.batch_size
+        batches = (self.dataset[start:start + step] for start in range(0, len(self.dataset), step))
+        
+        def assess(batch):
+            # Get model predictions (one request per pack)
+            if pack_size > 1:
+                return model.assess_validity_packed(batch)
+            if step > 1:
+                return model.assess_validity_batch(batch)
+            return [model.assess_validity(batch[0])]
+        
+        def collect(batch, future):
+            # Wait for a batch's predictions, polling so a cancelled run can walk away
+            while future is not None and scope is not None and not scope.cancelled:
+                try:
+                    return batch, future.result(timeout=CANCEL_POLL_S)
+                except FutureTimeoutError:
+                    pass
+            if future is not None and (scope is None or future.done()):
+                try:
+                    return batch, future.result()
+                except CancelledError:
+                    pass
+            if future is not None:
+                # Not started yet: drop it; already running: abandon it
+                future.cancel()
+            return batch, [model.skipped_result(test_case, scope.reason) for test_case in batch]
+        
+        def assessed_in_order():
+            # Requests run on worker threads even one at a time, so the main
+            # thread stays free to notice Ctrl-C and the run budget. A bounded
+            # window of requests is in flight, collected in dataset order.
+            pool = ThreadPoolExecutor(max_workers=concurrency)
+            try:
+                pending = deque()
+                for batch in batches:
+                    cancelled = scope is not None and scope.cancelled
+                    pending.append((batch, None if cancelled else pool.submit(assess, batch)))
+                    if len(pending) >= 2 * concurrency:
+                        yield collect(*pending.popleft())
+                while pending:
+                    yield collect(*pending.popleft())
+            finally:
+                # Abandoned requests end in the background within their timeout
+                pool.shutdown(wait=False, cancel_futures=True)
+        
+        with tqdm(total=len(self.dataset), desc=f"Evaluating {model.model_name}") as progress:
+            circuit_state = CLOSED
+            for batch, predictions in assessed_in_order():
+                for test_case, prediction in zip(batch, predictions):
+                    with self.profiler.span('score', model=model.model_name, test_case_id=test_case['id']):
+                        result = self._score_case(test_case, prediction)
+                    results.append(result)
+                
+                progress.update(len(batch))
+                if breaker is not None and breaker.state != circuit_state:
+                    circuit_state = breaker.state
+                    progress.set_postfix_str('' if circuit_state == CLOSED else f"circuit {circuit_state}")
+                
+                # No per-test-case logging to Comet (reduces noise)
+        
+        if scope is not None and scope.cancelled:
+            skipped = sum(1 for r in results.without_text() if r.get('skipped'))
+            print(f"⏹️  {model.model_name}: {skipped} of {len(results)} cases skipped ({scope.reason})")
         
         return results
     
-    def _calculate_metrics(self, results: List[Dict]) -> Dict:
-        """Calculate evaluation metrics with proper classification metrics"""
-        from sklearn.metrics import precision_recall_fscore_support, accuracy_score, confusion_matrix
-        import numpy as np
-        
-        total = len(results)
-        
-        # Extract validity ratings (1-6)
-        validity_true = [r['expected_validity'] for r in results if r['predicted_validity'] is not None]
-        validity_pred = [r['predicted_validity'] for r in results if r['predicted_validity'] is not None]
-        
-        # Extract reliability ratings (A-F) - flatten lists
-        reliability_true = []
-        reliability_pred = []
-        for r in results:
-            for i, expected_rel in enumerate(r['expected_reliability']):
-                if i < len(r['predicted_reliability']):
-                    reliability_true.append(expected_rel)
-                    reliability_pred.append(r['predicted_reliability'][i])
-        
-        metrics = {
-            'total_cases': total,
+    def _circuit_breaker(self, model):
+        """The circuit breaker shared by every wrapper of model's provider and model id"""
+        if self.circuit_breaker_options is None:
+            return None
+        key = (type(model).__name__, model.model_name)
+        if key not in self.circuit_breakers:
+            breaker = CircuitBreaker(model.model_name, **self.circuit_breaker_options)
+            breaker.on_state_change = self._report_circuit_change
+            self.circuit_breakers[key] = breaker
+        return self.circuit_breakers[key]
+    
+    @staticmethod
+    def _report_circuit_change(breaker, old: str, new: str, reason: str):
+        """Print circuit breaker state changes above the progress bar"""
+        if new == OPEN:
+            action = "failing fast" if breaker.on_open == 'fail' else "pausing requests"
+            message = f"⚡ Circuit open for {breaker.name} ({reason}); {action} for {breaker.cooldown_s:g}s"
+        elif new == CLOSED:
+            message = f"✅ Circuit closed for {breaker.name} ({reason})"
+        else:
+            message = f"🔌 Circuit half-open for {breaker.name} ({reason})"
+        tqdm.write(message)
+    
+    def _score_case(self, test_case: Dict, prediction: Dict) -> Dict:
+        """Compare a model prediction with the test case ground truth"""
+        # Compare with ground truth
+        validity_correct = prediction['validity_rating'] == test_case['expected_validity']
+        
+        # Check if reliability scores match (must be same length and same ratings)
+        reliability_correct = (
+            len(prediction['reliability_scores']) == len(test_case['expected_reliability_scores']) and
+            prediction['reliability_scores'] == test_case['expected_reliability_scores']
+        )
+        
+        # Overall correctness: BOTH validity AND reliability must be correct
+        both_correct = validity_correct and reliability_correct
+        
+        result = {
+            'test_case_id': test_case['id'],
+            'category': test_case['category'],
+            'expected_validity': test_case['expected_validity'],
+            'predicted_validity': prediction['validity_rating'],
+            'expected_reliability': test_case['expected_reliability_scores'],
+            'predicted_reliability': prediction['reliability_scores'],
+            'validity_correct': validity_correct,
+            'reliability_correct': reliability_correct,
+            'correct': both_correct,  # Both must be correct
+            'reasoning': prediction['reasoning'],
+            'raw_response': prediction['raw_response']
         }
         
-        # Validity metrics (1-6)
-        if validity_true and validity_pred:
-            val_accuracy = accuracy_score(validity_true, validity_pred)
-            val_precision, val_recall, val_f1, val_support = precision_recall_fscore_support(
-                validity_true, validity_pred, labels=[1,2,3,4,5,6], average=None, zero_division=0
-            )
-            
-            metrics['validity_accuracy'] = val_accuracy
-            metrics['validity_macro_f1'] = np.mean(val_f1)
-            
-            # Per-rating validity metrics
-            for rating in range(1, 7):
-                idx = rating - 1
-                metrics[f'validity_{rating}_precision'] = val_precision[idx]
-                metrics[f'validity_{rating}_recall'] = val_recall[idx]
-                metrics[f'validity_{rating}_f1'] = val_f1[idx]
-                metrics[f'validity_{rating}_support'] = int(val_support[idx])
-            
-            # Validity confusion matrix
-            val_cm = confusion_matrix(validity_true, validity_pred, labels=[1,2,3,4,5,6])
-            metrics['validity_confusion_matrix'] = val_cm.tolist()
-        
-        # Reliability metrics (A-F)
-        if reliability_true and reliability_pred:
-            rel_labels = ['A', 'B', 'C', 'D', 'E', 'F']
-            rel_accuracy = accuracy_score(reliability_true, reliability_pred)
-            rel_precision, rel_recall, rel_f1, rel_support = precision_recall_fscore_support(
-                reliability_true, reliability_pred, labels=rel_labels, average=None, zero_division=0
-            )
-            
-            metrics['reliability_accuracy'] = rel_accuracy
-            metrics['reliability_macro_f1'] = np.mean(rel_f1)
-            
-            # Per-rating reliability metrics
-            for i, rating in enumerate(rel_labels):
-                metrics[f'reliability_{rating}_precision'] = rel_precision[i]
-                metrics[f'reliability_{rating}_recall'] = rel_recall[i]
-                metrics[f'reliability_{rating}_f1'] = rel_f1[i]
-                metrics[f'reliability_{rating}_support'] = int(rel_support[i])
+        # Per-request latency, token and cost instrumentation
+        for field in USAGE_FIELDS:
+            result[field] = prediction.get(field)
+        
+        for key in ('error', 'stopped_early', 'usage_estimated', 'coalesced', 'skipped'):
+            if key in prediction:
+                result[key] = prediction[key]
+        
+        if 'packed_size' in prediction:
+            result['packed_size'] = prediction['packed_size']
+            result['packed_fallback'] = prediction['packed_fallback']
+        
+        # Self-consistency: vote agreement and the individual samples
+        for key in ('samples_k', 'validity_agreement', 'reliability_agreement',
+                    'sample_validity_ratings', 'sample_reliability_scores'):
+            if key in prediction:
+                result[key] = prediction[key]
+        
+        return result
+    
+    def compare_packing(self, model_name: str, pack_sizes: List[int] = (1, 5, 10)) -> Dict:
+        """
+        Measure the accuracy/throughput trade-off of packed prompts.
+        
+        Runs the full dataset once per pack size (pack size 1 is the
+        single-case baseline) and prints accuracy, throughput, tokens and cost.
+        
+        Returns:
+            Dict mapping pack size to the PACKING_METRICS and packed_fallback_rate
+        """
+        model = self.models[model_name]
+        comparison = {}
+        
+        for pack_size in pack_sizes:
+            print(f"\n📦 {model_name}: pack size {pack_size}")
+            start = time.perf_counter()
+            model_results = self._evaluate_model(model, pack_size=pack_size)
+            wall_time = time.perf_counter() - start
             
-            # Reliability confusion matrix
-            rel_cm = confusion_matrix(reliability_true, reliability_pred, labels=rel_labels)
-            metrics['reliability_confusion_matrix'] = rel_cm.tolist()
+            metrics = self._calculate_metrics(model_results, wall_time, PACKING_METRICS)
+            fallbacks = sum(1 for r in model_results if r.get('packed_fallback'))
+            metrics['packed_fallback_rate'] = fallbacks / len(model_results) if model_results else 0.0
+            comparison[pack_size] = metrics
         
-        # Overall strict accuracy (both validity AND all reliability scores correct)
-        both_correct = sum(1 for r in results if r.get('correct', False))
-        metrics['strict_accuracy'] = both_correct / total if total > 0 else 0
-        metrics['strict_correct'] = both_correct
+        print(f"\n📦 Packing trade-off for {model_name}:")
+        print(f"    {'Pack':>4}  {'Strict':>7}  {'Validity':>8}  {'Reliab.':>7}  {'Cases/s':>8}  "
+              f"{'Tok/case':>8}  {'$/case':>9}  {'Fallback':>8}")
+        for pack_size, metrics in comparison.items():
+            total = metrics['total_cases'] or 1
+            tokens = (metrics['total_prompt_tokens'] + metrics['total_completion_tokens']) / total
+            print(f"    {pack_size:>4}  {metrics['strict_accuracy']:>7.1%}  "
+                  f"{metrics.get('validity_accuracy', 0):>8.1%}  {metrics.get('reliability_accuracy', 0):>7.1%}  "
+                  f"{metrics.get('throughput_cases_per_s', 0):>8.2f}  {tokens:>8.0f}  "
+                  f"{metrics['total_cost_usd'] / total:>9.5f}  {metrics['packed_fallback_rate']:>8.1%}")
         
-        return metrics
+        return comparison
+    
+    def _metric_run(self, results: List[Dict], wall_time: float = None, model=None) -> MetricRun:
+        """
+        Metrics of one model run, computed as they are queried
+        
+        Cases skipped because the run was cancelled were never answered, so
+        they are counted in skipped_cases and left out of everything else.
+        Cases refused by an open circuit breaker are skipped the same way.
+        Cases whose request failed are counted in errored_cases and
+        error_rate and left out of the accuracy metrics, rather than counting
+        as wrong answers.
+        
+        With group_by set, the same metrics are also reported per group of
+        case attributes under by_<attributes> (see grouped_metrics.py).
+        
+        Args:
+            results: Per-case results from _evaluate_model
+            wall_time: Wall-clock seconds the model run took (enables throughput)
+            model: The evaluated model wrapper (adds its hedging and circuit breaker stats)
+        """
+        sources = {
+            'results': results,
+            'wall_time': wall_time,
+            'hedge': getattr(model, 'hedge', None),
+            'circuit_breaker': getattr(model, 'circuit_breaker', None),
+            'dataset': self.dataset,
+        }
+        return MetricRun(METRICS, sources, self.group_by)
+    
+    def _calculate_metrics(self, results: List[Dict], wall_time: float = None,
+                           names: Sequence[str] = None, model=None) -> Dict:
+        """
+        Calculate evaluation metrics with proper classification metrics
+        
+        Args:
+            results: Per-case results from _evaluate_model
+            wall_time: Wall-clock seconds the model run took (enables throughput)
+            names: Metric names or patterns to compute (default: all)
+            model: The evaluated model wrapper (see _metric_run)
+        """
+        return self._metric_run(results, wall_time, model).query(names)
+    
+    def _report_metrics(self, model_name: str, results: List[Dict], wall_time: float = None,
+                        model=None) -> MetricRun:
+        """
+        Keep, print and send a model's metrics; each consumer gets only what it asks for
+        
+        Returns:
+            The MetricRun, for further queries (e.g. Comet)
+        """
+        with self.profiler.span('metrics', model=model_name):
+            run = self._metric_run(results, wall_time, model)
+            self.metrics[model_name] = run.query(self.saved_metrics)
+            console = run.query(CONSOLE_METRICS)
+        self._print_metrics(model_name, console)
+        
+        for sink in self.metric_sinks:
+            try:
+                sink.emit(model_name, run.query(sink.requests))
+            except Exception as e:
+                print(f"⚠️  Warning: {type(sink).__name__} failed for {model_name}: {e}")
+        return run
     
     def _print_metrics(self, model_name: str, metrics: Dict):
         """Print metrics in a readable format"""
@@ -299,7 +554,53 @@ class BenchmarkEvaluator:
             print(f"      Rating {rating}: P={p:.2f}, R={r:.2f}, F1={f1:.2f}, Support={sup}")
         
         print(f"\n  ⭐ STRICT ACCURACY (Both correct):")
-        print(f"    {metrics.get('strict_accuracy', 0):.2%} ({metrics.get('strict_correct', 0)}/{metrics.get('total_cases', 0)})")
+        print(f"    {metrics.get('strict_accuracy', 0):.2%} ({metrics.get('strict_correct', 0)}/{metrics.get('scored_cases', 0)})")
+        for attributes in self.group_by:
+            self._print_groups(attributes, metrics.get(f"by_{GROUP_SEPARATOR.join(attributes)}", {}))
+        
+        if metrics.get('errored_cases'):
+            print(f"    ⚠️  {metrics['errored_cases']} cases errored ({metrics['error_rate']:.1%}) and not scored")
+        if metrics.get('skipped_cases'):
+            print(f"    ⏹️  {metrics['skipped_cases']} cases skipped (run cancelled or circuit open) and not scored")
+        
+        if 'mean_validity_agreement' in metrics:
+            print(f"\n  🎲 SELF-CONSISTENCY:")
+            print(f"    Validity agreement: {metrics['mean_validity_agreement']:.1%} "
+                  f"(unanimous on {metrics['unanimous_validity_rate']:.1%} of cases)")
+            print(f"    Reliability agreement: {metrics['mean_reliability_agreement']:.1%}")
+        
+        print(f"\n  ⏱️  PERFORMANCE:")
+        print(f"    Latency p50/p95/p99: {metrics.get('latency_p50_s', 0):.2f}s / "
+              f"{metrics.get('latency_p95_s', 0):.2f}s / {metrics.get('latency_p99_s', 0):.2f}s")
+        print(f"    Throughput: {metrics.get('throughput_cases_per_s', 0):.2f} cases/s")
+        print(f"    Tokens: {metrics.get('total_prompt_tokens', 0)} prompt "
+              f"({metrics.get('cached_prompt_ratio', 0):.0%} cached), "
+              f"{metrics.get('total_completion_tokens', 0)} completion ({metrics.get('total_retries', 0)} retries)")
+        print(f"    Estimated cost: ${metrics.get('total_cost_usd', 0):.4f}")
+        if metrics.get('coalesced_calls'):
+            print(f"    Coalesced: {metrics['coalesced_calls']} requests shared an identical in-flight call")
+        if metrics.get('circuit_opened'):
+            print(f"    Circuit breaker: opened {metrics['circuit_opened']} times, "
+                  f"{metrics['circuit_rejected']} requests refused (now {metrics['circuit_state']})")
+        if 'hedge_rate' in metrics:
+            print(f"    Hedged: {metrics['hedged_requests']}/{metrics['hedge_requests']} requests "
+                  f"({metrics['hedge_rate']:.1%}), {metrics['hedge_wins']} won by the hedge; "
+                  f"discarded copies cost ${metrics.get('hedge_cost_usd', 0):.4f}")
+            if 'hedge_p99_s' in metrics:
+                print(f"    p99 with hedging: {metrics['hedge_p99_s']:.2f}s vs "
+                      f"{metrics['hedge_p99_unhedged_s']:.2f}s without "
+                      f"({metrics['hedge_p99_improvement']:.1%} better)")
+    
+    def _print_groups(self, attributes: tuple, groups: Dict, limit: int = 15):
+        """Print per-group accuracy, largest groups first"""
+        print(f"\n  🧩 BY {' + '.join(attributes).upper()} ({len(groups)} groups):")
+        width = min(max((len(label) for label in groups), default=5), 40)
+        print(f"    {'Group':<{width}}  {'Cases':>5}  {'Strict':>7}  {'Validity':>8}  {'Reliab.':>7}")
+        for label, group in list(groups.items())[:limit]:
+            print(f"    {label[:width]:<{width}}  {group['scored_cases']:>5}  {group['strict_accuracy']:>7.1%}  "
+                  f"{group.get('validity_accuracy', 0):>8.1%}  {group.get('reliability_accuracy', 0):>7.1%}")
+        if len(groups) > limit:
+            print(f"    ... {len(groups) - limit} more groups in the metrics file")
     
     def _log_metrics_to_comet(self, experiment, metrics: Dict):
         """Log all metrics to Comet"""
@@ -307,20 +608,122 @@ class BenchmarkEvaluator:
             if isinstance(value, (int, float)):
                 experiment.log_metric(metric_name, value)
     
-    def save_results(self, results: Dict, output_dir: str = "results"):
-        """Save results to JSON file"""
+    def save_results(self, results: Dict, output_dir: str = "results", blobs: bool = False,
+                     file_format: str = "json"):
+        """
+        Save results (and metrics from the run, if any) to JSON files.
+        
+        Args:
+            results: Results from run_evaluation
+            output_dir: Directory for the results and metrics files
+            blobs: Store response text in output_dir/blobs.sqlite and reference
+                it from the rows (see blob_store)
+            file_format: Results file format, one of RESULTS_FORMATS, e.g.
+                "jsonl.zst" for compressed JSON lines
+        """
+        if file_format not in RESULTS_FORMATS:
+            raise ValueError(f"Unknown results format {file_format!r}; expected one of {RESULTS_FORMATS}")
         os.makedirs(output_dir, exist_ok=True)
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filepath = os.path.join(output_dir, f"evaluation_results_{timestamp}.json")
+        if self.shard:
+            timestamp += f"_shard-{self.shard[0]}-of-{self.shard[1]}"
+        filepath = os.path.join(output_dir, f"evaluation_results_{timestamp}.{file_format}")
         
-        with open(filepath, 'w') as f:
-            json.dump(results, f, indent=2)
+        with self.profiler.span('write_results', path=filepath):
+            store = BlobStore(os.path.join(output_dir, BLOB_FILE)) if blobs else None
+            # Row by row, so compact results are never expanded all at once
+            try:
+                f, writer = open_results_writer(filepath)
+                with f:
+                    for model_name, model_results in results.items():
+                        writer.start_model(model_name)
+                        if store is None:
+                            for row in model_results:
+                                writer.write_row(row)
+                            continue
+                        for start in range(0, len(model_results), 1000):
+                            for row in store.pack_rows(model_results[start:start + 1000]):
+                                writer.write_row(row)
+                    writer.close()
+            finally:
+                if store is not None:
+                    store.close()
         
         print(f"\n💾 Results saved to: {filepath}")
+        
+        metrics = {name: self.metrics[name] for name in results if name in self.metrics}
+        if metrics:
+            metrics_path = os.path.join(output_dir, f"evaluation_metrics_{timestamp}.json")
+            with open(metrics_path, 'w') as f:
+                json.dump(metrics, f, indent=2)
+            print(f"💾 Metrics saved to: {metrics_path}")
+        
+        if self.trace_exporter:
+            self.export_trace(self.trace_path)
+    
+    def export_trace(self, filepath: str):
+        """Write the Chrome trace-event JSON collected so far"""
+        if self.trace_exporter is None:
+            raise ValueError("Tracing is disabled; pass trace_path to BenchmarkEvaluator")
+        self.trace_exporter.write(filepath)
 
 
 if __name__ == "__main__":
-    # Example usage
-    evaluator = BenchmarkEvaluator()
-    results = evaluator.run_evaluation(use_comet=True)
-    evaluator.save_results(results)
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Run the A1Facts benchmark")
+    parser.add_argument("--dataset", default=None,
+                        help="Dataset .json/.jsonl, optionally .gz/.zst (generated if missing)")
+    parser.add_argument("--shard", default=None,
+                        help="i/N: evaluate only shard i of N (merge with python -m src.evaluation.sharding)")
+    parser.add_argument("--output-dir", default="results")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Requests in flight at once per model (identical ones are coalesced)")
+    parser.add_argument("--blobs", action="store_true",
+                        help="Store response text once, compressed, in <output-dir>/blobs.sqlite")
+    parser.add_argument("--format", dest="file_format", default="json", choices=RESULTS_FORMATS,
+                        help="Results file format")
+    parser.add_argument("--time-budget", type=float, default=None, metavar="SECONDS",
+                        help="Stop after this long; unfinished cases are saved as skipped (as on Ctrl-C)")
+    parser.add_argument("--request-timeout", type=float, default=None, metavar="SECONDS",
+                        help="Abandon (and retry) a single request after this long (default: 120)")
+    parser.add_argument("--circuit-breaker", choices=("fail", "pause", "off"), default="fail",
+                        help="While a provider keeps failing: skip its requests (fail), pause them "
+                             "until a probe succeeds, or keep sending (off)")
+    parser.add_argument("--group-by", default=None, metavar="ATTRS",
+                        help="Also report metrics per group, e.g. category,n_sources or type+triangulation_logic")
+    parser.add_argument("--metrics", default=None, metavar="PATTERNS",
+                        help="Metrics to keep in the metrics file, e.g. '*,!*_confusion_matrix' (default: all)")
+    parser.add_argument("--metrics-csv", default=None, metavar="PATH",
+                        help="Also append each model's scalar metrics to this CSV file")
+    parser.add_argument("--plan", action="store_true",
+                        help="Only estimate tokens, cost and wall time (nothing is sent; see planner.py)")
+    args = parser.parse_args()
+    
+    if args.plan:
+        from .planner import main as plan_main
+        plan_args = ["--concurrency", str(args.concurrency)]
+        if args.dataset:
+            plan_args += ["--dataset", args.dataset]
+        if args.shard:
+            plan_args += ["--shard", args.shard]
+        plan_main(plan_args)
+        raise SystemExit(0)
+    
+    model_options = {}
+    if args.request_timeout is not None:
+        model_options['request_timeout'] = args.request_timeout
+    
+    circuit_breaker = False if args.circuit_breaker == "off" else {'on_open': args.circuit_breaker}
+    
+    group_by = args.group_by.split(",") if args.group_by else None
+    
+    saved_metrics = args.metrics.split(",") if args.metrics else ('*',)
+    metric_sinks = [CsvSink(args.metrics_csv)] if args.metrics_csv else []
+    
+    evaluator = BenchmarkEvaluator(args.dataset, shard=args.shard, model_options=model_options,
+                                   circuit_breaker=circuit_breaker, group_by=group_by,
+                                   saved_metrics=saved_metrics, metric_sinks=metric_sinks)
+    results = evaluator.run_evaluation(use_comet=True, concurrency=args.concurrency,
+                                       time_budget_s=args.time_budget)
+    evaluator.save_results(results, args.output_dir, blobs=args.blobs, file_format=args.file_format)
@@ -0,0 +1,193 @@
+"""
+Static sharding of a run and merging of the shard outputs
+
+`--shard i/N` (1 <= i <= N) evaluates only the test cases whose id hashes to
+shard i, so N independent jobs cover the dataset between them with no
+coordination. The assignment uses a stable hash of the test case id, so it
+does not change between hosts, Python versions or runs.
+
+The merge reads the shard results files as streams and writes one results
+file byte-identical to a single-process run, after checking that every
+(model, test case) appears exactly once:
+
+    python -m src.evaluation.sharding merge -o results/merged.json \\
+        results/evaluation_results_*_shard-*-of-4.json
+"""
+
+import argparse
+import hashlib
+import os
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from ..data_io import load_records, temp_path_for
+from .results_io import iter_models, open_results_writer
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parse "i/N" into (i, N), with shards numbered from 1"""
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard {spec!r}; expected i/N, e.g. 1/4") from None
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard {spec!r}; need 1 <= i <= N")
+    return index, count
+
+
+def shard_of(test_case_id: str, count: int) -> int:
+    """Shard (1..count) that a test case belongs to"""
+    digest = hashlib.sha256(str(test_case_id).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+def select_shard(dataset: List[Dict], index: int, count: int) -> List[Dict]:
+    """Test cases of shard index out of count, in dataset order"""
+    return [test_case for test_case in dataset if shard_of(test_case['id'], count) == index]
+
+
+def validate_shards(dataset: List[Dict], paths: List[str]) -> Dict:
+    """
+    Check that the shard files hold every (model, test case) exactly once.
+    
+    Reads the files one at a time, keeping only test case ids in memory.
+    
+    Returns:
+        Dict with the merged model order and, per model, the missing,
+        duplicated and unknown test case ids; 'ok' is True if all are empty
+        and every file lists its models in the merged order
+    """
+    expected = Counter(test_case['id'] for test_case in dataset)
+    models = []
+    seen = {}
+    order_errors = []
+    
+    for path in paths:
+        file_models = []
+        for model_name, rows in iter_models(path):
+            file_models.append(model_name)
+            if model_name not in seen:
+                models.append(model_name)
+                seen[model_name] = Counter()
+            seen[model_name].update(row['test_case_id'] for row in rows)
+        positions = [models.index(model_name) for model_name in file_models]
+        if positions != sorted(positions):
+            order_errors.append(path)
+    
+    report = {'models': models, 'missing': {}, 'duplicates': {}, 'unknown': {}, 'order_errors': order_errors}
+    for model_name in models:
+        counts = seen[model_name]
+        missing = sorted((expected - counts).elements())
+        duplicates = sorted(case_id for case_id in counts - expected if case_id in expected)
+        unknown = sorted(case_id for case_id in counts if case_id not in expected)
+        if missing:
+            report['missing'][model_name] = missing
+        if duplicates:
+            report['duplicates'][model_name] = duplicates
+        if unknown:
+            report['unknown'][model_name] = unknown
+    
+    report['ok'] = not (report['missing'] or report['duplicates'] or report['unknown'] or order_errors)
+    return report
+
+
+def _describe(report: Dict) -> str:
+    lines = []
+    for kind in ('missing', 'duplicates', 'unknown'):
+        for model_name, case_ids in report[kind].items():
+            preview = ', '.join(case_ids[:5]) + (', ...' if len(case_ids) > 5 else '')
+            lines.append(f"{model_name}: {len(case_ids)} {kind} ({preview})")
+    for path in report['order_errors']:
+        lines.append(f"{path}: models in a different order than the other shards")
+    return '\n'.join(lines)
+
+
+def merge_shards(dataset: List[Dict], paths: List[str], output_path: str) -> Dict:
+    """
+    Merge shard results files into one results file in dataset order.
+    
+    Args:
+        dataset: The full dataset the shards were cut from
+        paths: Shard results files (any order)
+        output_path: Merged results file (written only if validation passes)
+    
+    Returns:
+        The validation report
+    
+    Raises:
+        ValueError: If cases are missing, duplicated or unknown
+    """
+    report = validate_shards(dataset, paths)
+    if not report['ok']:
+        raise ValueError(f"Shard outputs do not add up to one complete run:\n{_describe(report)}")
+    
+    readers = [iter_models(path) for path in paths]
+    # Model each reader is positioned at, with its row iterator
+    current = [next(reader, None) for reader in readers]
+    
+    tmp_path = temp_path_for(output_path)
+    try:
+        f, writer = open_results_writer(tmp_path)
+        with f:
+            for model_name in report['models']:
+                writer.start_model(model_name)
+                # Head row of every shard that has rows for this model
+                heads = {}
+                for i, entry in enumerate(current):
+                    if entry is not None and entry[0] == model_name:
+                        heads[i] = (next(entry[1], None), entry[1])
+                
+                for test_case in dataset:
+                    for i, (row, rows) in heads.items():
+                        if row is not None and row['test_case_id'] == test_case['id']:
+                            writer.write_row(row)
+                            heads[i] = (next(rows, None), rows)
+                            break
+                    else:
+                        raise ValueError(f"{model_name}: no shard has {test_case['id']} in dataset order; "
+                                         f"were the shards produced from this dataset?")
+                
+                for i in heads:
+                    current[i] = next(readers[i], None)
+            writer.close()
+        os.replace(tmp_path, output_path)
+    finally:
+        for reader in readers:
+            reader.close()
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    
+    return report
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Check and merge sharded benchmark runs")
+    parser.add_argument("command", choices=["merge", "check"])
+    parser.add_argument("shards", nargs="+", help="Shard results files")
+    parser.add_argument("--dataset", default="datasets/triangulation_benchmark_v1.json")
+    parser.add_argument("-o", "--output", help="Merged results file (merge)")
+    args = parser.parse_args(argv)
+    
+    dataset = load_records(args.dataset)
+    
+    if args.command == "check":
+        report = validate_shards(dataset, args.shards)
+        if report['ok']:
+            print(f"✅ {len(args.shards)} shards cover {len(dataset)} test cases for {len(report['models'])} models")
+        else:
+            print(f"❌ Shards are incomplete or overlap:\n{_describe(report)}")
+            raise SystemExit(1)
+        return
+    
+    if not args.output:
+        parser.error("merge needs -o/--output")
+    try:
+        report = merge_shards(dataset, args.shards, args.output)
+    except ValueError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+    print(f"💾 Merged {len(args.shards)} shards ({len(report['models'])} models) into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
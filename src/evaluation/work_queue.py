@@ -0,0 +1,402 @@
+"""
+Shared work queues for distributed evaluation
+
+A work item is one (model, test case) pair. Workers lease items, renew
+their leases with heartbeats, and write results keyed by item, so a
+result is stored exactly once however many times the item is attempted.
+A lease that is not renewed in time expires, and the item goes back to
+pending for another worker.
+
+An item that keeps failing (its evaluation raises, or the workers leasing
+it die) is dead-lettered after max_attempts leases instead of going back
+to pending, so one poison item cannot take down every worker in turn.
+When the worker reported the failure, its error result is stored as the
+item's result, so the merged output shows the case as errored.
+
+SQLiteWorkQueue is the default backend: one database file shared by the
+coordinator and every worker (processes on one host, or hosts sharing a
+filesystem with working locks). FileWorkQueue is a dependency-free stand-in
+built on atomic renames in a directory tree, convenient for tests.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+
+# Leases an item gets before it is dead-lettered
+MAX_ATTEMPTS = 3
+
+
+def item_key(model: str, test_case_id: str, position: int) -> str:
+    """
+    Unique key of a (model, test case) work item.
+    
+    The dataset position is part of the key because test case ids are not
+    guaranteed to be unique.
+    """
+    return f"{model}/{position:06d}/{test_case_id}"
+
+
+class WorkItem:
+    """A leased (model, test case) pair"""
+    
+    def __init__(self, key: str, model: str, test_case: Dict, position: int, attempts: int = 1):
+        self.key = key
+        self.model = model
+        self.test_case = test_case
+        self.position = position
+        self.attempts = attempts
+
+
+class WorkQueue:
+    """Interface shared by the queue backends"""
+    
+    def enqueue(self, items: List[Tuple[str, Dict, int]]):
+        """Add (model, test_case, position) items; items already queued are left alone"""
+        raise NotImplementedError
+    
+    def lease(self, worker_id: str, lease_s: float, skip_models: Iterable[str] = ()) -> Optional[WorkItem]:
+        """Lease the next pending (or expired) item not of skip_models, or None if there is none"""
+        raise NotImplementedError
+    
+    def heartbeat(self, worker_id: str, lease_s: float):
+        """Extend every lease held by worker_id"""
+        raise NotImplementedError
+    
+    def complete(self, item: WorkItem, worker_id: str, result: Dict) -> bool:
+        """Store an item's result; returns False if a result was already stored"""
+        raise NotImplementedError
+    
+    def fail(self, item: WorkItem, worker_id: str, error_result: Dict = None) -> bool:
+        """
+        Give up a leased item whose evaluation failed.
+        
+        The item goes back to pending, or is dead-lettered (with error_result
+        as its result, if given) once it has been leased max_attempts times.
+        
+        Returns:
+            True if the item was dead-lettered
+        """
+        raise NotImplementedError
+    
+    def release_expired(self) -> int:
+        """
+        Return items with expired leases to pending (dead-lettering those out
+        of attempts); returns how many went back to pending
+        """
+        raise NotImplementedError
+    
+    def counts(self) -> Dict[str, int]:
+        """Number of items per status (pending, leased, done, dead)"""
+        raise NotImplementedError
+    
+    def results(self) -> Iterator[Tuple[str, int, Dict]]:
+        """(model, position, result) for every completed item and dead-lettered item with a result"""
+        raise NotImplementedError
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """Work queue in a SQLite database file (safe to share between threads)"""
+    
+    def __init__(self, path: str, max_attempts: int = MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.RLock()
+        # Autocommit mode; write transactions are opened explicitly with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS items (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                test_case TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS items_status ON items (status, position);
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                worker TEXT NOT NULL,
+                result TEXT NOT NULL
+            );
+        """)
+    
+    @contextmanager
+    def _transaction(self):
+        """Write transaction; BEGIN IMMEDIATE takes the database write lock up front"""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+    
+    def enqueue(self, items):
+        rows = [
+            (item_key(model, test_case['id'], position), model, position, json.dumps(test_case))
+            for model, test_case, position in items
+        ]
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO items (key, model, position, test_case) VALUES (?, ?, ?, ?)", rows
+            )
+    
+    def lease(self, worker_id, lease_s, skip_models=()):
+        self.release_expired()
+        skip_models = list(skip_models)
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT key, model, test_case, position, attempts FROM items "
+                f"WHERE status = 'pending' AND model NOT IN ({', '.join('?' * len(skip_models))}) "
+                "ORDER BY position, model LIMIT 1", skip_models
+            ).fetchone()
+            if row is None:
+                return None
+            key, model, test_case, position, attempts = row
+            conn.execute(
+                "UPDATE items SET status = 'leased', worker = ?, lease_expires = ?, attempts = ? WHERE key = ?",
+                (worker_id, now + lease_s, attempts + 1, key)
+            )
+        return WorkItem(key, model, json.loads(test_case), position, attempts + 1)
+    
+    def heartbeat(self, worker_id, lease_s):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE items SET lease_expires = ? WHERE worker = ? AND status = 'leased'",
+                (time.time() + lease_s, worker_id)
+            )
+    
+    def complete(self, item, worker_id, result):
+        with self._transaction() as conn:
+            # The first result for an item wins; late duplicates are dropped
+            stored = conn.execute(
+                "INSERT OR IGNORE INTO results (key, worker, result) VALUES (?, ?, ?)",
+                (item.key, worker_id, json.dumps(result))
+            ).rowcount == 1
+            conn.execute(
+                "UPDATE items SET status = 'done', lease_expires = NULL WHERE key = ?", (item.key,)
+            )
+        return stored
+    
+    def fail(self, item, worker_id, error_result=None):
+        dead = item.attempts >= self.max_attempts
+        with self._transaction() as conn:
+            if dead and error_result is not None:
+                conn.execute(
+                    "INSERT OR IGNORE INTO results (key, worker, result) VALUES (?, ?, ?)",
+                    (item.key, worker_id, json.dumps(error_result))
+                )
+            conn.execute(
+                "UPDATE items SET status = ?, worker = NULL, lease_expires = NULL "
+                "WHERE key = ? AND status = 'leased' AND worker = ?",
+                ('dead' if dead else 'pending', item.key, worker_id)
+            )
+        return dead
+    
+    def release_expired(self):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE items SET status = 'dead', worker = NULL, lease_expires = NULL "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?", (now, self.max_attempts)
+            )
+            return conn.execute(
+                "UPDATE items SET status = 'pending', worker = NULL, lease_expires = NULL "
+                "WHERE status = 'leased' AND lease_expires < ?", (now,)
+            ).rowcount
+    
+    def counts(self):
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'dead': 0}
+        with self._lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM items GROUP BY status").fetchall()
+        for status, count in rows:
+            counts[status] = count
+        return counts
+    
+    def results(self):
+        # A separate connection, so iterating does not hold the lock
+        conn = sqlite3.connect(self.path, timeout=30)
+        rows = conn.execute(
+            "SELECT items.model, items.position, results.result FROM results "
+            "JOIN items ON items.key = results.key ORDER BY items.model, items.position"
+        )
+        try:
+            for model, position, result in rows:
+                yield model, position, json.loads(result)
+        finally:
+            conn.close()
+
+
+class FileWorkQueue(WorkQueue):
+    """
+    Work queue in a directory tree, using atomic renames as locks.
+        
+        pending/<key>.json          waiting items
+        leased/<worker>~<key>.json  leased items; the mtime is the lease expiry
+        done/<key>.json             results (created once, via os.link)
+        dead/<key>.json             dead-lettered items, with the error result if any
+    """
+    
+    def __init__(self, directory: str, max_attempts: int = MAX_ATTEMPTS):
+        self.directory = directory
+        self.max_attempts = max_attempts
+        for sub in ('pending', 'leased', 'done', 'dead', 'tmp'):
+            os.makedirs(os.path.join(directory, sub), exist_ok=True)
+    
+    def _path(self, sub: str, name: str = '') -> str:
+        return os.path.join(self.directory, sub, name)
+    
+    @staticmethod
+    def _name(key: str) -> str:
+        return f"{quote(key, safe='')}.json"
+    
+    def _write(self, sub: str, name: str, payload: Dict, exclusive: bool = False,
+               mtime: float = None) -> bool:
+        """Write a JSON file atomically; with exclusive, keep an existing file and return False"""
+        tmp = self._path('tmp', f"{os.getpid()}-{time.monotonic_ns()}-{name}")
+        with open(tmp, 'w') as f:
+            json.dump(payload, f)
+        if mtime is not None:
+            os.utime(tmp, (mtime, mtime))
+        try:
+            if exclusive:
+                os.link(tmp, self._path(sub, name))
+            else:
+                os.replace(tmp, self._path(sub, name))
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+    
+    def enqueue(self, items):
+        for model, test_case, position in items:
+            key = item_key(model, test_case['id'], position)
+            name = self._name(key)
+            if any(os.path.exists(self._path(sub, name)) for sub in ('done', 'pending', 'dead')):
+                continue
+            self._write('pending', name, {
+                'key': key, 'model': model, 'test_case': test_case,
+                'position': position, 'attempts': 0,
+            })
+    
+    def lease(self, worker_id, lease_s, skip_models=()):
+        self.release_expired()
+        skip_prefixes = tuple(quote(f"{model}/", safe='') for model in skip_models)
+        for name in sorted(os.listdir(self._path('pending'))):
+            if skip_prefixes and name.startswith(skip_prefixes):
+                continue
+            leased_name = f"{quote(worker_id, safe='')}~{name}"
+            expires = time.time() + lease_s
+            try:
+                # Set the expiry before the rename so the lease is never seen as expired
+                os.utime(self._path('pending', name), (expires, expires))
+                # The rename is the lock: only one worker can move the file
+                os.rename(self._path('pending', name), self._path('leased', leased_name))
+                with open(self._path('leased', leased_name), 'r') as f:
+                    payload = json.load(f)
+            except FileNotFoundError:
+                continue
+            payload['attempts'] += 1
+            self._write('leased', leased_name, payload, mtime=expires)
+            return WorkItem(payload['key'], payload['model'], payload['test_case'],
+                            payload['position'], payload['attempts'])
+        return None
+    
+    def heartbeat(self, worker_id, lease_s):
+        prefix = f"{quote(worker_id, safe='')}~"
+        expires = time.time() + lease_s
+        for name in os.listdir(self._path('leased')):
+            if name.startswith(prefix):
+                try:
+                    os.utime(self._path('leased', name), (expires, expires))
+                except FileNotFoundError:
+                    pass
+    
+    def complete(self, item, worker_id, result):
+        name = self._name(item.key)
+        stored = self._write('done', name, {
+            'key': item.key, 'model': item.model, 'position': item.position,
+            'worker': worker_id, 'result': result,
+        }, exclusive=True)
+        try:
+            os.unlink(self._path('leased', f"{quote(worker_id, safe='')}~{name}"))
+        except FileNotFoundError:
+            pass
+        return stored
+    
+    def fail(self, item, worker_id, error_result=None):
+        name = self._name(item.key)
+        leased = self._path('leased', f"{quote(worker_id, safe='')}~{name}")
+        dead = item.attempts >= self.max_attempts
+        try:
+            if dead:
+                self._write('dead', name, {
+                    'key': item.key, 'model': item.model, 'position': item.position,
+                    'worker': worker_id, 'result': error_result,
+                })
+                os.unlink(leased)
+            else:
+                os.rename(leased, self._path('pending', name))
+        except FileNotFoundError:
+            # The lease expired and the item moved on without us
+            pass
+        return dead
+    
+    def release_expired(self):
+        released = 0
+        now = time.time()
+        for leased_name in os.listdir(self._path('leased')):
+            path = self._path('leased', leased_name)
+            name = leased_name.split('~', 1)[1]
+            try:
+                if os.path.getmtime(path) >= now:
+                    continue
+                if os.path.exists(self._path('done', name)):
+                    os.unlink(path)
+                    continue
+                with open(path, 'r') as f:
+                    payload = json.load(f)
+                if payload['attempts'] >= self.max_attempts:
+                    payload['result'] = None
+                    self._write('dead', name, payload)
+                    os.unlink(path)
+                else:
+                    os.rename(path, self._path('pending', name))
+                    released += 1
+            except FileNotFoundError:
+                continue
+        return released
+    
+    def counts(self):
+        return {sub: len(os.listdir(self._path(sub))) for sub in ('pending', 'leased', 'done', 'dead')}
+    
+    def results(self):
+        for sub in ('done', 'dead'):
+            for name in sorted(os.listdir(self._path(sub))):
+                with open(self._path(sub, name), 'r') as f:
+                    payload = json.load(f)
+                if payload.get('result') is not None:
+                    yield payload['model'], payload['position'], payload['result']
+
+
+def open_queue(url: str, max_attempts: int = MAX_ATTEMPTS) -> WorkQueue:
+    """Open a queue from a URL: sqlite:///path/to/queue.db or file:///path/to/dir"""
+    if url.startswith('sqlite://'):
+        return SQLiteWorkQueue(url[len('sqlite://'):], max_attempts)
+    if url.startswith('file://'):
+        return FileWorkQueue(url[len('file://'):], max_attempts)
+    raise ValueError(f"Unsupported queue URL {url!r} (expected sqlite://... or file://...)")
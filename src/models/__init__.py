@@ -1,7 +1,27 @@
-"""Model wrappers for LLM evaluation"""
+"""Model wrappers for LLM evaluation
+
+Wrappers are imported on first attribute access, so importing this package
+does not import any provider SDK.
+"""
+import importlib
+
 from .base_model import BaseModel
-from .gpt4_model import GPT4Model
-from .claude_model import ClaudeModel
-from .gemini_model import GeminiModel
 
-__all__ = ['BaseModel', 'GPT4Model', 'ClaudeModel', 'GeminiModel']
+_LAZY_IMPORTS = {
+    'GPT4Model': '.gpt4_model',
+    'ClaudeModel': '.claude_model',
+    'GeminiModel': '.gemini_model',
+    'MockModel': '.mock_model',
+    'MockProvider': '.mock_model',
+    'LocalModel': '.local_model',
+    'ModelRegistry': '.registry',
+}
+
+__all__ = ['BaseModel', 'GPT4Model', 'ClaudeModel', 'GeminiModel', 'MockModel', 'MockProvider',
+           'LocalModel', 'ModelRegistry']
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        return getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,32 +2,590 @@
 Base model interface for A1Facts benchmark evaluation
 """
 
+import re
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+from .cancellation import Cancelled
+from .circuit_breaker import CircuitOpenError
+from .consistency import vote
+from .hedging import HedgePolicy
+from .pricing import estimate_cost
+from .prompts import RUBRIC_PREFIX, render_prompt_parts, render_packed_suffix
+from .streaming import IncrementalResponseParser
+from .structured import parse_structured_text
+
+
+# Per-request instrumentation fields carried on every assess_validity result
+USAGE_FIELDS = (
+    'latency_s',
+    'ttfb_s',
+    'prompt_tokens',
+    'completion_tokens',
+    'cached_prompt_tokens',
+    'retries',
+    'cost_usd',
+)
+
+# HTTP status codes worth retrying (rate limits, timeouts, server errors)
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# Header line opening each case block in a packed response ("CASE 2:", "**Case 2**")
+CASE_HEADER_PATTERN = re.compile(r'^[#*\s]*CASE\s+(\d+)[\s:.)*#-]*$', re.IGNORECASE | re.MULTILINE)
 
 
 class BaseModel(ABC):
     """Abstract base class for all LLM models"""
     
-    def __init__(self, model_name: str):
+    # Retries are handled here rather than inside the provider SDKs so that
+    # every retry is counted and reported with the result
+    max_retries = 2
+    retry_backoff = 0.5
+    
+    # Seconds before a single provider request is abandoned (None: no limit);
+    # the SDK defaults are several minutes, long enough for a hung connection
+    # to stall a run
+    request_timeout = 120.0
+    
+    # Output budget per case; packed prompts scale it up to packed_max_tokens
+    max_tokens = 1000
+    packed_max_tokens = 4096
+    # Structured answers carry two ratings and an optional sentence of reasoning
+    structured_max_tokens = 200
+    
+    # Self-consistency sampling: temperature of the k samples, and whether the
+    # provider returns several samples from one request (_complete_n)
+    sample_temperature = 0.7
+    supports_n = False
+    
+    # Cases per assess_validity_batch call; local backends batch generation
+    batch_size = 1
+    
+    def __init__(self, model_name: str, structured_output: bool = False,
+                 stream: bool = False, capture_reasoning: bool = False,
+                 samples: int = 1, hedge=None, request_timeout: float = None):
+        """
+        Args:
+            model_name: Provider model id
+            structured_output: Request schema-validated JSON instead of free text
+            stream: Stream responses and stop once all ratings are parsed
+            capture_reasoning: When streaming, read on to capture the reasoning too
+            samples: Samples per case; above 1, ratings are decided by majority vote
+            hedge: Hedge slow requests: True for defaults, a dict of HedgePolicy
+                arguments, or a HedgePolicy
+            request_timeout: Seconds before a request is abandoned (default:
+                the class's request_timeout)
+        """
         self.model_name = model_name
+        self.structured_output = structured_output
+        self.stream = stream
+        self.capture_reasoning = capture_reasoning
+        self.samples = samples
+        if hedge is True:
+            hedge = HedgePolicy()
+        elif isinstance(hedge, dict):
+            hedge = HedgePolicy(**hedge)
+        self.hedge = hedge or None
+        if request_timeout is not None:
+            self.request_timeout = request_timeout
+        if structured_output:
+            self.max_tokens = self.structured_max_tokens
+        # Optional StageProfiler (set by BenchmarkEvaluator) for per-stage timing
+        self.profiler = None
+        # Optional SingleFlight group (set by BenchmarkEvaluator) that coalesces
+        # concurrent identical requests
+        self.singleflight = None
+        # Optional CancelScope (set by BenchmarkEvaluator) with the run's time
+        # budget and cancellation flag
+        self.cancel_scope = None
+        # Optional CircuitBreaker (set by BenchmarkEvaluator) shared by all
+        # wrappers of the same provider and model
+        self.circuit_breaker = None
     
     @abstractmethod
+    def _complete(self, prefix: str, suffix: str, max_tokens: int = 1000,
+                  temperature: float = 0.0) -> Dict:
+        """
+        Send a single prompt to the provider.
+        
+        The prompt is prefix + suffix. The prefix is identical across requests,
+        so wrappers should mark it cacheable where the provider supports it.
+        Wrappers pass self._timeout() to the SDK as the request timeout.
+        
+        Args:
+            prefix: Static, cacheable part of the prompt (the rubric)
+            suffix: Per-case part of the prompt
+            max_tokens: Output token budget for the completion
+            temperature: Sampling temperature (0 for regular evaluation)
+        
+        Returns:
+            Dict with:
+                - text: str (full model output)
+                - prompt_tokens: int (None if the provider did not report usage)
+                - completion_tokens: int (None if the provider did not report usage)
+                - cached_prompt_tokens: int (optional, prompt tokens served from cache)
+                - ttfb_s: float (optional, time to first byte of the response)
+        """
+        pass
+    
+    def _complete_n(self, prefix: str, suffix: str, max_tokens: int, n: int,
+                    temperature: float) -> Dict:
+        """
+        Draw n samples from a single request (wrappers with supports_n = True).
+        
+        Returns:
+            Dict like _complete, with texts (List[str], one per sample) in
+            place of text; token counts cover the whole request
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot draw several samples per request")
+    
+    def _stream(self, prefix: str, suffix: str, max_tokens: int, usage: Dict):
+        """
+        Stream a completion, yielding text chunks as they arrive.
+        
+        Wrappers that support streaming implement this as a generator. It is
+        closed early once the ratings are known, so provider streams must be
+        closed in a finally block. Token counts reported by the provider are
+        written into usage (prompt_tokens, completion_tokens, cached_prompt_tokens).
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support streaming")
+    
     def assess_validity(self, test_case: Dict) -> Dict:
         """
         Assess information validity for a test case.
         
         Args:
             test_case: Dict containing sources and metadata
-            
+        
         Returns:
             Dict with:
                 - validity_rating: int (1-6)
                 - reliability_scores: List[str] (A-F for each source)
                 - reasoning: str (explanation)
                 - raw_response: str (full model output)
+                - latency_s, ttfb_s, prompt_tokens, completion_tokens,
+                  retries, cost_usd: per-request instrumentation
+                - coalesced: True if the response was shared with an identical
+                  request already in flight (token counts and cost are then 0)
+                - skipped: True if the run was cancelled, or the circuit
+                  breaker refused the request, before the case was answered
+                  (the ratings are then None)
         """
-        pass
+        case_id = test_case.get('id', 'unknown')
+        with self._span('format_prompt', test_case_id=case_id):
+            prefix, suffix = self.format_prompt_parts(test_case)
+        n_sources = len(test_case['sources'])
+        
+        if self.singleflight is None:
+            return self._assess_prompt(prefix, suffix, n_sources, case_id)
+        
+        start = time.perf_counter()
+        result, shared = self.singleflight.do(
+            self._request_key(prefix, suffix),
+            lambda: self._assess_prompt(prefix, suffix, n_sources, case_id),
+        )
+        if not shared:
+            return result
+        
+        result = dict(result)
+        result['test_case_id'] = case_id
+        result['coalesced'] = True
+        result['latency_s'] = time.perf_counter() - start
+        # The tokens and cost were spent (and are reported) by the shared request
+        for field in ('prompt_tokens', 'completion_tokens', 'cached_prompt_tokens', 'retries'):
+            if result.get(field) is not None:
+                result[field] = 0
+        if result.get('cost_usd') is not None:
+            result['cost_usd'] = 0.0
+        return result
+    
+    def _request_key(self, prefix: str, suffix: str) -> tuple:
+        """Everything that determines the response to a prompt, for coalescing"""
+        return (self.model_name, self.structured_output, self.stream, self.capture_reasoning,
+                self.samples, self.max_tokens, prefix, suffix)
+    
+    def _assess_prompt(self, prefix: str, suffix: str, n_sources: int, case_id: str) -> Dict:
+        """Send a rendered prompt and parse the response (assess_validity without coalescing)"""
+        completion = {}
+        call_stats = {'retries': 0, 'retry_delay': 0.0}
+        start = time.perf_counter()
+        
+        try:
+            if self.samples > 1:
+                completion = self._complete_samples(prefix, suffix, call_stats, case_id)
+                with self._span('parse_response', test_case_id=case_id):
+                    result = vote([self._parse_sample(text) for text in completion['texts']])
+            else:
+                completion = self._complete_with_retries(prefix, suffix, call_stats, self.max_tokens,
+                                                         n_sources=n_sources,
+                                                         test_case_id=case_id)
+                
+                with self._span('parse_response', test_case_id=case_id):
+                    result = self.parse_response(completion['text'])
+        
+        except Exception as e:
+            if isinstance(e, Cancelled) or self._cancelled():
+                # Cut short by the run being cancelled, not the model's fault
+                completion = {}
+                result = self._skipped(self.cancel_scope.reason)
+            elif isinstance(e, CircuitOpenError):
+                # Never sent: the provider was not asked, so there is no answer to score
+                completion = {}
+                result = self._skipped(str(e))
+            else:
+                result = {
+                    'validity_rating': None,
+                    'reliability_scores': [],
+                    'reasoning': f'Error: {str(e)}',
+                    'raw_response': '',
+                    'error': str(e)
+                }
+        
+        latency = time.perf_counter() - start
+        
+        # Add metadata
+        result['model'] = self.model_name
+        result['test_case_id'] = case_id
+        result.update(self._usage_fields(completion, latency, call_stats))
+        for key in ('stopped_early', 'usage_estimated'):
+            if key in completion:
+                result[key] = completion[key]
+        
+        return result
+    
+    def skipped_result(self, test_case: Dict, reason: str) -> Dict:
+        """assess_validity-style result for a case the run never got to"""
+        result = self._skipped(reason)
+        result['model'] = self.model_name
+        result['test_case_id'] = test_case.get('id', 'unknown')
+        result.update(self._usage_fields({}, None, {'retries': 0, 'retry_delay': 0.0}))
+        return result
+    
+    def _skipped(self, reason: str) -> Dict:
+        """Parsed-response fields of a case that was never answered (cancelled or refused)"""
+        return {
+            'validity_rating': None,
+            'reliability_scores': [],
+            'reasoning': f'Skipped: {reason}',
+            'raw_response': '',
+            'skipped': True,
+        }
+    
+    def assess_validity_batch(self, test_cases: List[Dict]) -> List[Dict]:
+        """
+        Assess several test cases, each with its own prompt.
+        
+        Remote APIs take one prompt per request, so this is a plain loop;
+        local backends override it to generate a whole batch per forward pass.
+        """
+        return [self.assess_validity(test_case) for test_case in test_cases]
+    
+    def assess_validity_packed(self, test_cases: List[Dict]) -> List[Dict]:
+        """
+        Assess several test cases with a single packed request.
+        
+        The rubric and per-request overhead are paid once for the whole pack.
+        Cases whose block cannot be parsed from the packed response (or all of
+        them, if the request fails) fall back to single-case assess_validity.
+        
+        Returns:
+            One assess_validity-style result per test case, in order, each with
+            packed_size and packed_fallback set. Token counts and cost of the
+            packed request are split evenly across its cases.
+        """
+        if len(test_cases) == 1:
+            return [self.assess_validity(test_cases[0])]
+        if self.structured_output:
+            raise ValueError("Packed prompts are not supported in structured output mode")
+        if self.samples > 1:
+            raise ValueError("Packed prompts are not supported with self-consistency sampling")
+        
+        case_ids = ','.join(str(test_case.get('id', 'unknown')) for test_case in test_cases)
+        with self._span('format_prompt', test_case_id=case_ids):
+            prefix, suffix = self.format_packed_prompt_parts(test_cases)
+        
+        completion = {}
+        call_stats = {'retries': 0, 'retry_delay': 0.0}
+        max_tokens = min(self.max_tokens * len(test_cases), self.packed_max_tokens)
+        start = time.perf_counter()
+        
+        try:
+            completion = self._complete_with_retries(prefix, suffix, call_stats, max_tokens,
+                                                     test_case_id=case_ids)
+            with self._span('parse_response', test_case_id=case_ids):
+                parsed = self.parse_packed_response(completion['text'], test_cases)
+        except Exception:
+            parsed = [None] * len(test_cases)
+        
+        latency = time.perf_counter() - start
+        shares = self._split_usage(self._usage_fields(completion, latency, call_stats), len(test_cases))
+        
+        results = []
+        for test_case, result, share in zip(test_cases, parsed, shares):
+            if result is None:
+                # The packed share was still paid for, so charge it to the fallback
+                result = self.assess_validity(test_case)
+                for field in ('prompt_tokens', 'completion_tokens', 'cached_prompt_tokens', 'cost_usd'):
+                    if share[field] is not None and result.get(field) is not None:
+                        result[field] += share[field]
+                result['packed_fallback'] = True
+            else:
+                result['model'] = self.model_name
+                result['test_case_id'] = test_case.get('id', 'unknown')
+                result.update(share)
+                result['packed_fallback'] = False
+            result['packed_size'] = len(test_cases)
+            results.append(result)
+        
+        return results
+    
+    def _split_usage(self, usage: Dict, n: int) -> List[Dict]:
+        """Split one request's instrumentation evenly across the n cases it served"""
+        shares = [dict(usage) for _ in range(n)]
+        for field in ('prompt_tokens', 'completion_tokens', 'cached_prompt_tokens'):
+            if usage[field] is None:
+                continue
+            quotient, remainder = divmod(usage[field], n)
+            for i, share in enumerate(shares):
+                share[field] = quotient + (1 if i < remainder else 0)
+        if usage['cost_usd'] is not None:
+            for share in shares:
+                share['cost_usd'] = usage['cost_usd'] / n
+        return shares
+    
+    def _complete_samples(self, prefix: str, suffix: str, call_stats: Dict, case_id: str) -> Dict:
+        """
+        Draw self.samples samples for one case without multiplying wall time.
+        
+        Providers with an n parameter return every sample from one request.
+        Otherwise the samples are requested in parallel, each with its own
+        retries; samples that still fail are dropped (and lower the agreement).
+        
+        Returns:
+            Dict with texts plus token counts summed over all requests
+        """
+        if self.supports_n:
+            return self._complete_with_retries(prefix, suffix, call_stats, self.max_tokens,
+                                               samples=self.samples, temperature=self.sample_temperature,
+                                               test_case_id=case_id)
+        
+        sample_stats = [{'retries': 0, 'retry_delay': 0.0} for _ in range(self.samples)]
+        with ThreadPoolExecutor(max_workers=self.samples) as pool:
+            futures = [
+                pool.submit(self._complete_with_retries, prefix, suffix, stats, self.max_tokens,
+                            temperature=self.sample_temperature, test_case_id=case_id, sample=i)
+                for i, stats in enumerate(sample_stats)
+            ]
+        
+        completions, errors = [], []
+        for future in futures:
+            try:
+                completions.append(future.result())
+            except Exception as e:
+                errors.append(e)
+        call_stats['retries'] = sum(stats['retries'] for stats in sample_stats)
+        call_stats['retry_delay'] = max(stats['retry_delay'] for stats in sample_stats)
+        if not completions:
+            raise errors[0]
+        
+        merged = {'texts': [c['text'] for c in completions] + [''] * len(errors)}
+        for field in ('prompt_tokens', 'completion_tokens', 'cached_prompt_tokens'):
+            counts = [c.get(field) for c in completions if c.get(field) is not None]
+            merged[field] = sum(counts) if counts else None
+        return merged
+    
+    def _parse_sample(self, text: str) -> Dict:
+        """parse_response for one self-consistency sample; failed samples parse as empty"""
+        try:
+            return self.parse_response(text)
+        except ValueError:
+            return {'validity_rating': None, 'reliability_scores': [], 'reasoning': '', 'raw_response': text}
+    
+    def _complete_with_retries(self, prefix: str, suffix: str, call_stats: Dict,
+                               max_tokens: int, n_sources: int = None, samples: int = 1,
+                               temperature: float = 0.0, **span_attrs) -> Dict:
+        """
+        Call _complete, retrying transient errors with exponential backoff.
+        
+        Single free-text cases (n_sources given) go through the streaming path
+        when streaming is enabled; samples > 1 draws that many samples from
+        one request via _complete_n.
+        
+        call_stats is updated in place with the retry count and the delay before
+        the final attempt started, so they are available even if the call fails.
+        
+        Only the final outcome of the request is recorded with the circuit
+        breaker: an attempt that fails and is retried says nothing yet about
+        whether the provider can answer.
+        """
+        use_stream = self.stream and not self.structured_output and n_sources is not None
+        breaker = self.circuit_breaker
+        start = time.perf_counter()
+        while True:
+            self._check_cancelled()
+            probe = breaker.before_call(self.cancel_scope) if breaker else False
+            call_stats['retry_delay'] = time.perf_counter() - start
+            try:
+                with self._span('network', attempt=call_stats['retries'] + 1, **span_attrs):
+                    if use_stream:
+                        completion = self._complete_streaming(prefix, suffix, max_tokens, n_sources)
+                    else:
+                        if samples > 1:
+                            call = lambda: self._complete_n(prefix, suffix, max_tokens, samples, temperature)
+                        else:
+                            call = lambda: self._complete(prefix, suffix, max_tokens, temperature)
+                        completion = self.hedge.call(call, self._completion_usage) if self.hedge else call()
+            except Exception as e:
+                cancelled = isinstance(e, Cancelled) or self._cancelled()
+                retry = (not cancelled and call_stats['retries'] < self.max_retries
+                         and self._is_retryable(e))
+                if breaker:
+                    if cancelled or retry:
+                        breaker.release(probe)
+                    else:
+                        breaker.record(False, probe, e)
+                if not retry:
+                    raise
+                call_stats['retries'] += 1
+                self._sleep(self.retry_backoff * (2 ** (call_stats['retries'] - 1)))
+                continue
+            if breaker:
+                breaker.record(True, probe)
+            return completion
+    
+    def _complete_streaming(self, prefix: str, suffix: str, max_tokens: int, n_sources: int) -> Dict:
+        """
+        Stream a completion through the incremental parser.
+        
+        The stream is cancelled as soon as every source rating and the validity
+        rating are known, unless capture_reasoning is set. A cancelled stream
+        never receives the provider's final usage report, so missing token
+        counts are estimated (about 4 characters per prompt token, one token per
+        streamed chunk) and flagged with usage_estimated.
+        """
+        parser = IncrementalResponseParser(n_sources)
+        usage = {}
+        chunks = []
+        ttfb = None
+        stopped_early = False
+        start = time.perf_counter()
+        
+        stream = self._stream(prefix, suffix, max_tokens, usage)
+        try:
+            for chunk in stream:
+                # The request timeout only bounds the gaps between chunks
+                self._check_cancelled()
+                if ttfb is None:
+                    ttfb = time.perf_counter() - start
+                chunks.append(chunk)
+                if parser.feed(chunk) and not self.capture_reasoning:
+                    stopped_early = True
+                    break
+        finally:
+            stream.close()
+        
+        text = ''.join(chunks)
+        if stopped_early:
+            # Drop the trailing partial line so parse_response sees only what the parser saw
+            text = text[:text.rfind('\n') + 1]
+        
+        completion = {
+            'text': text,
+            'ttfb_s': ttfb,
+            'stopped_early': stopped_early,
+            'prompt_tokens': usage.get('prompt_tokens'),
+            'completion_tokens': usage.get('completion_tokens'),
+            'cached_prompt_tokens': usage.get('cached_prompt_tokens', 0),
+        }
+        if completion['prompt_tokens'] is None or completion['completion_tokens'] is None:
+            completion['usage_estimated'] = True
+            if completion['prompt_tokens'] is None:
+                completion['prompt_tokens'] = (len(prefix) + len(suffix)) // 4
+            if completion['completion_tokens'] is None:
+                completion['completion_tokens'] = len(chunks)
+        return completion
+    
+    def _span(self, stage: str, **attrs):
+        """Profiling span for a pipeline stage (no-op without a profiler)"""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.span(stage, model=self.model_name, **attrs)
+    
+    def _timeout(self) -> Optional[float]:
+        """
+        Timeout for the next provider request: request_timeout, capped at the
+        time left in the run.
+        
+        Raises:
+            Cancelled: If the run has been cancelled
+        """
+        if self.cancel_scope is None:
+            return self.request_timeout
+        return self.cancel_scope.timeout(self.request_timeout)
+    
+    def _cancelled(self) -> bool:
+        """Whether the run this model is part of has been cancelled"""
+        return self.cancel_scope is not None and self.cancel_scope.cancelled
+    
+    def _check_cancelled(self):
+        """Raise Cancelled if the run has been cancelled"""
+        if self.cancel_scope is not None:
+            self.cancel_scope.check()
+    
+    def _sleep(self, seconds: float):
+        """Sleep between retries, waking up (with Cancelled) if the run is cancelled"""
+        if self.cancel_scope is None:
+            time.sleep(seconds)
+        else:
+            self.cancel_scope.sleep(seconds)
+    
+    def _completion_usage(self, completion: Dict) -> Dict:
+        """Tokens and cost of one completion (for hedged copies that lost)"""
+        prompt_tokens = completion.get('prompt_tokens')
+        completion_tokens = completion.get('completion_tokens')
+        cached_tokens = completion.get('cached_prompt_tokens') or 0
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'cached_prompt_tokens': cached_tokens,
+            'cost_usd': estimate_cost(self.model_name, prompt_tokens, completion_tokens, cached_tokens),
+        }
+    
+    def _usage_fields(self, completion: Dict, latency: float, call_stats: Dict) -> Dict:
+        """Build the instrumentation fields for a single assess_validity call"""
+        usage = self._completion_usage(completion)
+        
+        # Non-streamed responses arrive in one piece, so the first byte is the last byte
+        ttfb = completion.get('ttfb_s')
+        if ttfb is not None:
+            ttfb = call_stats['retry_delay'] + ttfb
+        elif latency is not None:
+            ttfb = latency
+        
+        return {
+            'latency_s': latency,
+            'ttfb_s': ttfb,
+            'prompt_tokens': usage['prompt_tokens'],
+            'completion_tokens': usage['completion_tokens'],
+            'cached_prompt_tokens': usage['cached_prompt_tokens'],
+            'retries': call_stats['retries'],
+            'cost_usd': usage['cost_usd'],
+        }
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        """Whether a provider error is transient and worth retrying"""
+        status = getattr(error, 'status_code', None)
+        if status is None:
+            status = getattr(error, 'code', None)
+        if isinstance(status, int):
+            return status in RETRYABLE_STATUS_CODES
+        
+        # Connection drops and timeouts carry no status code
+        name = type(error).__name__
+        return 'Timeout' in name or 'Connection' in name
     
     def format_prompt(self, test_case: Dict) -> str:
         """
@@ -35,86 +593,59 @@ class BaseModel(ABC):
         
         This uses the exact prompt from knowledge_acquirer.py
         """
-        sources_text = "\n".join([
-            f"{i+1}. {source['url']}: {source['claim']}"
-            for i, source in enumerate(test_case['sources'])
-        ])
+        prefix, suffix = self.format_prompt_parts(test_case)
+        return prefix + suffix
+    
+    def format_prompt_parts(self, test_case: Dict) -> Tuple[str, str]:
+        """
+        Split the evaluation prompt into (static prefix, per-case suffix).
         
-        prompt = f"""You are evaluating information validity using the A1Facts triangulation methodology.
-
-IMPORTANT: Source Reliability Assessment
-Evaluate each web source using this scale:
-A: Completely reliable - The source is undoubtedly authentic and trustworthy.
-B: Usually reliable - Minor doubts exist, but the source is historically valid.
-C: Fairly reliable - Doubts exist, but the source has provided valid information before.
-D: Not usually reliable - Significant doubts about the source's reliability.
-E: Unreliable - The source has a history of providing invalid information.
-F: Reliability cannot be judged - Insufficient information for evaluation.
-
-IMPORTANT: Information Validity Assessment
-After gathering information, assess each piece of data using this scale:
-1. Confirmed: Corroborated by multiple, independent, reliable sources.
-2. Probably true: Logical and consistent with other data, but not fully corroborated.
-3. Possibly true: Plausible but lacks strong corroboration.
-4. Doubtful: Not logical or may be contradicted by other information.
-5. Improbable: Illogical and contradicted by other information.
-6. Cannot be judged: Insufficient information to assess validity.
-
-SOURCES TO EVALUATE:
-{sources_text}
-
-Provide your assessment in the following format:
-SOURCE RELIABILITY SCORES:
-[List each source with its A-F rating]
-
-OVERALL VALIDITY RATING: [1-6]
-
-REASONING:
-[Explain your assessment]
-"""
-        return prompt
+        The prefix is the rubric shared by every request; see prompts.py.
+        """
+        return render_prompt_parts(test_case, self.structured_output)
+    
+    def format_packed_prompt_parts(self, test_cases: List[Dict]) -> Tuple[str, str]:
+        """Split a packed prompt for several numbered cases into (prefix, suffix)"""
+        return RUBRIC_PREFIX, render_packed_suffix(test_cases)
+    
+    def parse_packed_response(self, response: str, test_cases: List[Dict]) -> List[Dict]:
+        """
+        Split a packed response into per-case results.
+        
+        Each "CASE n:" block is parsed with parse_response. Blocks that are
+        missing, or whose ratings are incomplete, come back as None.
+        """
+        headers = list(CASE_HEADER_PATTERN.finditer(response))
+        blocks = {}
+        for i, header in enumerate(headers):
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(response)
+            blocks.setdefault(int(header.group(1)), response[header.end():end].strip())
+        
+        results = []
+        for n, test_case in enumerate(test_cases, 1):
+            result = self.parse_response(blocks[n]) if n in blocks else None
+            if result is not None and (
+                result['validity_rating'] is None or
+                len(result['reliability_scores']) != len(test_case['sources'])
+            ):
+                result = None
+            results.append(result)
+        return results
     
     def parse_response(self, response: str) -> Dict:
         """
         Parse model response to extract structured assessment.
         
         This is a basic parser - subclasses can override for model-specific parsing.
+        In structured output mode the response is JSON validated against the
+        assessment schema instead.
         """
-        result = {
-            'validity_rating': None,
-            'reliability_scores': [],
-            'reasoning': '',
-            'raw_response': response
-        }
+        if self.structured_output:
+            result = parse_structured_text(response)
+            result['raw_response'] = response
+            return result
         
-        lines = response.split('\n')
-        current_section = None
-        
-        for line in lines:
-            line = line.strip()
-            
-            if 'OVERALL VALIDITY RATING' in line.upper():
-                # Extract validity rating (1-6)
-                for char in line:
-                    if char.isdigit() and char in '123456':
-                        result['validity_rating'] = int(char)
-                        break
-            
-            elif 'SOURCE RELIABILITY' in line.upper():
-                current_section = 'reliability'
-            
-            elif 'REASONING' in line.upper():
-                current_section = 'reasoning'
-            
-            elif current_section == 'reliability' and line:
-                # Extract reliability scores (A-F)
-                for rating in ['A', 'B', 'C', 'D', 'E', 'F']:
-                    if rating in line:
-                        result['reliability_scores'].append(rating)
-                        break
-            
-            elif current_section == 'reasoning' and line:
-                result['reasoning'] += line + ' '
-        
-        result['reasoning'] = result['reasoning'].strip()
-        return result
+        parser = IncrementalResponseParser()
+        for line in response.split('\n'):
+            parser.feed_line(line)
+        return parser.result(response)
@@ -0,0 +1,127 @@
+"""
+Deadlines and cooperative cancellation for a run
+
+A CancelScope is shared by the evaluator, its worker threads and the model
+wrappers of one run. It carries the optional run time budget and a flag
+that is set on Ctrl-C or once the budget is used up. Wrappers check it
+before every attempt and cap each request's timeout at the time left, so
+no request outlives the budget.
+
+Synchronous SDK calls cannot be interrupted, so a request already in flight
+when the scope is cancelled is abandoned: its case is reported as skipped
+straight away, and the call itself ends in the background within its
+timeout.
+"""
+
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+
+BUDGET_EXHAUSTED = "run time budget exhausted"
+INTERRUPTED = "interrupted"
+
+
+class Cancelled(Exception):
+    """Raised inside a run once its CancelScope has been cancelled"""
+    
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CancelScope:
+    """Cancellation flag and optional time budget shared by one run"""
+    
+    def __init__(self, budget_s: float = None):
+        """
+        Args:
+            budget_s: Seconds the run may take from now (None: no budget)
+        """
+        self.budget_s = budget_s
+        self.deadline = None if budget_s is None else time.monotonic() + budget_s
+        self.reason = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+    
+    def cancel(self, reason: str = INTERRUPTED) -> bool:
+        """Cancel the run; returns False if it was already cancelled"""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            return True
+    
+    @property
+    def cancelled(self) -> bool:
+        """Whether the run was cancelled or its budget has run out"""
+        if not self._event.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel(BUDGET_EXHAUSTED)
+        return self._event.is_set()
+    
+    def remaining(self) -> Optional[float]:
+        """Seconds left in the budget (None without a budget)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+    
+    def check(self):
+        """Raise Cancelled if the run has been cancelled"""
+        if self.cancelled:
+            raise Cancelled(self.reason)
+    
+    def timeout(self, request_timeout: float = None) -> Optional[float]:
+        """
+        Timeout for the next request: request_timeout capped at the time left.
+        
+        Raises:
+            Cancelled: If the run has been cancelled
+        """
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return request_timeout
+        if request_timeout is None:
+            return remaining
+        return min(request_timeout, remaining)
+    
+    def sleep(self, seconds: float):
+        """
+        Sleep, waking up early if the run is cancelled.
+        
+        Raises:
+            Cancelled: If the run is cancelled before or during the sleep
+        """
+        remaining = self.remaining()
+        self._event.wait(seconds if remaining is None else min(seconds, remaining))
+        self.check()
+
+
+@contextmanager
+def cancel_on_interrupt(scope: CancelScope):
+    """
+    Turn the first Ctrl-C into scope.cancel(); the next one interrupts as usual.
+    
+    Signal handlers can only be installed from the main thread; elsewhere this
+    does nothing.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    
+    previous = signal.getsignal(signal.SIGINT)
+    
+    def handler(signum, frame):
+        if not scope.cancel(INTERRUPTED):
+            raise KeyboardInterrupt
+        print("\n🛑 Interrupted: cancelling outstanding requests and saving what has finished "
+              "(Ctrl-C again to abort)")
+    
+    signal.signal(signal.SIGINT, handler)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGINT, previous if previous is not None else signal.default_int_handler)
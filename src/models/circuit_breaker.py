@@ -0,0 +1,182 @@
+"""
+Circuit breaker for failing providers
+
+When a provider is down, a model id is wrong or an API key is invalid, every
+remaining case would still make its own doomed request (and retries). A
+CircuitBreaker watches the outcome of each request attempt to one
+(provider, model) and opens after too many failures in a row, or too high a
+failure rate over the recent attempts. While it is open, requests either
+fail fast with CircuitOpenError (the default) or pause. After a cooldown the breaker goes
+half-open and lets a few probe requests through: a successful probe closes
+it again, a failed one reopens it for another cooldown.
+
+    closed --(errors)--> open --(cooldown)--> half-open --(probe ok)--> closed
+                          ^                       |
+                          +-----(probe fails)-----+
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+ON_OPEN_MODES = ('fail', 'pause')
+
+# How often paused requests check whether a probe has closed the breaker
+PROBE_POLL_S = 0.05
+
+
+class CircuitOpenError(Exception):
+    """Request refused without being sent because the circuit is open"""
+    
+    def __init__(self, name: str, last_error: str = None):
+        message = f"Circuit open for {name}"
+        if last_error:
+            message += f" (last error: {last_error})"
+        super().__init__(message)
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one (provider, model)"""
+    
+    def __init__(self, name: str = '', failure_threshold: int = 5, failure_rate: float = 0.5,
+                 window: int = 20, min_calls: int = 10, cooldown_s: float = 30.0,
+                 half_open_probes: int = 1, on_open: str = 'fail'):
+        """
+        Args:
+            name: Name used in errors and state changes (e.g. the model id)
+            failure_threshold: Open after this many failed attempts in a row
+            failure_rate: ...or once this share of the last window attempts failed
+            window: Attempts the failure rate is computed over
+            min_calls: Attempts needed in the window before the rate counts
+            cooldown_s: Seconds to stay open before probing
+            half_open_probes: Probe requests let through at once when half-open
+            on_open: 'fail' to refuse requests while open, or 'pause' to
+                hold them until a probe succeeds (a provider that stays down
+                then admits one request per cooldown)
+        """
+        if on_open not in ON_OPEN_MODES:
+            raise ValueError(f"on_open must be one of {ON_OPEN_MODES}, not {on_open!r}")
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown_s = cooldown_s
+        self.half_open_probes = half_open_probes
+        self.on_open = on_open
+        # Called as on_state_change(breaker, old_state, new_state, reason)
+        self.on_state_change: Callable = None
+        
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._retry_at = 0.0
+        self._probes = 0
+        self.state = CLOSED
+        self.last_error = None
+        self.opened = 0
+        self.rejected = 0
+    
+    def before_call(self, scope=None) -> bool:
+        """
+        Admit a request attempt.
+        
+        Args:
+            scope: Optional CancelScope; paused requests wake up when it is cancelled
+        
+        Returns:
+            True if the attempt is a half-open probe (pass it back to record)
+        
+        Raises:
+            CircuitOpenError: If the circuit is open and on_open is 'fail'
+            Cancelled: If the run is cancelled while the request is paused
+        """
+        while True:
+            with self._lock:
+                if self.state == CLOSED:
+                    return False
+                now = time.monotonic()
+                if self.state == OPEN and now >= self._retry_at:
+                    self._set_state(HALF_OPEN, "cooldown over, probing")
+                if self.state == HALF_OPEN and self._probes < self.half_open_probes:
+                    self._probes += 1
+                    return True
+                if self.on_open == 'fail':
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.last_error)
+                wait = self._retry_at - now if self.state == OPEN else PROBE_POLL_S
+            
+            # Paused until the cooldown ends or a probe finishes
+            if scope is not None:
+                scope.sleep(max(wait, PROBE_POLL_S))
+            else:
+                time.sleep(max(wait, PROBE_POLL_S))
+    
+    def record(self, ok: bool, probe: bool = False, error: Exception = None):
+        """
+        Record the outcome of an admitted attempt.
+        
+        Args:
+            ok: Whether the provider answered
+            probe: The value before_call returned for this attempt
+            error: The exception, for failed attempts
+        """
+        with self._lock:
+            if not ok and error is not None:
+                self.last_error = str(error)[:200]
+            
+            if probe:
+                self._probes -= 1
+                if self.state == HALF_OPEN:
+                    if ok:
+                        self._outcomes.clear()
+                        self._consecutive_failures = 0
+                        self._set_state(CLOSED, "probe succeeded")
+                    else:
+                        self._open("probe failed")
+                return
+            if self.state != CLOSED:
+                # Requests sent before the circuit opened are still finishing
+                return
+            
+            self._outcomes.append(ok)
+            self._consecutive_failures = 0 if ok else self._consecutive_failures + 1
+            if ok:
+                return
+            if self._consecutive_failures >= self.failure_threshold:
+                self._open(f"{self._consecutive_failures} failures in a row")
+                return
+            failures = self._outcomes.count(False)
+            if (len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._open(f"{failures} of the last {len(self._outcomes)} requests failed")
+    
+    def release(self, probe: bool):
+        """Return an admitted attempt whose outcome says nothing about the provider"""
+        if probe:
+            with self._lock:
+                self._probes -= 1
+    
+    def _open(self, reason: str):
+        self.opened += 1
+        self._retry_at = time.monotonic() + self.cooldown_s
+        self._set_state(OPEN, reason)
+    
+    def _set_state(self, state: str, reason: str):
+        old, self.state = self.state, state
+        if self.on_state_change is not None and old != state:
+            self.on_state_change(self, old, state, reason)
+    
+    def summary(self) -> Dict:
+        """Current state, times opened, and requests refused while open"""
+        with self._lock:
+            return {
+                'circuit_state': self.state,
+                'circuit_opened': self.opened,
+                'circuit_rejected': self.rejected,
+            }
@@ -2,52 +2,115 @@
 Anthropic Claude model wrapper
 """
 
+import json
 import os
 from typing import Dict
 from anthropic import Anthropic
 from .base_model import BaseModel
+from .structured import ASSESSMENT_SCHEMA
+
+
+# Tool Claude is forced to call in structured output mode
+ASSESSMENT_TOOL = {
+    "name": "record_assessment",
+    "description": "Record the source reliability ratings and overall validity rating.",
+    "input_schema": ASSESSMENT_SCHEMA,
+}
 
 
 class ClaudeModel(BaseModel):
     """Anthropic Claude 3.5 Sonnet implementation"""
     
-    def __init__(self, model_id: str = "claude-3-5-sonnet-20241022"):
-        super().__init__(model_id)
+    def __init__(self, model_id: str = "claude-3-5-sonnet-20241022", **options):
+        """
+        Args:
+            model_id: Anthropic model id
+            options: BaseModel options (structured_output, stream, capture_reasoning,
+                request_timeout)
+        """
+        super().__init__(model_id, **options)
         api_key = os.getenv("ANTHROPIC_API_KEY")
         if not api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in environment")
-        self.client = Anthropic(api_key=api_key)
+        # Retries are counted in BaseModel.assess_validity
+        self.client = Anthropic(api_key=api_key, max_retries=0)
     
-    def assess_validity(self, test_case: Dict) -> Dict:
-        """Assess validity using Claude"""
-        prompt = self.format_prompt(test_case)
+    def _complete(self, prefix: str, suffix: str, max_tokens: int = 1000,
+                  temperature: float = 0.0) -> Dict:
+        """
+        Send a prompt to Claude
+        
+        The rubric prefix is sent as its own content block marked with
+        cache_control so Anthropic can serve it from the prompt cache.
+        In structured output mode Claude is forced to answer through a tool
+        call whose input follows ASSESSMENT_SCHEMA.
+        """
+        kwargs = {}
+        if self.structured_output:
+            kwargs['tools'] = [ASSESSMENT_TOOL]
+            kwargs['tool_choice'] = {"type": "tool", "name": ASSESSMENT_TOOL["name"]}
+        
+        response = self.client.messages.create(
+            model=self.model_name,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=self._messages(prefix, suffix),
+            timeout=self._timeout(),
+            **kwargs
+        )
         
+        completion = {'text': self._response_text(response)}
+        if response.usage is None:
+            completion.update({'prompt_tokens': None, 'completion_tokens': None})
+        else:
+            completion.update(self._prompt_usage(response.usage))
+            completion['completion_tokens'] = response.usage.output_tokens
+        return completion
+    
+    def _stream(self, prefix: str, suffix: str, max_tokens: int, usage: Dict):
+        """Stream a Claude completion (prompt usage arrives with message_start)"""
+        stream = self.client.messages.create(
+            model=self.model_name,
+            max_tokens=max_tokens,
+            temperature=0.0,
+            messages=self._messages(prefix, suffix),
+            stream=True,
+            timeout=self._timeout()
+        )
         try:
-            response = self.client.messages.create(
-                model=self.model_name,
-                max_tokens=1000,
-                temperature=0.0,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            raw_response = response.content[0].text
-            result = self.parse_response(raw_response)
-            
-            # Add metadata
-            result['model'] = self.model_name
-            result['test_case_id'] = test_case.get('id', 'unknown')
-            
-            return result
-            
-        except Exception as e:
-            return {
-                'validity_rating': None,
-                'reliability_scores': [],
-                'reasoning': f'Error: {str(e)}',
-                'raw_response': '',
-                'model': self.model_name,
-                'test_case_id': test_case.get('id', 'unknown'),
-                'error': str(e)
-            }
+            for event in stream:
+                if event.type == "message_start":
+                    usage.update(self._prompt_usage(event.message.usage))
+                elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                    yield event.delta.text
+                elif event.type == "message_delta":
+                    usage['completion_tokens'] = event.usage.output_tokens
+        finally:
+            stream.close()
+    
+    def _messages(self, prefix: str, suffix: str):
+        """User message with the rubric in its own cacheable content block"""
+        return [
+            {"role": "user", "content": [
+                {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": suffix},
+            ]}
+        ]
+    
+    def _prompt_usage(self, usage) -> Dict:
+        """Prompt token counts from an Anthropic usage block"""
+        # input_tokens excludes cache reads and writes, which are reported separately
+        cache_read = getattr(usage, 'cache_read_input_tokens', None) or 0
+        cache_write = getattr(usage, 'cache_creation_input_tokens', None) or 0
+        return {
+            'prompt_tokens': usage.input_tokens + cache_read + cache_write,
+            'cached_prompt_tokens': cache_read,
+        }
+    
+    def _response_text(self, response) -> str:
+        """Text of the response; the tool input as JSON in structured output mode"""
+        if self.structured_output:
+            for block in response.content:
+                if block.type == "tool_use":
+                    return json.dumps(block.input)
+        return response.content[0].text
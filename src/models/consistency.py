@@ -0,0 +1,65 @@
+"""
+Self-consistency voting over several sampled assessments of one test case
+
+With samples=k a model answers each case k times at a non-zero temperature.
+The validity rating and each source's reliability rating are decided by
+majority vote, and the share of samples agreeing with each winner is
+reported as a stability measure.
+"""
+
+from collections import Counter
+from typing import Dict, List
+
+
+def _majority(values: List):
+    """Most common value and its count; ties go to the value seen first"""
+    value, count = Counter(values).most_common(1)[0]
+    return value, count
+
+
+def vote(samples: List[Dict]) -> Dict:
+    """
+    Aggregate parsed samples (parse_response results) into one assessment.
+
+    Samples that failed to parse still count towards k, so they lower the
+    agreement figures rather than being silently ignored.
+
+    Returns:
+        Dict with validity_rating, reliability_scores, reasoning and
+        raw_response (taken from the first sample matching the voted
+        rating), plus validity_agreement, reliability_agreement and the
+        per-sample ratings
+    """
+    k = len(samples)
+    ratings = [s['validity_rating'] for s in samples if s['validity_rating'] is not None]
+    validity_rating, validity_votes = _majority(ratings) if ratings else (None, 0)
+
+    # Number of sources as most samples see it, then a vote per position
+    lengths = [len(s['reliability_scores']) for s in samples if s['reliability_scores']]
+    n_sources = _majority(lengths)[0] if lengths else 0
+    reliability_scores = []
+    position_agreement = []
+    for i in range(n_sources):
+        scores = [s['reliability_scores'][i] for s in samples if len(s['reliability_scores']) > i]
+        score, votes = _majority(scores)
+        reliability_scores.append(score)
+        position_agreement.append(votes / k)
+
+    representative = next(
+        (s for s in samples if s['validity_rating'] == validity_rating),
+        samples[0] if samples else {}
+    )
+
+    return {
+        'validity_rating': validity_rating,
+        'reliability_scores': reliability_scores,
+        'reasoning': representative.get('reasoning', ''),
+        'raw_response': representative.get('raw_response', ''),
+        'samples_k': k,
+        'validity_agreement': validity_votes / k if k else 0.0,
+        'reliability_agreement': (
+            sum(position_agreement) / len(position_agreement) if position_agreement else 0.0
+        ),
+        'sample_validity_ratings': [s['validity_rating'] for s in samples],
+        'sample_reliability_scores': [s['reliability_scores'] for s in samples],
+    }
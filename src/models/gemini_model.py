@@ -6,48 +6,105 @@ import os
 from typing import Dict
 import google.generativeai as genai
 from .base_model import BaseModel
+from .structured import gemini_schema
 
 
 class GeminiModel(BaseModel):
     """Google Gemini 2.5 Pro implementation"""
     
-    def __init__(self, model_id: str = "gemini-2.0-flash-exp"):
-        super().__init__(model_id)
+    # generate_content returns several candidates per request via candidate_count
+    supports_n = True
+    
+    def __init__(self, model_id: str = "gemini-2.0-flash-exp", **options):
+        """
+        Args:
+            model_id: Gemini model id
+            options: BaseModel options (structured_output, stream, capture_reasoning,
+                request_timeout)
+        """
+        super().__init__(model_id, **options)
         api_key = os.getenv("GOOGLE_API_KEY")
         if not api_key:
             raise ValueError("GOOGLE_API_KEY not found in environment")
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(model_id)
     
-    def assess_validity(self, test_case: Dict) -> Dict:
-        """Assess validity using Gemini"""
-        prompt = self.format_prompt(test_case)
+    def _complete(self, prefix: str, suffix: str, max_tokens: int = 1000,
+                  temperature: float = 0.0) -> Dict:
+        """
+        Send a prompt to Gemini
+        
+        Gemini applies implicit prefix caching on its own; explicit
+        CachedContent needs far larger prefixes than the rubric.
+        """
+        response = self.model.generate_content(
+            prefix + suffix,
+            generation_config=self._generation_config(max_tokens, temperature),
+            request_options=self._request_options()
+        )
         
-        try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config={
-                    'temperature': 0.0,
-                    'max_output_tokens': 1000,
-                }
-            )
-            
-            raw_response = response.text
-            result = self.parse_response(raw_response)
-            
-            # Add metadata
-            result['model'] = self.model_name
-            result['test_case_id'] = test_case.get('id', 'unknown')
-            
-            return result
-            
-        except Exception as e:
-            return {
-                'validity_rating': None,
-                'reliability_scores': [],
-                'reasoning': f'Error: {str(e)}',
-                'raw_response': '',
-                'model': self.model_name,
-                'test_case_id': test_case.get('id', 'unknown'),
-                'error': str(e)
-            }
+        completion = {'text': response.text}
+        completion.update(self._usage(getattr(response, 'usage_metadata', None)))
+        return completion
+    
+    def _complete_n(self, prefix: str, suffix: str, max_tokens: int, n: int,
+                    temperature: float) -> Dict:
+        """Draw n candidates from one request (the prompt is billed once)"""
+        generation_config = self._generation_config(max_tokens, temperature)
+        generation_config['candidate_count'] = n
+        response = self.model.generate_content(prefix + suffix, generation_config=generation_config,
+                                               request_options=self._request_options())
+        
+        completion = {'texts': [
+            ''.join(part.text for part in candidate.content.parts)
+            for candidate in response.candidates
+        ]}
+        completion.update(self._usage(getattr(response, 'usage_metadata', None)))
+        return completion
+    
+    def _request_options(self) -> Dict:
+        """request_options for generate_content with the request timeout"""
+        timeout = self._timeout()
+        return {} if timeout is None else {'timeout': timeout}
+    
+    def _generation_config(self, max_tokens: int, temperature: float) -> Dict:
+        """Generation settings, with the JSON schema in structured output mode"""
+        generation_config = {
+            'temperature': temperature,
+            'max_output_tokens': max_tokens,
+        }
+        if self.structured_output:
+            generation_config['response_mime_type'] = 'application/json'
+            generation_config['response_schema'] = gemini_schema()
+        return generation_config
+    
+    def _stream(self, prefix: str, suffix: str, max_tokens: int, usage: Dict):
+        """
+        Stream a Gemini completion (every chunk carries running usage counts)
+        
+        The SDK has no explicit close for streamed responses; abandoning the
+        iterator when this generator is closed ends the request.
+        """
+        response = self.model.generate_content(
+            prefix + suffix,
+            generation_config={
+                'temperature': 0.0,
+                'max_output_tokens': max_tokens,
+            },
+            stream=True,
+            request_options=self._request_options()
+        )
+        for chunk in response:
+            metadata = getattr(chunk, 'usage_metadata', None)
+            if metadata:
+                usage.update(self._usage(metadata))
+            if chunk.parts:
+                yield chunk.text
+    
+    def _usage(self, usage) -> Dict:
+        """Token counts from Gemini usage metadata"""
+        return {
+            'prompt_tokens': usage.prompt_token_count if usage else None,
+            'completion_tokens': usage.candidates_token_count if usage else None,
+            'cached_prompt_tokens': getattr(usage, 'cached_content_token_count', None) or 0,
+        }
@@ -6,49 +6,132 @@ import os
 from typing import Dict
 from openai import OpenAI
 from .base_model import BaseModel
+from .prompts import SYSTEM_PROMPT
+from .structured import openai_schema
+
+
+# Model families that accept response_format json_schema / json_object
+JSON_SCHEMA_MODELS = ('gpt-4o', 'gpt-4.1', 'o1', 'o3', 'o4')
+JSON_MODE_MODELS = ('gpt-4-turbo', 'gpt-3.5-turbo')
 
 
 class GPT4Model(BaseModel):
     """OpenAI GPT-4o implementation"""
     
-    def __init__(self, model_id: str = "gpt-4o"):
-        super().__init__(model_id)
+    # Chat completions return several choices per request via n
+    supports_n = True
+    
+    def __init__(self, model_id: str = "gpt-4o", **options):
+        """
+        Args:
+            model_id: OpenAI model id
+            options: BaseModel options (structured_output, stream, capture_reasoning,
+                request_timeout)
+        """
+        super().__init__(model_id, **options)
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY not found in environment")
-        self.client = OpenAI(api_key=api_key)
+        # Retries are counted in BaseModel.assess_validity
+        self.client = OpenAI(api_key=api_key, max_retries=0)
+    
+    def _complete(self, prefix: str, suffix: str, max_tokens: int = 1000,
+                  temperature: float = 0.0) -> Dict:
+        """
+        Send a prompt to GPT-4o
+        
+        OpenAI caches prompt prefixes automatically, so the system message and
+        rubric are kept at the front of every request, byte-for-byte identical.
+        """
+        kwargs = self._format_kwargs()
+        response = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=self._messages(prefix, suffix),
+            temperature=temperature,  # 0 (deterministic) unless sampling
+            max_tokens=max_tokens,
+            timeout=self._timeout(),
+            **kwargs
+        )
+        
+        completion = {'text': response.choices[0].message.content}
+        completion.update(self._usage(response.usage))
+        return completion
     
-    def assess_validity(self, test_case: Dict) -> Dict:
-        """Assess validity using GPT-4o"""
-        prompt = self.format_prompt(test_case)
+    def _complete_n(self, prefix: str, suffix: str, max_tokens: int, n: int,
+                    temperature: float) -> Dict:
+        """Draw n samples from one request (the prompt is billed once)"""
+        kwargs = self._format_kwargs()
+        response = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=self._messages(prefix, suffix),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            n=n,
+            timeout=self._timeout(),
+            **kwargs
+        )
         
+        completion = {'texts': [choice.message.content or '' for choice in response.choices]}
+        completion.update(self._usage(response.usage))
+        return completion
+    
+    def _stream(self, prefix: str, suffix: str, max_tokens: int, usage: Dict):
+        """Stream a GPT-4o completion (usage arrives in the final chunk)"""
+        stream = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=self._messages(prefix, suffix),
+            temperature=0.0,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=self._timeout()
+        )
         try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": "You are an expert at evaluating source reliability and information validity using systematic triangulation methods."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.0,  # Deterministic for evaluation
-                max_tokens=1000
-            )
-            
-            raw_response = response.choices[0].message.content
-            result = self.parse_response(raw_response)
-            
-            # Add metadata
-            result['model'] = self.model_name
-            result['test_case_id'] = test_case.get('id', 'unknown')
-            
-            return result
-            
-        except Exception as e:
+            for chunk in stream:
+                if chunk.usage:
+                    usage.update(self._usage(chunk.usage))
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+    
+    def _format_kwargs(self) -> Dict:
+        """response_format argument in structured output mode"""
+        if self.structured_output:
+            response_format = self._response_format()
+            if response_format:
+                return {'response_format': response_format}
+        return {}
+    
+    def _messages(self, prefix: str, suffix: str):
+        """Chat messages with the static system prompt and rubric up front"""
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prefix + suffix}
+        ]
+    
+    def _usage(self, usage) -> Dict:
+        """Token counts from an OpenAI usage block"""
+        details = getattr(usage, 'prompt_tokens_details', None)
+        return {
+            'prompt_tokens': usage.prompt_tokens if usage else None,
+            'completion_tokens': usage.completion_tokens if usage else None,
+            'cached_prompt_tokens': getattr(details, 'cached_tokens', None) or 0,
+        }
+    
+    def _response_format(self) -> Dict:
+        """
+        Strongest JSON constraint this model supports.
+        
+        Newer models enforce the schema; older turbo models only guarantee
+        valid JSON; plain gpt-4 has no JSON mode and relies on the prompt.
+        Either way the answer is checked by validate_assessment.
+        """
+        if self.model_name.startswith(JSON_SCHEMA_MODELS):
             return {
-                'validity_rating': None,
-                'reliability_scores': [],
-                'reasoning': f'Error: {str(e)}',
-                'raw_response': '',
-                'model': self.model_name,
-                'test_case_id': test_case.get('id', 'unknown'),
-                'error': str(e)
+                "type": "json_schema",
+                "json_schema": {"name": "a1facts_assessment", "schema": openai_schema(), "strict": True},
             }
+        if self.model_name.startswith(JSON_MODE_MODELS):
+            return {"type": "json_object"}
+        return None
@@ -0,0 +1,181 @@
+"""
+Request hedging to cut tail latency
+
+When a provider call has been running longer than a chosen percentile of
+the latencies seen so far in the run, a duplicate request is sent and the
+first one to finish wins. Hedges are capped at a share of all requests, so
+the extra load and cost stay bounded.
+
+Each copy runs on its own thread, so hedging never caps how many requests
+are in flight (the evaluator's concurrency does) and a hedge never queues
+behind the requests it is meant to race.
+
+Synchronous SDK calls cannot be interrupted, so the losing request is
+abandoned: it finishes in the background and its result is discarded. Its
+completion time is still recorded, which gives the latency the run would
+have seen without hedging and hence the p99 improvement, and so is its
+usage (tokens and cost), since the provider bills it all the same.
+"""
+
+import bisect
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, Dict, List, Optional
+
+
+# Usage of discarded copies, reported as hedge_<field>
+USAGE_FIELDS = ('prompt_tokens', 'completion_tokens', 'cached_prompt_tokens', 'cost_usd')
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    index = min(len(sorted_values) - 1, int(percentile / 100 * len(sorted_values)))
+    return sorted_values[index]
+
+
+def _start(fn: Callable) -> Future:
+    """Run fn on a new daemon thread"""
+    future = Future()
+    
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+    
+    threading.Thread(target=run, name="hedge", daemon=True).start()
+    return future
+
+
+class HedgePolicy:
+    """Hedging threshold, rate cap and statistics for one model"""
+    
+    def __init__(self, percentile: float = 95, max_hedge_rate: float = 0.05,
+                 min_samples: int = 20):
+        """
+        Args:
+            percentile: Hedge once a call outlasts this percentile of observed latencies
+            max_hedge_rate: Upper bound on hedged requests / all requests
+            min_samples: Latencies to observe before hedging starts
+        """
+        self.percentile = percentile
+        self.max_hedge_rate = max_hedge_rate
+        self.min_samples = min_samples
+        
+        self._lock = threading.Lock()
+        # Completion times of primary requests (what an unhedged run would see)
+        self._primary_latencies: List[float] = []
+        self._latencies: List[float] = []
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        # Usage of the copies that lost (summed over USAGE_FIELDS)
+        self.discarded = {field: 0.0 if field == 'cost_usd' else 0 for field in USAGE_FIELDS}
+    
+    def threshold(self) -> Optional[float]:
+        """Current hedge delay in seconds (None until min_samples latencies are known)"""
+        with self._lock:
+            if len(self._primary_latencies) < self.min_samples:
+                return None
+            return _percentile(self._primary_latencies, self.percentile)
+    
+    def _try_hedge(self) -> bool:
+        """Claim a hedge if that keeps the hedge rate under the cap"""
+        with self._lock:
+            if self.hedged + 1 > self.max_hedge_rate * self.requests:
+                return False
+            self.hedged += 1
+            return True
+    
+    def _record_primary(self, latency: float):
+        with self._lock:
+            bisect.insort(self._primary_latencies, latency)
+    
+    def _record_discarded(self, future: Future, usage: Callable[[object], Dict]):
+        """Add the usage of a losing copy once it finishes (failed copies used nothing we know of)"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        fields = usage(future.result())
+        with self._lock:
+            for field in USAGE_FIELDS:
+                self.discarded[field] += fields.get(field) or 0
+    
+    def call(self, fn: Callable, usage: Callable[[object], Dict] = None):
+        """
+        Run fn, hedging it with a duplicate call if it is slow.
+        
+        Returns fn's result (from whichever copy finished first). If the first
+        copy to finish raised, the other one is awaited; if both fail, the
+        primary's exception is raised.
+        
+        Args:
+            fn: The request
+            usage: Maps a result of fn to its USAGE_FIELDS, so the usage of a
+                losing copy is counted when it finishes
+        """
+        with self._lock:
+            self.requests += 1
+        start = time.perf_counter()
+        
+        primary = _start(fn)
+        primary.add_done_callback(lambda _: self._record_primary(time.perf_counter() - start))
+        
+        delay = self.threshold()
+        backup = None
+        if delay is not None:
+            done, _ = wait([primary], timeout=delay)
+            if not done and self._try_hedge():
+                backup = _start(fn)
+        
+        pending = {primary} if backup is None else {primary, backup}
+        winner = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    winner = future
+                    break
+            if winner is not None:
+                break
+        
+        with self._lock:
+            self._latencies.append(time.perf_counter() - start)
+            if winner is not None and winner is backup:
+                self.hedge_wins += 1
+        
+        if winner is None:
+            raise primary.exception()
+        # The loser (if still running) is abandoned; its result is discarded but its usage counted
+        if backup is not None and usage is not None:
+            loser = backup if winner is primary else primary
+            loser.add_done_callback(lambda future: self._record_discarded(future, usage))
+        return winner.result()
+    
+    def summary(self) -> Dict:
+        """
+        Hedge rate, wins, usage of the discarded copies, and p99 latency with
+        and without hedging.
+        
+        Losing copies still running are not in the usage totals yet.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            unhedged = list(self._primary_latencies)
+            summary = {
+                'hedge_requests': self.requests,
+                'hedged_requests': self.hedged,
+                'hedge_rate': self.hedged / self.requests if self.requests else 0.0,
+                'hedge_wins': self.hedge_wins,
+            }
+            for field, total in self.discarded.items():
+                summary[f'hedge_{field}'] = total
+        if latencies and unhedged:
+            p99 = _percentile(latencies, 99)
+            p99_unhedged = _percentile(unhedged, 99)
+            summary['hedge_p99_s'] = p99
+            summary['hedge_p99_unhedged_s'] = p99_unhedged
+            summary['hedge_p99_improvement'] = 1 - p99 / p99_unhedged if p99_unhedged else 0.0
+        return summary
@@ -0,0 +1,225 @@
+"""
+Local open-weight model wrapper (transformers, CPU)
+
+Runs the benchmark air-gapped against a Hugging Face causal LM. Test cases
+are generated in batches, and the KV cache of the shared system prompt and
+rubric is computed once and reused by every batch, so each forward pass only
+processes the per-case sources.
+
+Requires the optional transformers and torch dependencies (see
+requirements.txt). TINY_TEST_MODEL is a randomly initialised model of a few
+MB for smoke tests: its answers are noise, but it exercises the full path.
+"""
+
+import copy
+import threading
+import time
+from typing import Dict, List
+
+from .base_model import BaseModel
+from .prompts import RUBRIC_PREFIX, SYSTEM_PROMPT
+
+
+TINY_TEST_MODEL = "hf-internal-testing/tiny-random-LlamaForCausalLM"
+
+# Marks where the per-case text goes when rendering the chat template
+_SUFFIX_MARKER = "\x00SUFFIX\x00"
+
+
+class LocalModel(BaseModel):
+    """Local transformers causal LM with batched generation and rubric KV-cache reuse"""
+    
+    # Cases generated per forward pass when BenchmarkEvaluator batches requests
+    batch_size = 8
+    
+    def __init__(self, model_id: str = TINY_TEST_MODEL, batch_size: int = None,
+                 device: str = "cpu", num_threads: int = None,
+                 reuse_prefix_cache: bool = True, **options):
+        """
+        Args:
+            model_id: Hugging Face model id or local path
+            batch_size: Cases per forward pass (default: LocalModel.batch_size)
+            device: torch device
+            num_threads: torch intra-op threads (default: torch's choice)
+            reuse_prefix_cache: Compute the rubric KV cache once and reuse it
+            options: BaseModel options (samples); structured output and
+                streaming need provider-side support and are not available
+        """
+        if options.get('structured_output') or options.get('stream'):
+            raise ValueError("LocalModel supports neither structured output nor streaming")
+        super().__init__(model_id, **options)
+        
+        try:
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+        except ImportError as e:
+            raise ImportError("LocalModel requires transformers and torch: pip install transformers torch") from e
+        
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        if batch_size:
+            self.batch_size = batch_size
+        self.torch = torch
+        self.device = device
+        self.reuse_prefix_cache = reuse_prefix_cache
+        
+        self.tokenizer = AutoTokenizer.from_pretrained(model_id)
+        self.model = AutoModelForCausalLM.from_pretrained(model_id).to(device).eval()
+        self.pad_token_id = self.tokenizer.pad_token_id
+        if self.pad_token_id is None:
+            self.pad_token_id = self.tokenizer.eos_token_id
+        
+        # Static prompt text (system prompt + rubric) and what follows each case
+        self.prefix_text, self.tail_text = self._split_template()
+        self.prefix_ids = self.tokenizer(
+            self.prefix_text, add_special_tokens=not self._has_chat_template()
+        )['input_ids']
+        self._prefix_cache = None
+        # generate() is not safe to call concurrently on one model (samples > 1)
+        self._lock = threading.Lock()
+    
+    def _has_chat_template(self) -> bool:
+        return bool(getattr(self.tokenizer, 'chat_template', None))
+    
+    def _split_template(self):
+        """
+        Render the prompt around a marker and split it at the per-case text.
+        
+        Everything before the marker is identical for every case, so its KV
+        cache can be shared. Templates without a system role get the system
+        prompt folded into the user turn.
+        """
+        if not self._has_chat_template():
+            return f"{SYSTEM_PROMPT}\n\n{RUBRIC_PREFIX}", "\n"
+        
+        user = RUBRIC_PREFIX + _SUFFIX_MARKER
+        try:
+            rendered = self.tokenizer.apply_chat_template(
+                [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": user}],
+                tokenize=False, add_generation_prompt=True
+            )
+        except Exception:
+            rendered = self.tokenizer.apply_chat_template(
+                [{"role": "user", "content": f"{SYSTEM_PROMPT}\n\n{user}"}],
+                tokenize=False, add_generation_prompt=True
+            )
+        prefix_text, tail_text = rendered.split(_SUFFIX_MARKER)
+        return prefix_text, tail_text
+    
+    def _prefix_kv_cache(self):
+        """KV cache of the static prefix, computed on first use"""
+        if self._prefix_cache is None:
+            from transformers import DynamicCache
+            input_ids = self.torch.tensor([self.prefix_ids], device=self.device)
+            with self.torch.no_grad():
+                output = self.model(input_ids=input_ids, past_key_values=DynamicCache(), use_cache=True)
+            self._prefix_cache = output.past_key_values
+        return self._prefix_cache
+    
+    def _complete(self, prefix: str, suffix: str, max_tokens: int = 1000,
+                  temperature: float = 0.0) -> Dict:
+        """Generate a single completion (a batch of one)"""
+        return self._generate([suffix], max_tokens, temperature)[0]
+    
+    def _generate(self, suffixes: List[str], max_tokens: int, temperature: float = 0.0) -> List[Dict]:
+        """
+        Generate completions for several per-case suffixes in one batch.
+        
+        Rows are laid out as [prefix][padding][suffix]: the prefix positions
+        line up with the shared KV cache, and the attention mask hides the
+        padding, whose position ids are skipped by generate.
+        """
+        torch = self.torch
+        suffix_ids = [
+            self.tokenizer(suffix + self.tail_text, add_special_tokens=False)['input_ids']
+            for suffix in suffixes
+        ]
+        longest = max(len(ids) for ids in suffix_ids)
+        n_prefix = len(self.prefix_ids)
+        
+        input_ids, attention_mask = [], []
+        for ids in suffix_ids:
+            padding = longest - len(ids)
+            input_ids.append(self.prefix_ids + [self.pad_token_id] * padding + ids)
+            attention_mask.append([1] * n_prefix + [0] * padding + [1] * len(ids))
+        input_ids = torch.tensor(input_ids, device=self.device)
+        attention_mask = torch.tensor(attention_mask, device=self.device)
+        
+        kwargs = {'do_sample': temperature > 0}
+        if temperature > 0:
+            kwargs['temperature'] = temperature
+        
+        with self._lock, torch.no_grad():
+            if self.reuse_prefix_cache:
+                cache = copy.deepcopy(self._prefix_kv_cache())
+                cache.batch_repeat_interleave(len(suffixes))
+                kwargs['past_key_values'] = cache
+            output = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                max_new_tokens=max_tokens,
+                pad_token_id=self.pad_token_id,
+                **kwargs
+            )
+        
+        completions = []
+        for ids, generated in zip(suffix_ids, output[:, input_ids.shape[1]:].tolist()):
+            if self.tokenizer.eos_token_id in generated:
+                generated = generated[:generated.index(self.tokenizer.eos_token_id) + 1]
+            completions.append({
+                'text': self.tokenizer.decode(generated, skip_special_tokens=True),
+                'prompt_tokens': n_prefix + len(ids),
+                'completion_tokens': len(generated),
+                'cached_prompt_tokens': n_prefix if self.reuse_prefix_cache else 0,
+            })
+        return completions
+    
+    def assess_validity_batch(self, test_cases: List[Dict]) -> List[Dict]:
+        """
+        Assess several test cases in one forward pass per generated token.
+        
+        Each result reports the latency of the whole batch it was part of.
+        Falls back to per-case assess_validity in self-consistency mode.
+        """
+        if self.samples > 1 or len(test_cases) == 1:
+            return [self.assess_validity(test_case) for test_case in test_cases]
+        # Generation cannot be interrupted, so a cancelled run stops between batches
+        if self._cancelled():
+            return [self.skipped_result(test_case, self.cancel_scope.reason) for test_case in test_cases]
+        
+        case_ids = ','.join(str(test_case.get('id', 'unknown')) for test_case in test_cases)
+        with self._span('format_prompt', test_case_id=case_ids):
+            suffixes = [self.format_prompt_parts(test_case)[1] for test_case in test_cases]
+        
+        call_stats = {'retries': 0, 'retry_delay': 0.0}
+        start = time.perf_counter()
+        try:
+            # Local generation stands in for the network stage
+            with self._span('network', test_case_id=case_ids, batch_size=len(test_cases)):
+                completions = self._generate(suffixes, self.max_tokens)
+        except Exception as e:
+            completions = [e] * len(test_cases)
+        latency = time.perf_counter() - start
+        
+        results = []
+        for test_case, completion in zip(test_cases, completions):
+            case_id = test_case.get('id', 'unknown')
+            if isinstance(completion, Exception):
+                result = {
+                    'validity_rating': None,
+                    'reliability_scores': [],
+                    'reasoning': f'Error: {str(completion)}',
+                    'raw_response': '',
+                    'error': str(completion)
+                }
+                completion = {}
+            else:
+                with self._span('parse_response', test_case_id=case_id):
+                    result = self.parse_response(completion['text'])
+            
+            result['model'] = self.model_name
+            result['test_case_id'] = case_id
+            result.update(self._usage_fields(completion, latency, call_stats))
+            results.append(result)
+        
+        return results
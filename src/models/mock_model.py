@@ -0,0 +1,339 @@
+"""
+Deterministic mock provider for offline load and regression testing
+
+MockProvider answers evaluation prompts without any network access. It maps
+the sources in a prompt back to their test case and either replays the
+raw_response recorded in a results file or synthesizes an answer from the
+ground truth. Latency, error rates and 429s are drawn from a seeded RNG keyed
+by test case and attempt, so two runs with the same settings see exactly the
+same responses, delays and failures.
+
+MockModel plugs a MockProvider into the BaseModel pipeline in-process;
+mock_server.py serves the same provider over the OpenAI and Anthropic wire
+formats for use with the real SDKs.
+"""
+
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Dict, List
+
+from ..data_io import load_records
+from .base_model import BaseModel
+from .pricing import MIN_CACHED_PREFIX_TOKENS
+from .prompts import RUBRIC_PREFIX, SOURCES_HEADER, STRUCTURED_ANSWER_FORMAT, format_sources
+from .streaming import IncrementalResponseParser
+
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'normal', 'lognormal', 'exponential')
+
+# Streamed responses are cut into chunks of this many characters, and this
+# share of the sampled latency is spent before the first chunk
+STREAM_CHUNK_CHARS = 16
+TTFB_SHARE = 0.3
+
+# Source list following each SOURCES TO EVALUATE header (ends at the first blank line)
+SOURCES_BLOCK_PATTERN = re.compile(re.escape(SOURCES_HEADER) + r'(.*?)(?:\n\n|\Z)', re.DOTALL)
+
+
+class MockAPIError(Exception):
+    """Injected provider failure; status_code drives BaseModel retry handling"""
+    
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class MockTimeoutError(TimeoutError):
+    """Sampled latency exceeded the request timeout (retried like an SDK timeout)"""
+
+
+def load_replay(results_path: str, model_name: str = None, blobs_path: str = None) -> Dict[str, str]:
+    """
+    Load recorded raw responses from an evaluation_results_*.json file.
+    
+    Rows saved with a blob store (--blobs) hold a raw_response_ref instead of
+    the text; it is resolved through the store.
+    
+    Args:
+        results_path: Results file written by BenchmarkEvaluator.save_results
+        model_name: Model whose responses to replay (default: first in the file)
+        blobs_path: Blob store of a packed results file (default: blobs.sqlite
+            next to the results file)
+    
+    Returns:
+        Dict mapping test_case_id to raw_response
+    
+    Raises:
+        ValueError: If a row references a response that cannot be found
+    """
+    # Imported here: the evaluation package imports the model wrappers
+    from ..evaluation.blob_store import BLOB_FILE, REF_FIELD, BlobStore
+    from ..evaluation.results_io import load_results
+    results = load_results(results_path)
+    
+    if model_name is None:
+        model_name = next(iter(results))
+    if model_name not in results:
+        raise ValueError(f"Model {model_name} not found in {results_path}")
+    
+    blobs_path = blobs_path or os.path.join(os.path.dirname(results_path) or '.', BLOB_FILE)
+    store = None
+    replay = {}
+    try:
+        for r in results[model_name]:
+            ref = r.get(REF_FIELD)
+            if ref is None:
+                raw_response = r.get('raw_response')
+            else:
+                # Opened only when needed: BlobStore creates a missing file
+                if store is None:
+                    if not os.path.exists(blobs_path):
+                        raise ValueError(f"{results_path} references responses in a blob store, "
+                                         f"but {blobs_path} does not exist")
+                    store = BlobStore(blobs_path)
+                try:
+                    raw_response = store.get(ref)
+                except KeyError as e:
+                    raise ValueError(f"Cannot replay {r['test_case_id']}: {e}") from e
+            if raw_response:
+                replay[r['test_case_id']] = raw_response
+    finally:
+        if store is not None:
+            store.close()
+    return replay
+
+
+class MockProvider:
+    """Deterministic stand-in for an LLM provider, driven by the benchmark dataset"""
+    
+    def __init__(self, dataset: List[Dict], replay: Dict[str, str] = None,
+                 accuracy: float = 1.0, latency: str = 'fixed',
+                 latency_mean_s: float = 0.0, latency_sd_s: float = 0.0,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 seed: int = 0, cache_min_tokens: int = MIN_CACHED_PREFIX_TOKENS):
+        """
+        Args:
+            dataset: Test cases the provider will be asked about
+            replay: test_case_id -> raw_response to replay (see load_replay);
+                cases without a recording are synthesized
+            accuracy: Share of synthesized answers that match the ground truth
+            latency: Latency distribution, one of LATENCY_DISTRIBUTIONS
+            latency_mean_s: Mean response latency in seconds
+            latency_sd_s: Latency standard deviation (half-width for 'uniform')
+            error_rate: Share of requests failing with a 500
+            rate_limit_rate: Share of requests failing with a 429
+            seed: Seed for every random draw
+            cache_min_tokens: Shortest rubric prefix (in tokens) the simulated
+                prompt cache serves, like the providers' caching minimum;
+                0 caches the prefix on every request after the first
+        """
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution {latency!r}; expected one of {LATENCY_DISTRIBUTIONS}")
+        
+        self.cases_by_sources = {format_sources(tc): tc for tc in dataset}
+        self.replay = replay or {}
+        self.accuracy = accuracy
+        self.latency = latency
+        self.latency_mean_s = latency_mean_s
+        self.latency_sd_s = latency_sd_s
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.seed = seed
+        self.cache_min_tokens = cache_min_tokens
+        
+        # Attempts per request key, so retries draw fresh (but reproducible) outcomes
+        self._attempts: Dict[str, int] = {}
+        self._prefix_seen = False
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_files(cls, dataset_path: str, replay_path: str = None,
+                   replay_model: str = None, replay_blobs: str = None, **kwargs) -> 'MockProvider':
+        """Build a provider from a dataset file and an optional results file to replay"""
+        dataset = load_records(dataset_path)
+        replay = load_replay(replay_path, replay_model, replay_blobs) if replay_path else None
+        return cls(dataset, replay=replay, **kwargs)
+    
+    def respond(self, prompt: str, structured: bool = None, temperature: float = 0.0) -> Dict:
+        """
+        Answer an evaluation prompt.
+        
+        Args:
+            prompt: Full prompt text (single-case or packed)
+            structured: Answer with assessment JSON; detected from the prompt when None
+            temperature: Above 0, synthesized answers are redrawn on every attempt
+                (so self-consistency samples can disagree)
+        
+        Returns:
+            Dict with text, prompt_tokens, completion_tokens,
+            cached_prompt_tokens and latency_s (the caller sleeps)
+        
+        Raises:
+            MockAPIError: For injected 429s and 500s
+        """
+        cases = self._match_cases(prompt)
+        if structured is None:
+            structured = STRUCTURED_ANSWER_FORMAT in prompt
+        
+        key = '|'.join(tc['id'] for tc in cases) or prompt
+        with self._lock:
+            attempt = self._attempts.get(key, 0)
+            self._attempts[key] = attempt + 1
+        rng = random.Random(f"{self.seed}:{key}:{attempt}")
+        
+        draw = rng.random()
+        if draw < self.rate_limit_rate:
+            raise MockAPIError(429, "Rate limit exceeded (mock)")
+        if draw < self.rate_limit_rate + self.error_rate:
+            raise MockAPIError(500, "Internal server error (mock)")
+        
+        salt = attempt if temperature > 0 else None
+        if not cases:
+            text = "I could not find any sources to evaluate."
+        elif len(cases) == 1 and 'CASE 1:' not in prompt:
+            text = self._answer(cases[0], structured, salt)
+        else:
+            text = "\n\n".join(
+                f"CASE {n}:\n{self._answer(tc, structured, salt)}"
+                for n, tc in enumerate(cases, 1)
+            )
+        
+        # Simulated automatic prompt caching of the shared rubric prefix,
+        # which (like the providers) only kicks in above the caching minimum
+        cached_tokens = 0
+        prefix_tokens = len(RUBRIC_PREFIX) // 4
+        if prompt.startswith(RUBRIC_PREFIX) and prefix_tokens >= self.cache_min_tokens:
+            with self._lock:
+                if self._prefix_seen:
+                    cached_tokens = prefix_tokens
+                self._prefix_seen = True
+        
+        return {
+            'text': text,
+            'prompt_tokens': math.ceil(len(prompt) / 4),
+            'completion_tokens': math.ceil(len(text) / 4),
+            'cached_prompt_tokens': cached_tokens,
+            'latency_s': self._sample_latency(rng),
+        }
+    
+    def _match_cases(self, prompt: str) -> List[Dict]:
+        """Test cases whose source lists appear in the prompt, in prompt order"""
+        return [
+            self.cases_by_sources[block]
+            for block in SOURCES_BLOCK_PATTERN.findall(prompt)
+            if block in self.cases_by_sources
+        ]
+    
+    def _answer(self, test_case: Dict, structured: bool, salt: int = None) -> str:
+        """Recorded or synthesized answer for one test case"""
+        recorded = self.replay.get(test_case['id'])
+        if recorded is not None and not structured:
+            return recorded
+        
+        if recorded is not None:
+            parser = IncrementalResponseParser()
+            for line in recorded.split('\n'):
+                parser.feed_line(line)
+            scores, rating, reasoning = parser.reliability_scores, parser.validity_rating, parser.reasoning.strip()
+        else:
+            scores, rating = self._synthesize(test_case, salt)
+            reasoning = test_case.get('reasoning', '')
+        
+        if structured:
+            return json.dumps({
+                'reliability_scores': scores,
+                'validity_rating': rating,
+                'reasoning': reasoning,
+            })
+        
+        lines = [
+            f"{i}. {source['url']}: {score}"
+            for i, (source, score) in enumerate(zip(test_case['sources'], scores), 1)
+        ]
+        return (
+            "SOURCE RELIABILITY SCORES:\n" + "\n".join(lines) +
+            f"\n\nOVERALL VALIDITY RATING: {rating}\n\nREASONING:\n{reasoning}"
+        )
+    
+    def _synthesize(self, test_case: Dict, salt: int = None):
+        """Ground-truth ratings, perturbed for (1 - accuracy) of cases"""
+        scores = list(test_case['expected_reliability_scores'])
+        rating = test_case['expected_validity']
+        
+        # Seeded by case only (unless sampling), so a case is answered the same way on every attempt
+        rng = random.Random(f"{self.seed}:answer:{test_case['id']}:{salt}")
+        if rng.random() >= self.accuracy:
+            rating = rng.choice([r for r in range(1, 7) if r != rating])
+            if scores:
+                i = rng.randrange(len(scores))
+                scores[i] = rng.choice([s for s in 'ABCDEF' if s != scores[i]])
+        return scores, rating
+    
+    def _sample_latency(self, rng: random.Random) -> float:
+        """Draw one response latency from the configured distribution"""
+        mean, sd = self.latency_mean_s, self.latency_sd_s
+        if mean <= 0:
+            return 0.0
+        if self.latency == 'fixed':
+            return mean
+        if self.latency == 'uniform':
+            return max(0.0, rng.uniform(mean - sd, mean + sd))
+        if self.latency == 'normal':
+            return max(0.0, rng.gauss(mean, sd))
+        if self.latency == 'exponential':
+            return rng.expovariate(1 / mean)
+        # Lognormal parameterised by its mean and standard deviation
+        sigma2 = math.log(1 + (sd / mean) ** 2)
+        return rng.lognormvariate(math.log(mean) - sigma2 / 2, math.sqrt(sigma2))
+
+
+def stream_text(text: str, latency_s: float):
+    """Yield text in STREAM_CHUNK_CHARS pieces, spreading latency_s across the stream"""
+    chunks = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or ['']
+    time.sleep(latency_s * TTFB_SHARE)
+    per_chunk = latency_s * (1 - TTFB_SHARE) / len(chunks)
+    for i, chunk in enumerate(chunks):
+        if i and per_chunk:
+            time.sleep(per_chunk)
+        yield chunk
+
+
+class MockModel(BaseModel):
+    """In-process model backed by a MockProvider (no network, no API key)"""
+    
+    def __init__(self, provider: MockProvider, model_id: str = "mock", **options):
+        """
+        Args:
+            provider: MockProvider answering the prompts
+            model_id: Reported model name; use a real id (e.g. "gpt-4o-mini") to get cost estimates
+            options: BaseModel options (structured_output, stream, capture_reasoning)
+        """
+        super().__init__(model_id, **options)
+        self.provider = provider
+    
+    def _complete(self, prefix: str, suffix: str, max_tokens: int = 1000,
+                  temperature: float = 0.0) -> Dict:
+        """Answer from the provider after sleeping the sampled latency, or time out"""
+        response = self.provider.respond(prefix + suffix, self.structured_output, temperature)
+        latency = response.pop('latency_s')
+        timeout = self._timeout()
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise MockTimeoutError(f"Request timed out after {timeout:.2f}s")
+        time.sleep(latency)
+        return response
+    
+    def _stream(self, prefix: str, suffix: str, max_tokens: int, usage: Dict):
+        """Stream the provider's answer (usage arrives after the last chunk)"""
+        response = self.provider.respond(prefix + suffix, self.structured_output)
+        yield from stream_text(response['text'], response['latency_s'])
+        usage.update({
+            'prompt_tokens': response['prompt_tokens'],
+            'completion_tokens': response['completion_tokens'],
+            'cached_prompt_tokens': response['cached_prompt_tokens'],
+        })
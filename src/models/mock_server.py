@@ -0,0 +1,310 @@
+"""
+Local HTTP server speaking the OpenAI and Anthropic wire formats
+
+Serves a MockProvider on POST /v1/chat/completions (OpenAI) and
+POST /v1/messages (Anthropic), streaming included, so the unmodified
+GPT4Model and ClaudeModel wrappers can be exercised end to end:
+
+    python -m src.models.mock_server --dataset datasets/triangulation_benchmark_v1.json --port 8000
+    OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=mock python run_benchmark.py
+
+(ANTHROPIC_BASE_URL=http://127.0.0.1:8000 does the same for Claude.)
+Injected failures are returned as HTTP 429/500 with provider-shaped error bodies.
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+from .mock_model import LATENCY_DISTRIBUTIONS, MockAPIError, MockProvider, stream_text
+from .pricing import MIN_CACHED_PREFIX_TOKENS
+
+
+def _message_text(messages) -> str:
+    """Concatenate the text of chat messages (string or content-block form)"""
+    parts = []
+    for message in messages:
+        if message.get('role') == 'system':
+            continue
+        content = message.get('content')
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(block.get('text', '') for block in content or [])
+    return ''.join(parts)
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """Routes OpenAI and Anthropic requests to the server's MockProvider"""
+    
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this every
+    # response waits on a delayed ACK (~40ms)
+    disable_nagle_algorithm = True
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        path = self.path.split('?', 1)[0].rstrip('/')
+        
+        if path.endswith('/chat/completions'):
+            self._openai(body)
+        elif path.endswith('/messages'):
+            self._anthropic(body)
+        else:
+            self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+    
+    # -- OpenAI ---------------------------------------------------------------
+    
+    def _openai(self, body: Dict):
+        structured = 'response_format' in body
+        prompt = _message_text(body.get('messages', []))
+        try:
+            # n > 1 draws several samples; the prompt is only billed once
+            samples = [
+                self.server.provider.respond(prompt, structured, body.get('temperature') or 0.0)
+                for _ in range(body.get('n') or 1)
+            ]
+        except MockAPIError as e:
+            error_type = 'rate_limit_exceeded' if e.status_code == 429 else 'server_error'
+            self._send_json(e.status_code, {'error': {'message': str(e), 'type': error_type, 'code': error_type}})
+            return
+        
+        response = samples[0]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = body.get('model', 'mock')
+        completion_tokens = sum(sample['completion_tokens'] for sample in samples)
+        usage = {
+            'prompt_tokens': response['prompt_tokens'],
+            'completion_tokens': completion_tokens,
+            'total_tokens': response['prompt_tokens'] + completion_tokens,
+            'prompt_tokens_details': {'cached_tokens': response['cached_prompt_tokens']},
+        }
+        
+        if not body.get('stream'):
+            time.sleep(max(sample['latency_s'] for sample in samples))
+            self._send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [
+                    {
+                        'index': i,
+                        'message': {'role': 'assistant', 'content': sample['text']},
+                        'finish_reason': 'stop',
+                    }
+                    for i, sample in enumerate(samples)
+                ],
+                'usage': usage,
+            })
+            return
+        
+        def chunk(delta, finish_reason=None, chunk_usage=None):
+            return {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [] if chunk_usage else [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+                'usage': chunk_usage,
+            }
+        
+        events = (('', chunk({'content': piece})) for piece in stream_text(response['text'], response['latency_s']))
+        tail = [('', chunk({}, 'stop'))]
+        if body.get('stream_options', {}).get('include_usage'):
+            tail.append(('', chunk(None, chunk_usage=usage)))
+        self._send_sse(events, tail, done_marker=True)
+    
+    # -- Anthropic ------------------------------------------------------------
+    
+    def _anthropic(self, body: Dict):
+        tools = body.get('tools')
+        try:
+            response = self.server.provider.respond(_message_text(body.get('messages', [])), bool(tools),
+                                                    body.get('temperature') or 0.0)
+        except MockAPIError as e:
+            error_type = 'rate_limit_error' if e.status_code == 429 else 'api_error'
+            self._send_json(e.status_code, {'type': 'error', 'error': {'type': error_type, 'message': str(e)}})
+            return
+        
+        message_id = f"msg_{uuid.uuid4().hex[:24]}"
+        cached = response['cached_prompt_tokens']
+        usage = {
+            'input_tokens': response['prompt_tokens'] - cached,
+            'output_tokens': response['completion_tokens'],
+            'cache_read_input_tokens': cached,
+            'cache_creation_input_tokens': 0,
+        }
+        message = {
+            'id': message_id,
+            'type': 'message',
+            'role': 'assistant',
+            'model': body.get('model', 'mock'),
+            'stop_sequence': None,
+        }
+        
+        if tools:
+            block = {
+                'type': 'tool_use',
+                'id': f"toolu_{uuid.uuid4().hex[:24]}",
+                'name': tools[0]['name'],
+                'input': json.loads(response['text']),
+            }
+        else:
+            block = {'type': 'text', 'text': response['text']}
+        
+        if not body.get('stream') or tools:
+            time.sleep(response['latency_s'])
+            self._send_json(200, dict(message, content=[block], stop_reason='end_turn', usage=usage))
+            return
+        
+        start_usage = dict(usage, output_tokens=1)
+        head = [
+            ('message_start', {'type': 'message_start',
+                               'message': dict(message, content=[], stop_reason=None, usage=start_usage)}),
+            ('content_block_start', {'type': 'content_block_start', 'index': 0,
+                                     'content_block': {'type': 'text', 'text': ''}}),
+        ]
+        deltas = (
+            ('content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                     'delta': {'type': 'text_delta', 'text': piece}})
+            for piece in stream_text(response['text'], response['latency_s'])
+        )
+        tail = [
+            ('content_block_stop', {'type': 'content_block_stop', 'index': 0}),
+            ('message_delta', {'type': 'message_delta',
+                               'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                               'usage': {'output_tokens': response['completion_tokens']}}),
+            ('message_stop', {'type': 'message_stop'}),
+        ]
+        self._send_sse(deltas, tail, head=head)
+    
+    # -- Transport ------------------------------------------------------------
+    
+    def _send_json(self, status: int, payload: Dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _send_sse(self, events, tail, head=(), done_marker: bool = False):
+        """Write server-sent events; the connection closes when the stream ends"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        
+        def write(event, payload):
+            prefix = f"event: {event}\n" if event else ''
+            self.wfile.write(f"{prefix}data: {json.dumps(payload)}\n\n".encode())
+            self.wfile.flush()
+        
+        try:
+            for event, payload in head:
+                write(event, payload)
+            for event, payload in events:
+                write(event, payload)
+            for event, payload in tail:
+                write(event, payload)
+            if done_marker:
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client cancelled the stream (early termination)
+            pass
+
+
+class MockServer:
+    """Threaded HTTP server around a MockProvider; usable as a context manager"""
+    
+    def __init__(self, provider: MockProvider, host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            provider: MockProvider answering the requests
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+        """
+        self.httpd = ThreadingHTTPServer((host, port), MockRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.provider = provider
+        self._thread = None
+    
+    @property
+    def url(self) -> str:
+        """Base URL of the server (append /v1 for the OpenAI client)"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self) -> 'MockServer':
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Shut the server down"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a deterministic mock LLM provider")
+    parser.add_argument("--dataset", default="datasets/triangulation_benchmark_v1.json")
+    parser.add_argument("--replay", help="evaluation_results_*.json file whose raw responses to replay")
+    parser.add_argument("--replay-model", help="Model in the results file to replay (default: first)")
+    parser.add_argument("--replay-blobs", help="Blob store of a --blobs results file (default: blobs.sqlite next to it)")
+    parser.add_argument("--accuracy", type=float, default=1.0, help="Share of synthesized answers that are correct")
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-mean", type=float, default=0.0, help="Mean latency in seconds")
+    parser.add_argument("--latency-sd", type=float, default=0.0, help="Latency standard deviation in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests failing with a 429")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache-min-tokens", type=int, default=MIN_CACHED_PREFIX_TOKENS,
+                        help="Shortest rubric prefix the simulated prompt cache serves (0 = always cache)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    
+    provider = MockProvider.from_files(
+        args.dataset, args.replay, args.replay_model, args.replay_blobs,
+        accuracy=args.accuracy, latency=args.latency,
+        latency_mean_s=args.latency_mean, latency_sd_s=args.latency_sd,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed, cache_min_tokens=args.cache_min_tokens,
+    )
+    server = MockServer(provider, args.host, args.port)
+    print(f"🧪 Mock provider listening on {server.url} "
+          f"(OpenAI: {server.url}/v1, Anthropic: {server.url})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
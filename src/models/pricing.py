@@ -0,0 +1,106 @@
+"""
+Per-model price table for cost estimation
+
+Prices are USD per 1M tokens as (input, output, cached input), taken from the
+providers' public price lists. Cached input is the price of prompt tokens
+served from the provider's prompt cache. Update them here when providers
+change their pricing.
+
+Providers only cache a prompt prefix of at least MIN_CACHED_PREFIX_TOKENS
+(1024 for OpenAI and Anthropic); shorter prefixes are always billed in full.
+
+Rate limits are (requests per minute, tokens per minute) at the providers'
+first paid usage tier; they are used by the run planner and can be
+overridden per model with `rate_limits` in models.yaml.
+"""
+
+from typing import Optional
+
+
+MIN_CACHED_PREFIX_TOKENS = 1024
+
+
+MODEL_PRICING = {
+    # ===== OPENAI =====
+    "gpt-4o": (2.50, 10.00, 1.25),
+    "gpt-4o-mini": (0.15, 0.60, 0.075),
+    "gpt-4-turbo": (10.00, 30.00, 10.00),
+    "gpt-4": (30.00, 60.00, 30.00),
+    "gpt-3.5-turbo": (0.50, 1.50, 0.50),
+    
+    # ===== ANTHROPIC =====
+    "claude-3-5-sonnet": (3.00, 15.00, 0.30),
+    "claude-3-5-haiku": (0.80, 4.00, 0.08),
+    "claude-3-opus": (15.00, 75.00, 1.50),
+    
+    # ===== GOOGLE =====
+    "gemini-2.0-flash": (0.10, 0.40, 0.025),
+    "gemini-1.5-pro": (1.25, 5.00, 0.3125),
+    "gemini-1.5-flash": (0.075, 0.30, 0.01875),
+}
+
+
+MODEL_RATE_LIMITS = {
+    # ===== OPENAI (tier 1) =====
+    "gpt-4o": (500, 30_000),
+    "gpt-4o-mini": (500, 200_000),
+    "gpt-4-turbo": (500, 30_000),
+    "gpt-4": (500, 10_000),
+    "gpt-3.5-turbo": (3_500, 200_000),
+    
+    # ===== ANTHROPIC (tier 1, input tokens) =====
+    "claude-3-5-sonnet": (50, 40_000),
+    "claude-3-5-haiku": (50, 50_000),
+    "claude-3-opus": (50, 20_000),
+    
+    # ===== GOOGLE (tier 1) =====
+    "gemini-2.0-flash": (2_000, 4_000_000),
+    "gemini-1.5-pro": (1_000, 4_000_000),
+    "gemini-1.5-flash": (2_000, 4_000_000),
+}
+
+
+def _lookup(table: dict, model_name: str) -> Optional[tuple]:
+    """Exact match, else the longest key the model id starts with"""
+    if model_name in table:
+        return table[model_name]
+    
+    matches = [key for key in table if model_name.startswith(key)]
+    if not matches:
+        return None
+    return table[max(matches, key=len)]
+
+
+def get_pricing(model_name: str) -> Optional[tuple]:
+    """
+    Look up (input, output, cached input) pricing for a model id.
+    
+    Dated or suffixed ids (e.g. "claude-3-5-sonnet-20241022", "gemini-2.0-flash-exp")
+    fall back to the longest matching prefix in MODEL_PRICING.
+    """
+    return _lookup(MODEL_PRICING, model_name)
+
+
+def get_rate_limits(model_name: str) -> Optional[tuple]:
+    """Look up (requests per minute, tokens per minute) for a model id, like get_pricing"""
+    return _lookup(MODEL_RATE_LIMITS, model_name)
+
+
+def estimate_cost(model_name: str, prompt_tokens: Optional[int],
+                  completion_tokens: Optional[int], cached_tokens: int = 0) -> Optional[float]:
+    """
+    Estimate request cost in USD (None if the model or token counts are unknown)
+    
+    Args:
+        prompt_tokens: Total prompt tokens, including any served from cache
+        completion_tokens: Generated tokens
+        cached_tokens: Prompt tokens billed at the cached input price
+    """
+    pricing = get_pricing(model_name)
+    if pricing is None or prompt_tokens is None or completion_tokens is None:
+        return None
+    
+    input_price, output_price, cached_price = pricing
+    uncached_tokens = prompt_tokens - cached_tokens
+    return (uncached_tokens * input_price + cached_tokens * cached_price
+            + completion_tokens * output_price) / 1_000_000
@@ -0,0 +1,104 @@
+"""
+Prompt templates for A1Facts benchmark evaluation
+
+The evaluation prompt is split into a static rubric prefix, identical for
+every test case, and a per-case suffix holding the sources. Keeping the
+prefix byte-for-byte stable lets providers serve it from their prompt cache.
+All constant text is built once at import time; only the source list is
+rendered per case.
+"""
+
+from typing import Dict, List, Tuple
+
+
+SYSTEM_PROMPT = "You are an expert at evaluating source reliability and information validity using systematic triangulation methods."
+
+# Static rubric shared by every request (the A-F and 1-6 scales)
+RUBRIC_PREFIX = """You are evaluating information validity using the A1Facts triangulation methodology.
+
+IMPORTANT: Source Reliability Assessment
+Evaluate each web source using this scale:
+A: Completely reliable - The source is undoubtedly authentic and trustworthy.
+B: Usually reliable - Minor doubts exist, but the source is historically valid.
+C: Fairly reliable - Doubts exist, but the source has provided valid information before.
+D: Not usually reliable - Significant doubts about the source's reliability.
+E: Unreliable - The source has a history of providing invalid information.
+F: Reliability cannot be judged - Insufficient information for evaluation.
+
+IMPORTANT: Information Validity Assessment
+After gathering information, assess each piece of data using this scale:
+1. Confirmed: Corroborated by multiple, independent, reliable sources.
+2. Probably true: Logical and consistent with other data, but not fully corroborated.
+3. Possibly true: Plausible but lacks strong corroboration.
+4. Doubtful: Not logical or may be contradicted by other information.
+5. Improbable: Illogical and contradicted by other information.
+6. Cannot be judged: Insufficient information to assess validity.
+
+"""
+
+SOURCES_HEADER = "SOURCES TO EVALUATE:\n"
+
+# Answer format requested after the sources
+ANSWER_FORMAT = """
+
+Provide your assessment in the following format:
+SOURCE RELIABILITY SCORES:
+[List each source with its A-F rating]
+
+OVERALL VALIDITY RATING: [1-6]
+
+REASONING:
+[Explain your assessment]
+"""
+
+
+# Answer format for structured-output mode (the provider enforces the schema)
+STRUCTURED_ANSWER_FORMAT = """
+
+Provide your assessment as JSON with:
+- reliability_scores: one A-F rating per source, in the order listed
+- validity_rating: the overall validity rating (1-6)
+- reasoning: optional, at most one short sentence
+"""
+
+# Answer format for packed prompts holding several numbered cases
+PACKED_ANSWER_FORMAT = """
+
+Assess each case independently. For EVERY case, in order, provide your assessment in the following format:
+CASE <number>:
+SOURCE RELIABILITY SCORES:
+[List each source with its A-F rating]
+
+OVERALL VALIDITY RATING: [1-6]
+
+REASONING:
+[Explain your assessment briefly]
+"""
+
+
+def format_sources(test_case: Dict) -> str:
+    """Render the numbered source list for a test case"""
+    return "\n".join([
+        f"{i}. {source['url']}: {source['claim']}"
+        for i, source in enumerate(test_case['sources'], 1)
+    ])
+
+
+def render_case_suffix(test_case: Dict, structured: bool = False) -> str:
+    """Render the per-case part of the prompt (sources and answer format)"""
+    answer_format = STRUCTURED_ANSWER_FORMAT if structured else ANSWER_FORMAT
+    return SOURCES_HEADER + format_sources(test_case) + answer_format
+
+
+def render_prompt_parts(test_case: Dict, structured: bool = False) -> Tuple[str, str]:
+    """Return the (static prefix, per-case suffix) pair for a test case"""
+    return RUBRIC_PREFIX, render_case_suffix(test_case, structured)
+
+
+def render_packed_suffix(test_cases: List[Dict]) -> str:
+    """Render numbered case blocks for several test cases sharing one prompt"""
+    blocks = [
+        f"CASE {n}:\n{SOURCES_HEADER}{format_sources(test_case)}"
+        for n, test_case in enumerate(test_cases, 1)
+    ]
+    return "\n\n".join(blocks) + PACKED_ANSWER_FORMAT
@@ -0,0 +1,147 @@
+"""
+Config-driven model registry with lazily constructed clients
+
+Models are declared in models.yaml (see the comments there) and resolved to
+wrapper classes by provider alias, by plugins registered under the
+"a1facts.models" entry-point group, or by "package.module:Class" paths.
+Wrapper modules, and with them the provider SDKs, are imported only when a
+model is first used, so selecting one model never touches the others'
+SDKs or credentials.
+
+A plugin package exposes a provider in its pyproject.toml:
+
+    [project.entry-points."a1facts.models"]
+    mistral = "a1facts_mistral:MistralModel"
+
+and can then be used as `class: mistral` in models.yaml.
+"""
+
+import importlib
+import os
+from collections.abc import Mapping
+from importlib.metadata import entry_points
+from pathlib import Path
+from typing import Dict, List
+
+import yaml
+
+
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parents[2] / "models.yaml"
+ENTRY_POINT_GROUP = "a1facts.models"
+
+# Built-in provider aliases (module relative to this package)
+PROVIDERS = {
+    'openai': '.gpt4_model:GPT4Model',
+    'anthropic': '.claude_model:ClaudeModel',
+    'google': '.gemini_model:GeminiModel',
+    'local': '.local_model:LocalModel',
+}
+
+
+def register_provider(name: str, target: str):
+    """Register a provider alias in-process ("package.module:Class")"""
+    PROVIDERS[name] = target
+
+
+def resolve_class(name: str):
+    """Import the wrapper class for a provider alias, entry point or module path"""
+    target = PROVIDERS.get(name)
+    if target is None and ':' not in name:
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            if entry_point.name == name:
+                return entry_point.load()
+        raise ValueError(f"Unknown model provider {name!r}; known: {sorted(PROVIDERS)} "
+                         f"plus entry points in {ENTRY_POINT_GROUP!r}")
+
+    module_name, _, attr = (target or name).partition(':')
+    module = importlib.import_module(module_name, package=__package__)
+    return getattr(module, attr)
+
+
+class ModelSpec:
+    """One models.yaml entry"""
+
+    def __init__(self, name: str, provider: str, model_id: str = None,
+                 requires_env: List[str] = None, params: Dict = None,
+                 enabled: bool = True, rate_limits: Dict = None):
+        self.name = name
+        self.provider = provider
+        self.model_id = model_id or name
+        self.requires_env = list(requires_env or [])
+        self.params = dict(params or {})
+        self.enabled = enabled
+        # {'rpm': ..., 'tpm': ...} overriding pricing.MODEL_RATE_LIMITS (used by the planner)
+        self.rate_limits = dict(rate_limits or {})
+
+    @classmethod
+    def from_config(cls, name: str, entry: Dict) -> 'ModelSpec':
+        entry = dict(entry)
+        if 'class' not in entry:
+            raise ValueError(f"Model {name!r} in the model config has no 'class'")
+        return cls(name, entry.pop('class'), **entry)
+
+    def missing_env(self) -> List[str]:
+        """Required environment variables that are not set"""
+        return [var for var in self.requires_env if not os.getenv(var)]
+
+    def build(self, **options):
+        """Construct the wrapper (imports the provider SDK)"""
+        model_class = resolve_class(self.provider)
+        return model_class(self.model_id, **{**self.params, **options})
+
+
+def load_specs(config_path: str = None) -> Dict[str, ModelSpec]:
+    """Parse a models.yaml file into ModelSpecs, in file order"""
+    with open(config_path or DEFAULT_CONFIG_PATH, 'r') as f:
+        config = yaml.safe_load(f) or {}
+    return {
+        name: ModelSpec.from_config(name, entry)
+        for name, entry in (config.get('models') or {}).items()
+    }
+
+
+class ModelRegistry(Mapping):
+    """
+    Read-only mapping of model name to wrapper, built on first access.
+
+    Only enabled models whose required environment variables are set are
+    offered. Construction errors surface when the model is first accessed.
+    """
+
+    def __init__(self, specs: Dict[str, ModelSpec], options: Dict = None):
+        """
+        Args:
+            specs: Model specs by name (see load_specs)
+            options: BaseModel options passed to every wrapper
+        """
+        self.specs = specs
+        self.options = options or {}
+        self._models = {}
+
+    @classmethod
+    def from_config(cls, config_path: str = None, options: Dict = None) -> 'ModelRegistry':
+        return cls(load_specs(config_path), options)
+
+    def available(self) -> List[str]:
+        """Names of the models that can be built in this environment"""
+        return [
+            name for name, spec in self.specs.items()
+            if spec.enabled and not spec.missing_env()
+        ]
+
+    def __getitem__(self, name: str):
+        if name not in self._models:
+            spec = self.specs.get(name)
+            if spec is None or name not in self.available():
+                raise KeyError(name)
+            self._models[name] = spec.build(**self.options)
+        return self._models[name]
+
+    def __iter__(self):
+        return iter(self.available())
+
+    def __len__(self) -> int:
+        return len(self.available())
+
+    def __contains__(self, name) -> bool:
+        return name in self.available()
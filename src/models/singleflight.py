@@ -0,0 +1,75 @@
+"""
+Coalescing of identical in-flight requests
+
+The same source set can appear several times in a dataset and across
+datasets, and with concurrent evaluation two workers can end up sending the
+same prompt to the same model at the same time. A SingleFlight group lets
+the first caller for a key make the call while later callers with that key
+wait for it and share its result, so each distinct request is in flight at
+most once. Nothing is cached: once a call finishes, the next caller with the
+same key makes a new request.
+"""
+
+import threading
+from typing import Callable, Hashable, Tuple
+
+
+class _Call:
+    """A call in flight and, once done, its outcome"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Group of keyed calls where concurrent callers with equal keys share one call"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.coalesced = 0
+    
+    def do(self, key: Hashable, fn: Callable) -> Tuple[object, bool]:
+        """
+        Run fn, unless a call with the same key is already in flight.
+        
+        Returns:
+            (result, shared): shared is True if the result came from another
+            caller's call. The result object is the same for all callers, so
+            callers must copy it before modifying it. If the call raises, every
+            caller waiting on it gets the exception.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+                leader = True
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+    
+    def summary(self) -> dict:
+        """Calls made and calls saved by coalescing"""
+        with self._lock:
+            return {'singleflight_calls': self.calls, 'coalesced_calls': self.coalesced}
@@ -0,0 +1,90 @@
+"""
+Incremental parser for the free-text A1Facts answer format
+
+BaseModel.parse_response feeds a complete response through this parser line
+by line. In streaming mode chunks are fed as they arrive, and the stream is
+cancelled as soon as every source rating and the validity rating are known.
+"""
+
+from typing import Dict, Optional
+
+
+class IncrementalResponseParser:
+    """Line-by-line parser for the SOURCE RELIABILITY / VALIDITY / REASONING format"""
+    
+    def __init__(self, n_sources: Optional[int] = None):
+        """
+        Args:
+            n_sources: Number of sources in the test case; needed for is_complete
+        """
+        self.n_sources = n_sources
+        self.validity_rating = None
+        self.reliability_scores = []
+        self.reasoning = ''
+        self._section = None
+        self._pending = ''
+    
+    @property
+    def is_complete(self) -> bool:
+        """Whether all source ratings and the validity rating have been parsed"""
+        return (
+            self.n_sources is not None and
+            self.validity_rating is not None and
+            len(self.reliability_scores) >= self.n_sources
+        )
+    
+    def feed(self, chunk: str) -> bool:
+        """
+        Feed a streamed chunk; only complete lines are parsed.
+        
+        Returns:
+            is_complete after this chunk
+        """
+        lines = (self._pending + chunk).split('\n')
+        self._pending = lines.pop()
+        for line in lines:
+            self.feed_line(line)
+        return self.is_complete
+    
+    def close(self):
+        """Parse any trailing partial line at the end of the response"""
+        if self._pending:
+            self.feed_line(self._pending)
+            self._pending = ''
+    
+    def feed_line(self, line: str):
+        """Parse one line of the response"""
+        line = line.strip()
+        upper = line.upper()
+        
+        if 'OVERALL VALIDITY RATING' in upper:
+            # Extract validity rating (1-6)
+            for char in line:
+                if char.isdigit() and char in '123456':
+                    self.validity_rating = int(char)
+                    break
+        
+        elif 'SOURCE RELIABILITY' in upper:
+            self._section = 'reliability'
+        
+        elif 'REASONING' in upper:
+            self._section = 'reasoning'
+        
+        elif self._section == 'reliability' and line:
+            # Extract reliability scores (A-F)
+            for rating in ['A', 'B', 'C', 'D', 'E', 'F']:
+                if rating in line:
+                    self.reliability_scores.append(rating)
+                    break
+        
+        elif self._section == 'reasoning' and line:
+            self.reasoning += line + ' '
+    
+    def result(self, response: str) -> Dict:
+        """Parsed assessment in the parse_response result format"""
+        return {
+            'validity_rating': self.validity_rating,
+            'reliability_scores': self.reliability_scores,
+            'reasoning': self.reasoning.strip(),
+            'raw_response': response
+        }
@@ -0,0 +1,130 @@
+"""
+Structured-output schema and validator for A1Facts assessments
+
+In structured mode the wrappers ask the provider for JSON (OpenAI
+json_schema, Anthropic tool use, Gemini response_schema) instead of the
+free-text format, and responses are checked by validate_assessment.
+"""
+
+import json
+from typing import Dict
+
+
+RELIABILITY_LABELS = ['A', 'B', 'C', 'D', 'E', 'F']
+VALIDITY_RATINGS = [1, 2, 3, 4, 5, 6]
+
+_RELIABILITY_SET = frozenset(RELIABILITY_LABELS)
+_VALIDITY_SET = frozenset(VALIDITY_RATINGS)
+
+# JSON schema for one assessment (Anthropic tool input_schema)
+ASSESSMENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "reliability_scores": {
+            "type": "array",
+            "description": "One A-F reliability rating per source, in source order",
+            "items": {"type": "string", "enum": RELIABILITY_LABELS},
+        },
+        "validity_rating": {
+            "type": "integer",
+            "description": "Overall validity rating (1-6)",
+            "enum": VALIDITY_RATINGS,
+        },
+        "reasoning": {
+            "type": "string",
+            "description": "Optional one-sentence justification",
+        },
+    },
+    "required": ["reliability_scores", "validity_rating"],
+    "additionalProperties": False,
+}
+
+
+class StructuredOutputError(ValueError):
+    """Raised when a structured response does not match ASSESSMENT_SCHEMA"""
+
+
+def openai_schema() -> Dict:
+    """
+    ASSESSMENT_SCHEMA adapted to OpenAI strict mode.
+    
+    Strict mode requires every property to be listed as required, so the
+    optional reasoning becomes a nullable string instead.
+    """
+    schema = json.loads(json.dumps(ASSESSMENT_SCHEMA))
+    schema["properties"]["reasoning"]["type"] = ["string", "null"]
+    schema["required"] = list(schema["properties"])
+    return schema
+
+
+def gemini_schema() -> Dict:
+    """
+    ASSESSMENT_SCHEMA adapted to Gemini's OpenAPI subset.
+    
+    Gemini supports enums on strings only and has no additionalProperties,
+    so the validity range is left to validate_assessment.
+    """
+    return {
+        "type": "object",
+        "properties": {
+            "reliability_scores": {
+                "type": "array",
+                "items": {"type": "string", "enum": RELIABILITY_LABELS},
+            },
+            "validity_rating": {"type": "integer"},
+            "reasoning": {"type": "string"},
+        },
+        "required": ["reliability_scores", "validity_rating"],
+    }
+
+
+def validate_assessment(data) -> Dict:
+    """
+    Check a decoded assessment against ASSESSMENT_SCHEMA.
+    
+    Hand-rolled rather than a generic JSON-schema validator: the schema is
+    fixed and tiny, so a few type and membership checks are all it takes.
+    
+    Returns:
+        Dict with validity_rating, reliability_scores and reasoning
+    """
+    if not isinstance(data, dict):
+        raise StructuredOutputError(f"Expected a JSON object, got {type(data).__name__}")
+    
+    scores = data.get("reliability_scores")
+    if not isinstance(scores, list) or not all(isinstance(s, str) and s in _RELIABILITY_SET for s in scores):
+        raise StructuredOutputError(f"Invalid reliability_scores: {scores!r}")
+    
+    rating = data.get("validity_rating")
+    # Type check first: unhashable values (lists, dicts) cannot be looked up in the set
+    if not isinstance(rating, int) or isinstance(rating, bool) or rating not in _VALIDITY_SET:
+        raise StructuredOutputError(f"Invalid validity_rating: {rating!r}")
+    
+    reasoning = data.get("reasoning") or ''
+    if not isinstance(reasoning, str):
+        raise StructuredOutputError(f"Invalid reasoning: {reasoning!r}")
+    
+    extra = set(data) - set(ASSESSMENT_SCHEMA["properties"])
+    if extra:
+        raise StructuredOutputError(f"Unexpected fields: {sorted(extra)}")
+    
+    return {
+        'validity_rating': rating,
+        'reliability_scores': scores,
+        'reasoning': reasoning.strip(),
+    }
+
+
+def parse_structured_text(text: str) -> Dict:
+    """Decode and validate a JSON assessment, tolerating a ```json fence"""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ''
+        text = text.rsplit("```", 1)[0]
+    
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise StructuredOutputError(f"Response is not valid JSON: {e}") from e
+    
+    return validate_assessment(data)
@@ -0,0 +1,50 @@
+"""
+A dead provider must end the run quickly with the default circuit breaker
+
+    python -m unittest tests.test_circuit_breaker
+"""
+
+import contextlib
+import io
+import os
+import time
+import unittest
+
+from src.evaluation.run_benchmark import BenchmarkEvaluator
+from src.models.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.models.mock_model import MockModel, MockProvider
+
+
+DATASET = os.path.join(os.path.dirname(__file__), '..', 'datasets', 'triangulation_benchmark_v1.json')
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    
+    def test_open_breaker_refuses_by_default(self):
+        breaker = CircuitBreaker('dead', failure_threshold=2)
+        for _ in range(2):
+            breaker.record(False, breaker.before_call(), RuntimeError('boom'))
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        self.assertEqual(breaker.rejected, 1)
+    
+    def test_dead_provider_finishes_in_bounded_time(self):
+        model = MockModel(MockProvider.from_files(DATASET, error_rate=1.0), 'gpt-4o-mini')
+        model.retry_backoff = 0.01
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            evaluator = BenchmarkEvaluator(DATASET, models={'dead': model})
+            start = time.perf_counter()
+            evaluator.run_evaluation(use_comet=False, concurrency=4)
+            elapsed = time.perf_counter() - start
+        
+        metrics = evaluator.metrics['dead']
+        # Well under one cooldown (30s): nothing waits for a probe
+        self.assertLess(elapsed, 10)
+        self.assertEqual(metrics['total_cases'], 134)
+        self.assertEqual(metrics['skipped_cases'] + metrics['errored_cases'], 134)
+        self.assertGreater(metrics['skipped_cases'], 100)
+        self.assertEqual(metrics['circuit_opened'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
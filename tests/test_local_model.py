@@ -0,0 +1,96 @@
+"""
+Batched generation with the reused rubric KV cache must match plain generation
+
+Builds a tiny random Llama model and a byte-level tokenizer in a temporary
+directory, so no download is needed. Skipped when transformers and torch
+are not installed.
+
+    python -m unittest tests.test_local_model
+"""
+
+import os
+import tempfile
+import unittest
+
+from src.data_io import load_records
+
+try:
+    import torch
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers
+    from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+except ImportError:
+    torch = None
+
+
+DATASET = os.path.join(os.path.dirname(__file__), '..', 'datasets', 'triangulation_benchmark_v1.json')
+
+
+def build_tiny_model(directory: str):
+    """Save a randomly initialised 2-layer Llama and a byte-level tokenizer to directory"""
+    vocab = {char: i for i, char in enumerate(sorted(pre_tokenizers.ByteLevel.alphabet()))}
+    vocab['<pad>'] = len(vocab)
+    vocab['</s>'] = len(vocab)
+    tokenizer = Tokenizer(models.BPE(vocab=vocab, merges=[]))
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    PreTrainedTokenizerFast(tokenizer_object=tokenizer, pad_token='<pad>',
+                            eos_token='</s>').save_pretrained(directory)
+    
+    torch.manual_seed(0)
+    # A large init makes the output depend on the input, so misplaced
+    # padding or positions change the generated text
+    config = LlamaConfig(vocab_size=len(vocab), hidden_size=32, intermediate_size=64,
+                         num_hidden_layers=2, num_attention_heads=4, num_key_value_heads=2,
+                         max_position_embeddings=4096, initializer_range=0.3,
+                         pad_token_id=vocab['<pad>'], eos_token_id=vocab['</s>'], bos_token_id=None)
+    LlamaForCausalLM(config).save_pretrained(directory)
+
+
+@unittest.skipIf(torch is None, "transformers and torch are not installed")
+class LocalModelTests(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        from src.models.local_model import LocalModel
+        cls.tmp = tempfile.TemporaryDirectory()
+        build_tiny_model(cls.tmp.name)
+        cls.model = LocalModel(cls.tmp.name, batch_size=6)
+        cls.model.max_tokens = 16
+        # Sources lists of different lengths, so the batch rows are padded
+        cls.cases = load_records(DATASET)[:6]
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+    
+    def setUp(self):
+        self.model.reuse_prefix_cache = True
+    
+    def test_suffixes_need_padding(self):
+        lengths = {
+            len(self.model.tokenizer(self.model.format_prompt_parts(case)[1])['input_ids'])
+            for case in self.cases
+        }
+        self.assertGreater(len(lengths), 1)
+    
+    def test_batched_cached_generation_matches_unbatched_uncached(self):
+        batched = self.model.assess_validity_batch(self.cases)
+        
+        self.model.reuse_prefix_cache = False
+        single = [self.model.assess_validity(case) for case in self.cases]
+        
+        self.assertEqual([r['raw_response'] for r in batched], [r['raw_response'] for r in single])
+        self.assertGreater(len({r['raw_response'] for r in single}), 1)
+        n_prefix = len(self.model.prefix_ids)
+        self.assertEqual({r['cached_prompt_tokens'] for r in batched}, {n_prefix})
+        self.assertEqual([r['prompt_tokens'] for r in batched], [r['prompt_tokens'] for r in single])
+    
+    def test_prefix_cache_is_not_modified_by_generation(self):
+        batched = self.model.assess_validity_batch(self.cases)
+        again = self.model.assess_validity_batch(self.cases)
+        self.assertEqual([r['raw_response'] for r in batched], [r['raw_response'] for r in again])
+        self.assertEqual(self.model._prefix_kv_cache().get_seq_length(), len(self.model.prefix_ids))
+
+
+if __name__ == '__main__':
+    unittest.main()
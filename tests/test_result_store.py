@@ -0,0 +1,59 @@
+"""
+ModelResults rebuilds the rows it was given
+
+    python -m unittest tests.test_result_store
+"""
+
+import json
+import unittest
+
+from src.evaluation.result_store import FIELDS, ModelResults
+
+
+def make_row(i: int, **changes) -> dict:
+    row = {field: None for field in FIELDS}
+    row.update({
+        'test_case_id': f'case-{i}', 'category': 'definitely', 'expected_validity': 1,
+        'predicted_validity': 1 + i % 6, 'expected_reliability': ['A', 'B'],
+        'predicted_reliability': ['A', 'C'], 'validity_correct': i % 6 == 0,
+        'reliability_correct': False, 'correct': False,
+        'reasoning': f'reasoning {i} ✓', 'raw_response': f'response {i}',
+        'latency_s': 0.5, 'prompt_tokens': 100 + i,
+    })
+    row.update(changes)
+    return row
+
+
+class ModelResultsTests(unittest.TestCase):
+    
+    def test_round_trip_with_reads_between_appends(self):
+        rows = [make_row(0), make_row(1, reasoning='', raw_response=''), make_row(2, reasoning=None)]
+        results = ModelResults()
+        for row in rows:
+            results.append(row)
+            # Reads move the spill file position; the next append must not care
+            self.assertEqual(results[0], rows[0])
+        self.assertEqual(list(results), rows)
+        self.assertEqual(results[1:], rows[1:])
+        self.assertEqual(results[-1], rows[-1])
+        results.close()
+    
+    def test_list_compatibility(self):
+        rows = [make_row(i) for i in range(5)]
+        results = ModelResults(rows)
+        self.assertEqual(results, rows)
+        self.assertEqual(results.to_list(), rows)
+        self.assertIsInstance(results.to_list(), list)
+        self.assertEqual(json.loads(json.dumps(results.to_list())), rows)
+        results.close()
+    
+    def test_rows_that_do_not_fit_are_kept_whole(self):
+        rows = [make_row(0, predicted_validity=9), {'test_case_id': 'odd', 'error': 'boom'}]
+        results = ModelResults(rows)
+        self.assertEqual(results.to_list(), rows)
+        self.assertEqual(list(results.without_text())[1], rows[1])
+        results.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
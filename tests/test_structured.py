@@ -0,0 +1,46 @@
+"""
+Structured-output validation rejects malformed assessments with StructuredOutputError
+
+    python -m unittest tests.test_structured
+"""
+
+import json
+import unittest
+
+from src.models.structured import StructuredOutputError, parse_structured_text, validate_assessment
+
+
+VALID = {'validity_rating': 3, 'reliability_scores': ['A', 'C'], 'reasoning': ' Two sources agree. '}
+
+
+class ValidateAssessmentTests(unittest.TestCase):
+    
+    def test_valid_assessment(self):
+        self.assertEqual(validate_assessment(VALID), {
+            'validity_rating': 3,
+            'reliability_scores': ['A', 'C'],
+            'reasoning': 'Two sources agree.',
+        })
+    
+    def test_invalid_validity_ratings(self):
+        for rating in ([3], {'value': 3}, True, 3.0, '3', 0, 7, None):
+            with self.subTest(rating=rating), self.assertRaises(StructuredOutputError):
+                validate_assessment(dict(VALID, validity_rating=rating))
+    
+    def test_invalid_reliability_scores(self):
+        for scores in ('A', [['A']], [{'score': 'A'}], ['G']):
+            with self.subTest(scores=scores), self.assertRaises(StructuredOutputError):
+                validate_assessment(dict(VALID, reliability_scores=scores))
+    
+    def test_unexpected_field(self):
+        with self.assertRaises(StructuredOutputError):
+            validate_assessment(dict(VALID, confidence=0.9))
+    
+    def test_fenced_json_with_list_rating(self):
+        text = "```json\n" + json.dumps(dict(VALID, validity_rating=[3])) + "\n```"
+        with self.assertRaises(StructuredOutputError):
+            parse_structured_text(text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Lease, expiry, duplicate-completion and dead-letter behaviour of the work queues
+
+    python -m unittest tests.test_work_queue
+"""
+
+import os
+import tempfile
+import unittest
+
+from src.evaluation.work_queue import FileWorkQueue, SQLiteWorkQueue
+
+
+CASES = [{'id': 'case-a'}, {'id': 'case-b'}]
+
+
+class WorkQueueTests:
+    """Shared by both backends; subclasses set make_queue"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = self.make_queue(self.tmp.name)
+        self.queue.enqueue([('mock', case, position) for position, case in enumerate(CASES)])
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_lease_and_complete(self):
+        item = self.queue.lease('w1', 60)
+        self.assertEqual((item.model, item.position, item.test_case), ('mock', 0, CASES[0]))
+        self.assertEqual(item.attempts, 1)
+        self.assertTrue(self.queue.complete(item, 'w1', {'test_case_id': 'case-a'}))
+        self.assertEqual(self.queue.counts()['done'], 1)
+        self.assertEqual(list(self.queue.results()), [('mock', 0, {'test_case_id': 'case-a'})])
+    
+    def test_re_enqueue_is_a_no_op(self):
+        item = self.queue.lease('w1', 60)
+        self.queue.complete(item, 'w1', {'test_case_id': 'case-a'})
+        self.queue.enqueue([('mock', case, position) for position, case in enumerate(CASES)])
+        self.assertEqual(self.queue.counts(), {'pending': 1, 'leased': 0, 'done': 1, 'dead': 0})
+    
+    def test_expired_lease_goes_to_another_worker(self):
+        first = self.queue.lease('w1', -1)
+        self.assertEqual(self.queue.release_expired(), 1)
+        second = self.queue.lease('w2', 60)
+        self.assertEqual(second.key, first.key)
+        self.assertEqual(second.attempts, 2)
+    
+    def test_live_lease_is_not_released(self):
+        self.queue.lease('w1', 60)
+        self.assertEqual(self.queue.release_expired(), 0)
+        self.assertEqual(self.queue.lease('w2', 60).position, 1)
+    
+    def test_duplicate_complete_keeps_the_first_result(self):
+        first = self.queue.lease('w1', -1)
+        self.queue.release_expired()
+        second = self.queue.lease('w2', 60)
+        self.assertTrue(self.queue.complete(second, 'w2', {'worker': 'w2'}))
+        self.assertFalse(self.queue.complete(first, 'w1', {'worker': 'w1'}))
+        self.assertEqual(list(self.queue.results()), [('mock', 0, {'worker': 'w2'})])
+    
+    def test_failed_item_is_retried_then_dead_lettered(self):
+        for attempt in (1, 2):
+            item = self.queue.lease('w1', 60)
+            self.assertEqual((item.position, item.attempts), (0, attempt))
+            self.assertFalse(self.queue.fail(item, 'w1', {'error': 'boom'}))
+        item = self.queue.lease('w1', 60)
+        self.assertTrue(self.queue.fail(item, 'w1', {'error': 'boom'}))
+        
+        self.assertEqual(self.queue.counts()['dead'], 1)
+        self.assertEqual(list(self.queue.results()), [('mock', 0, {'error': 'boom'})])
+        self.assertEqual(self.queue.lease('w1', 60).position, 1)
+    
+    def test_item_outliving_its_attempts_is_dead_lettered_on_expiry(self):
+        for _ in range(3):
+            self.queue.lease('w1', -1)
+            self.queue.release_expired()
+        counts = self.queue.counts()
+        self.assertEqual((counts['dead'], counts['pending']), (1, 1))
+        self.assertEqual(list(self.queue.results()), [])
+    
+    def test_skip_models(self):
+        self.queue.enqueue([('other', CASES[0], 0)])
+        self.assertEqual(self.queue.lease('w1', 60, skip_models={'mock'}).model, 'other')
+        self.assertIsNone(self.queue.lease('w1', 60, skip_models={'mock', 'other'}))
+
+
+class FileWorkQueueTests(WorkQueueTests, unittest.TestCase):
+    
+    def make_queue(self, directory):
+        return FileWorkQueue(os.path.join(directory, 'queue'), max_attempts=3)
+
+
+class SQLiteWorkQueueTests(WorkQueueTests, unittest.TestCase):
+    
+    def make_queue(self, directory):
+        return SQLiteWorkQueue(os.path.join(directory, 'queue.db'), max_attempts=3)
+    
+    def tearDown(self):
+        self.queue.conn.close()
+        super().tearDown()
+
+
+if __name__ == '__main__':
+    unittest.main()